@@ -1,12 +1,31 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
 import json
 import requests
 import os
+import time
+import logging
+import functools
 from datetime import datetime
 import urllib3
-import openpyxl  # Para leer archivos Excel
+from crecimiento.core import (indicator_map_es, map_gender_to_key, get_age_range,
+                              lookup_reference_link)
+from crecimiento.derived import DerivedEngine
+from crecimiento.analytics import CROSSING_ALERT_LINES, COL_ALERTA, growth_analytics, z_column
+from crecimiento.incremental import (ChangeLog, FragmentDeps, RowScores, apply_editor_delta,
+                                     has_changes)
+from crecimiento.cache import ReferenceCache, DEFAULT_TTL, DEFAULT_MAX_BYTES
+from crecimiento.bundle import ReferenceBundle, iter_reference_links
+from crecimiento.store import ReferenceIndex, ReferenceStore, SharedFrameStore
+from crecimiento.prefetch import make_session, start_background_prefetch
+from crecimiento.charts import ChartCache, render_concurrently
+from crecimiento.db import MeasurementStore
+from crecimiento.columnar import measurements_bytes, read_measurements
+from crecimiento.validation import describe_flags, flag_measurements
+from crecimiento.pipeline import (indicator_metrics, load_stitched_reference, build_indicator_chart,
+                                  build_indicator_spec)
+from crecimiento.vegalite import ReferenceAssets
+from crecimiento.metrics import METRICS
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -14,6 +33,7 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 # CONFIGURACIÓN DE LA PÁGINA
 #######################################
 st.set_page_config(page_title="Tablero de Crecimiento Infantil", layout="wide")
+rerun_start = time.perf_counter()
 st.title("Tablero de Crecimiento Infantil")
 
 #######################################
@@ -26,178 +46,83 @@ def load_links(json_file: str):
 
 links_data = load_links("who_links.json")
 
-#######################################
-# DICCIONARIOS DE INDICADORES
-#######################################
-# Mostramos en el tablero nombres en español, pero internamente usamos inglés.
-indicator_map_es = {
-    "Talla para la edad": "length-height-for-age",
-    "Peso para la edad": "weight-for-age",
-    "Peso para la talla": "weight-for-length-height",
-    "IMC para la edad": "body-mass-index-for-age",
-    "Perímetro cefálico para la edad": "head-circumference-for-age"
-}
-
 #######################################
 # FUNCIONES AUXILIARES
 #######################################
-def map_gender_to_key(gender_label: str) -> str:
-    """Convierte 'Niño' -> 'boys' y 'Niña' -> 'girls'."""
-    return "boys" if gender_label == "Niño" else "girls"
-
-def get_age_range(age_months: int, indicator: str = None) -> str:
-    """Ajusta la lógica de rangos de edad según el indicador."""
-    if indicator == "weight-for-age":
-        return "0-13-weeks" if age_months < 3 else "0-5"
-    elif indicator == "length-height-for-age":
-        if age_months < 3:
-            return "0-13-weeks"
-        elif age_months < 24:
-            return "0-2"
-        else:
-            return "2-5"
-    elif indicator == "weight-for-length-height":
-        return "0-2" if age_months < 24 else "2-5"
-    elif indicator == "body-mass-index-for-age":
-        if age_months < 3:
-            return "0-13-weeks"
-        elif age_months < 24:
-            return "0-2"
-        else:
-            return "2-5"
-    elif indicator == "head-circumference-for-age":
-        return "0-13" if age_months <= 13 else "0-5"
-    else:
-        return "0-2" if age_months <= 24 else "2-5"
-
 def get_reference_link(indicator: str, score_type: str, gender: str, age_months: int) -> str:
     """Obtiene la URL del Excel OMS según indicador, tipo (z/p), sexo y rango."""
-    gender_key = map_gender_to_key(gender)
-    age_range = get_age_range(age_months, indicator)
     try:
-        return links_data[indicator][score_type][gender_key][age_range]
+        return lookup_reference_link(links_data, indicator, score_type, gender, age_months)
     except KeyError:
+        gender_key = map_gender_to_key(gender)
+        age_range = get_age_range(age_months, indicator)
         st.error(f"No se encontró link para '{indicator}', tipo='{score_type}', sexo='{gender_key}', rango='{age_range}'.")
         return None
 
 #######################################
 # MOSTRAR VENTANA DEL EXCEL
 #######################################
-def get_reference_window(df: pd.DataFrame, x_col: str, user_value: float, window: int = 5) -> pd.DataFrame:
-    """Devuelve una ventana de 'window' filas centrada en el valor más cercano a user_value."""
-    df_sorted = df.sort_values(by=x_col).reset_index(drop=True)
-    diffs = (df_sorted[x_col] - user_value).abs()
-    closest_index = diffs.idxmin()
-    half_window = window // 2
-    start = max(0, closest_index - half_window)
-    end = start + window
-    if end > len(df_sorted):
-        end = len(df_sorted)
-        start = max(0, end - window)
-    return df_sorted.iloc[start:end]
+@st.cache_resource(show_spinner=False)
+def get_reference_store() -> ReferenceStore:
+    """Índices ordenados de las tablas OMS, compartidos por todas las sesiones."""
+    return ReferenceStore()
+
+def get_reference_window(df: pd.DataFrame, x_col: str, user_value: float, window: int = 5,
+                         key: str = None) -> pd.DataFrame:
+    """
+    Devuelve una ventana de 'window' filas centrada en el valor más cercano a user_value.
+    Con 'key' (p. ej. la URL) el índice ordenado se reutiliza entre reruns.
+    """
+    if key is None:
+        return ReferenceIndex(df, x_col).window(user_value, window)
+    return get_reference_store().index(key, df, x_col).window(user_value, window)
 
 #######################################
 # DESCARGA Y LECTURA DE EXCEL
 #######################################
-def download_excel(url: str) -> str:
-    """Descarga el archivo Excel a la carpeta local 'temp/' en el mismo directorio del script."""
-    try:
-        response = requests.get(url, verify=False)
-        response.raise_for_status()
-    except Exception as e:
-        st.error(f"Error al descargar Excel: {e}")
-        return None
-
+@st.cache_resource(show_spinner=False)
+def get_reference_cache() -> ReferenceCache:
+    """Caché en disco 'temp/' compartida por todas las sesiones del proceso."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    temp_dir = os.path.join(script_dir, "temp")
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
-
-    filename = url.split("/")[-1].split("?")[0]
-    local_path = os.path.join(temp_dir, filename)
-
-    with open(local_path, "wb") as f:
-        f.write(response.content)
+    return ReferenceCache(
+        os.path.join(script_dir, "temp"),
+        ttl=float(os.environ.get("CRECIMIENTO_CACHE_TTL", DEFAULT_TTL)),
+        max_bytes=int(float(os.environ.get("CRECIMIENTO_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 2**20)) * 2**20),
+        session=make_session(),
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_reference_bundle():
+    """Paquete precompilado (python -m crecimiento bundle); None si no se ha generado."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    bundle_dir = os.environ.get("CRECIMIENTO_BUNDLE_DIR", os.path.join(script_dir, "reference_bundle"))
+    return ReferenceBundle.open(bundle_dir)
 
-    return local_path
+@st.cache_resource(show_spinner=False)
+def get_shared_tables() -> SharedFrameStore:
+    """Tablas OMS leídas y renombradas, una sola copia para todas las sesiones."""
+    max_mb = float(os.environ.get("CRECIMIENTO_SHARED_MAX_MB", 256))
+    return SharedFrameStore(max_bytes=int(max_mb * 2**20))
 
-def read_oms_excel_original(xlsx_path: str) -> pd.DataFrame:
-    """
-    Lee el Excel OMS **sin renombrar** para mostrar la ventana centrada con nombres originales.
-    """
-    if not os.path.exists(xlsx_path):
-        return None
-    df_original = pd.read_excel(xlsx_path, sheet_name=0)
-    return df_original
-
-def rename_for_chart(df: pd.DataFrame, indicator: str, score_type: str) -> pd.DataFrame:
+def get_reference_data(indicator: str, score_type: str, age_months: int, gender: str) -> pd.DataFrame:
     """
-    Crea una copia y renombra columnas SOLO para la lógica interna de la gráfica.
-    No afecta la vista previa con columnas originales.
+    Retorna la serie OMS continua (todos los rangos de edad) renombrada para la gráfica,
+    tras mostrar la ventana con nombres originales.
     """
-    df_chart = df.copy()
-
-    rename_map_z = {
-        "Month": "Edad (meses)",
-        "Height": "Estatura (cm)",
-        "SD3neg": "ZScore_-3",
-        "SD2neg": "ZScore_-2",
-        "SD1neg": "ZScore_-1",
-        "SD0":    "ZScore_0",
-        "SD1":    "ZScore_+1",
-        "SD2":    "ZScore_+2",
-        "SD3":    "ZScore_+3"
-    }
-    rename_map_p = {
-        "Month": "Edad (meses)",
-        "Height": "Estatura (cm)",
-        "P3": "P3",
-        "P5": "P5",
-        "P50": "P50",
-        "P85": "P85",
-        "P97": "P97"
-    }
-    rename_map = rename_map_z if score_type == "z" else rename_map_p
-    df_chart = df_chart.rename(columns=rename_map)
-
-    if indicator == "weight-for-length-height":
-        x_col = "Estatura (cm)"
-    else:
-        x_col = "Edad (meses)"
-
-    # Convertir a numérico
-    if x_col in df_chart.columns:
-        df_chart[x_col] = pd.to_numeric(df_chart[x_col], errors="coerce")
-        df_chart.dropna(subset=[x_col], inplace=True)
-
-    if score_type == "z":
-        # Z-scores
-        for col in ["ZScore_-3", "ZScore_-2", "ZScore_-1", "ZScore_0", "ZScore_+1", "ZScore_+2", "ZScore_+3"]:
-            if col in df_chart.columns:
-                df_chart[col] = pd.to_numeric(df_chart[col], errors="coerce")
-        if "ZScore_0" in df_chart.columns:
-            df_chart.dropna(subset=["ZScore_0"], inplace=True)
-    else:
-        # Percentiles
-        for col in ["P3", "P5", "P50", "P85", "P97"]:
-            if col in df_chart.columns:
-                df_chart[col] = pd.to_numeric(df_chart[col], errors="coerce")
-
-    return df_chart
+    gender_key = map_gender_to_key(gender)
 
-def get_reference_data(indicator: str, score_type: str, age_months: int, gender: str) -> pd.DataFrame:
-    """Retorna un DataFrame renombrado para la gráfica, tras mostrar la ventana con nombres originales."""
-    url = get_reference_link(indicator, score_type, gender, age_months)
-    if not url:
+    # 1) Leemos el DataFrame original sin renombrar y su versión para la gráfica
+    try:
+        df_original, df_chart = load_stitched_reference(links_data, indicator, score_type, gender_key,
+                                                        get_shared_tables(), get_reference_bundle(),
+                                                        get_reference_cache())
+    except KeyError:
+        st.error(f"No se encontraron links para '{indicator}', tipo='{score_type}', sexo='{gender_key}'.")
         return pd.DataFrame()
-
-    xlsx_path = download_excel(url)
-    if not xlsx_path:
+    except requests.RequestException as e:
+        st.error(f"Error al descargar Excel: {e}")
         return pd.DataFrame()
-
-    # 1) Leemos el DataFrame original sin renombrar
-    df_original = read_oms_excel_original(xlsx_path)
-    if df_original is None or df_original.empty:
+    if df_original is None:
         return pd.DataFrame()
 
     # 2) Determinamos la columna X y el valor del usuario
@@ -209,226 +134,547 @@ def get_reference_data(indicator: str, score_type: str, age_months: int, gender:
             user_val = None
     else:
         x_col = "Month"  # Nombre original
-        user_val = st.session_state.get("child_age_months", None)
+        user_val = age_months
 
     # 3) Mostramos una ventana centrada en el valor del usuario con nombres originales
     if x_col in df_original.columns and user_val is not None:
-        window_df = get_reference_window(df_original, x_col, user_val, window=5)
+        window_df = get_reference_window(df_original, x_col, user_val, window=5,
+                                         key=("stitched", indicator, score_type, gender_key))
         st.write("**Vista previa OMS (ventana centrada con nombres originales):**")
         st.write(window_df)
 
-    # 4) Creamos un df renombrado SOLO para la gráfica
-    df_chart = rename_for_chart(df_original, indicator, score_type)
+    # 4) El df renombrado es SOLO para la gráfica
     return df_chart
 
+@st.cache_resource(show_spinner=False)
+def start_reference_prefetch():
+    """Precarga en segundo plano, una vez por proceso, los Excel que falten en el paquete."""
+    if os.environ.get("CRECIMIENTO_PREFETCH", "1") == "0":
+        return None
+    bundle = get_reference_bundle()
+    if bundle is not None and all(url in bundle for *_, url in iter_reference_links(links_data)):
+        return None
+    return start_background_prefetch(links_data, get_reference_cache())
+
+start_reference_prefetch()
+
+#######################################
+# FRAGMENTOS (RERUNS PARCIALES)
+#######################################
+# Cada parte de la página es un fragmento con clave que declara las claves de
+# estado que lee. Los widgets no vuelven a ejecutar toda la página: su callback
+# vuelve a ejecutar solo los fragmentos que dependen de lo que cambiaron.
+# Dentro de un fragmento se lee st.session_state: en un rerun parcial las
+# variables del script quedan como en el último rerun completo.
+# CRECIMIENTO_FRAGMENTS=0 vuelve al rerun completo (para comparar).
+FRAGMENTS_ENABLED = os.environ.get("CRECIMIENTO_FRAGMENTS", "1") != "0"
+fragment_deps = st.session_state.setdefault("fragment_deps", FragmentDeps())
+fragment_deps.clear()
+
+def fragment(key: str, *depends_on: str):
+    """st.fragment con clave 'key' que depende de las claves de estado 'depends_on'."""
+    def decorator(func):
+        @functools.wraps(func)
+        def run(*args, **kwargs):
+            st.session_state["fragment_deps"].declare(key, *depends_on)
+            with METRICS.timer(f"fragment_{key}"):
+                return func(*args, **kwargs)
+        return st.fragment(run, key=key) if FRAGMENTS_ENABLED else run
+    return decorator
+
+def rerun_dependents(*keys: str):
+    """Callback de widget: vuelve a ejecutar solo los fragmentos que leen 'keys'."""
+    if not FRAGMENTS_ENABLED:
+        return
+    targets = st.session_state["fragment_deps"].dependents(*keys)
+    if targets:
+        st.rerun(targets)
+
+def edad_meses(birthdate) -> int:
+    today = datetime.now()
+    return (today.year - birthdate.year)*12 + (today.month - birthdate.month)
+
 #######################################
 # ENTRADA DE DATOS DEL/LA NIÑO/A
 #######################################
-child_name = st.text_input("Nombre del Niño/Niña", value="Ingrese nombre del nino/a")
-child_gender = st.radio("Sexo", options=["Niño", "Niña"])
-child_birthdate = st.date_input("Fecha de Nacimiento", value=datetime(2022, 2, 13))
-today = datetime.now()
-child_age_months = (today.year - child_birthdate.year)*12 + (today.month - child_birthdate.month)
-st.subheader(f"Edad del/la niño/a: {child_age_months} meses")
-st.session_state["child_age_months"] = child_age_months
+@st.cache_resource(show_spinner=False)
+def get_measurement_store() -> MeasurementStore:
+    """Base SQLite de mediciones compartida por todas las sesiones."""
+    path = os.environ.get("CRECIMIENTO_DB",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "crecimiento.db"))
+    return MeasurementStore(path)
+
+def cargar_historial(child_id: int):
+    """Carga en la sesión los datos y el historial de un niño/a guardado."""
+    store = get_measurement_store()
+    child = store.get_child(child_id)
+    if child is None:
+        return
+    st.session_state["child_name"] = child["name"]
+    st.session_state["child_gender"] = child["sex"]
+    st.session_state["child_birthdate"] = pd.Timestamp(child["birthdate"]).date()
+    st.session_state["child_data"] = store.load_history(child_id)
+    st.session_state.pop("child_data_editor", None)
+    # Historial nuevo: columnas derivadas y z-scores desde cero, en sincronía con la base
+    st.session_state.pop("derived_params", None)
+    st.session_state["pending_changes"] = ChangeLog(child_id)
+    # Cambia todo, también los widgets de arriba: rerun completo
+    st.rerun()
+
+@fragment("historial", "saved_children")
+def render_historial():
+    saved_children = get_measurement_store().list_children()
+    if saved_children.empty:
+        return
+    with st.expander("Cargar historial guardado"):
+        labels = {
+            row.id: f"{row.name} ({row.sex}, {row.birthdate}) - {row.mediciones} mediciones"
+            for row in saved_children.itertuples()
+        }
+        selected_child = st.selectbox("Niño/a", list(labels), format_func=labels.get)
+        st.button("Cargar", on_click=cargar_historial, args=(selected_child,))
 
-st.markdown("### Ingresar Datos de Crecimiento")
+render_historial()
 
-default_data = {
-    "Fecha": [datetime(2024, 12, 14), datetime(2025, 3, 14)],
-    "Edad (meses)": [child_age_months - 2, child_age_months],
-    "Peso (kg)": [13.5, 14],
-    "Estatura (cm)": [92, 94],
-    "Perímetro Cefálico (cm)": [None, 50],
-    "IMC": [None, None]
-}
+# Valores iniciales en la sesión (así "Cargar" puede reemplazarlos)
+st.session_state.setdefault("child_name", "Ingrese nombre del nino/a")
+st.session_state.setdefault("child_birthdate", datetime(2022, 2, 13).date())
+st.text_input("Nombre del Niño/Niña", key="child_name",
+              on_change=rerun_dependents, args=("child_name",))
+st.radio("Sexo", options=["Niño", "Niña"], key="child_gender",
+         on_change=rerun_dependents, args=("child_gender",))
+st.date_input("Fecha de Nacimiento", key="child_birthdate",
+              on_change=rerun_dependents, args=("child_birthdate",))
 
-if "child_data" not in st.session_state:
-    st.session_state["child_data"] = pd.DataFrame(default_data)
+@fragment("edad", "child_birthdate")
+def render_edad():
+    st.subheader(f"Edad del/la niño/a: {edad_meses(st.session_state['child_birthdate'])} meses")
 
-df_child = st.session_state["child_data"].copy()
+render_edad()
 
-def calcular_imc(row):
-    try:
-        peso = float(row["Peso (kg)"])
-        est = float(row["Estatura (cm)"])
-        if peso > 0 and est > 0:
-            return round(peso / ((est/100)**2), 2)
-    except:
-        pass
-    return None
-
-def calcular_edad_meses(birthdate: datetime, measurement_date: datetime):
-    if pd.isnull(measurement_date):
-        return None
-    months = (measurement_date.year - birthdate.year)*12 + (measurement_date.month - birthdate.month)
-    if measurement_date.day < birthdate.day:
-        months -= 1
-    return months
+st.markdown("### Ingresar Datos de Crecimiento")
 
-df_child["Fecha"] = pd.to_datetime(df_child["Fecha"], errors="coerce")
-df_child["Edad (meses)"] = df_child["Fecha"].apply(lambda d: calcular_edad_meses(child_birthdate, d))
-df_child["IMC"] = df_child.apply(calcular_imc, axis=1)
+if "child_data" not in st.session_state:
+    child_age_months = edad_meses(st.session_state["child_birthdate"])
+    st.session_state["child_data"] = pd.DataFrame({
+        "Fecha": [datetime(2024, 12, 14), datetime(2025, 3, 14)],
+        "Edad (meses)": [child_age_months - 2, child_age_months],
+        "Peso (kg)": [13.5, 14],
+        "Estatura (cm)": [92, 94],
+        "Perímetro Cefálico (cm)": [None, 50],
+        "IMC": [None, None]
+    })
+
+engine = st.session_state.setdefault("derived_engine", DerivedEngine())
+row_scores = st.session_state.setdefault("row_scores", RowScores())
+st.session_state.setdefault("pending_changes", ChangeLog())
+
+def child_frame() -> pd.DataFrame:
+    """
+    child_data con las columnas derivadas al día. En la primera carga, con un
+    historial nuevo o al cambiar la fecha de nacimiento se recalculan todas las filas.
+    """
+    derived_params = {"birthdate": st.session_state["child_birthdate"]}
+    if st.session_state.get("derived_params") != derived_params:
+        with METRICS.timer("derived_columns"):
+            df_child = st.session_state["child_data"].copy()
+            df_child["Fecha"] = pd.to_datetime(df_child["Fecha"], errors="coerce")
+            st.session_state["child_data"] = engine.compute(df_child, derived_params)
+        row_scores.clear()
+        st.session_state["derived_params"] = derived_params
+    return st.session_state["child_data"]
+
+# El editor deja en su estado solo las filas editadas/añadidas/borradas desde el
+# rerun anterior: se aplican sobre child_data y se recalculan solo esas filas.
+# Al cambiar la tabla cambia la identidad del editor y su estado vuelve a vacío.
+def aplicar_edicion():
+    """Callback del editor: aplica sus cambios y vuelve a ejecutar lo que lee child_data."""
+    editor_delta = st.session_state.get("child_data_editor")
+    if not has_changes(editor_delta):
+        return
+    df_child = child_frame()
+    with METRICS.timer("derived_columns"):
+        changed, removed_fechas = apply_editor_delta(df_child, editor_delta)
+        engine.update_rows(df_child, changed, st.session_state["derived_params"])
+    row_scores.invalidate(changed + list(editor_delta.get("deleted_rows") or ()))
+    st.session_state["pending_changes"].record(changed, removed_fechas)
+    rerun_dependents("child_data")
+
+def guardar_datos():
+    """Guarda en la base las mediciones del/la niño/a (solo las filas tocadas si ya estaba cargado)."""
+    df_child = child_frame()
+    pending_changes = st.session_state["pending_changes"]
+    store = get_measurement_store()
+    child_id = store.upsert_child(st.session_state["child_name"], st.session_state["child_gender"],
+                                  st.session_state["child_birthdate"])
+    if pending_changes.child_id == child_id:
+        # Misma ficha que la cargada/guardada: solo las filas tocadas desde entonces
+        rows, removed_fechas = pending_changes.pending(df_child)
+        saved = store.patch_measurements(child_id, rows, removed_fechas)
+    else:
+        saved = store.save_measurements(child_id, df_child)
+    pending_changes.reset(child_id)
+    st.session_state["save_message"] = (f"Datos guardados: {saved['written']} filas escritas, "
+                                        f"{saved['deleted']} eliminadas")
+    rerun_dependents("saved_children", "save_message")
 
 column_config = {
     "Fecha": st.column_config.DateColumn("Fecha", format="YYYY-MM-DD", required=True),
     "Edad (meses)": st.column_config.Column("Edad (meses)", disabled=True),
+    "Edad (días)": st.column_config.Column("Edad (días)", disabled=True),
     "IMC": st.column_config.Column("IMC", disabled=True)
 }
 
-df_edited = st.data_editor(
-    df_child,
-    num_rows="dynamic",
-    use_container_width=True,
-    column_config=column_config,
-    key="child_data_editor"
-)
-st.session_state["child_data"] = df_edited
-
-csv_filename = f"{child_name.replace(' ', '_')}_growth_data.csv"
-if st.button("Guardar Datos"):
-    st.session_state["child_data"].to_csv(csv_filename, index=False)
-    st.success(f"Datos guardados en {csv_filename}")
+@fragment("editor", "child_data", "child_birthdate", "save_message")
+def render_editor():
+    st.data_editor(
+        child_frame(),
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config=column_config,
+        key="child_data_editor",
+        on_change=aplicar_edicion
+    )
+    st.button("Guardar Datos", on_click=guardar_datos)
+    if "save_message" in st.session_state:
+        st.success(st.session_state.pop("save_message"))
+
+render_editor()
+
+EXPORT_COLUMNS = ["Fecha", "Edad (meses)", "Peso (kg)", "Estatura (cm)", "Perímetro Cefálico (cm)", "IMC"]
+IMPORT_COLUMNS = ["Fecha", "Peso (kg)", "Estatura (cm)", "Perímetro Cefálico (cm)"]
+
+def importar_mediciones():
+    """Reemplaza las mediciones de la sesión por las del archivo subido (CSV, Parquet o Arrow)."""
+    uploaded = st.session_state.get("import_file")
+    if uploaded is None:
+        return
+    try:
+        df = read_measurements(uploaded)
+    except (ValueError, OSError) as e:
+        st.session_state["import_message"] = f"No se pudo leer {uploaded.name}: {e}"
+        return
+    if "Fecha" not in df.columns:
+        st.session_state["import_message"] = f"{uploaded.name} no tiene la columna 'Fecha'."
+        return
+    st.session_state["child_data"] = df[[c for c in IMPORT_COLUMNS if c in df.columns]]
+    st.session_state.pop("child_data_editor", None)
+    # Como al cargar un historial: todo se recalcula y el guardado compara con la base
+    st.session_state.pop("derived_params", None)
+    st.session_state["pending_changes"] = ChangeLog()
+    st.session_state["import_message"] = f"{len(df)} mediciones importadas de {uploaded.name}."
+    rerun_dependents("child_data")
+
+@fragment("archivo", "child_data", "child_birthdate", "child_name", "import_message")
+def render_archivo():
+    df_child = child_frame()
+    with st.expander("Importar / exportar mediciones"):
+        export_df = df_child[[c for c in EXPORT_COLUMNS if c in df_child.columns]]
+        file_stem = ("".join(ch if ch.isalnum() else "_" for ch in st.session_state["child_name"])
+                     .strip("_") or "mediciones")
+        # Los archivos se generan solo al pulsar el botón (data como función)
+        for col, (label, fmt, mime) in zip(st.columns(3), (
+                ("CSV", "csv", "text/csv"),
+                ("Parquet", "parquet", "application/vnd.apache.parquet"),
+                ("Arrow", "arrow", "application/vnd.apache.arrow.file"))):
+            col.download_button(f"Descargar {label}", lambda fmt=fmt: measurements_bytes(export_df, fmt),
+                                file_name=f"{file_stem}.{fmt}", mime=mime)
+        st.file_uploader("Archivo de mediciones", type=["csv", "parquet", "arrow", "feather"],
+                         key="import_file")
+        st.button("Importar", on_click=importar_mediciones)
+        if "import_message" in st.session_state:
+            st.info(st.session_state.pop("import_message"))
+
+render_archivo()
 
 #######################################
-# INDICADORES EN ESPAÑOL
+# VALIDACIÓN DE MEDICIONES
 #######################################
-indicator_map_es = {
-    "Talla para la edad": "length-height-for-age",
-    "Peso para la edad": "weight-for-age",
-    "Peso para la talla": "weight-for-length-height",
-    "IMC para la edad": "body-mass-index-for-age",
-    "Perímetro cefálico para la edad": "head-circumference-for-age"
-}
+def child_zscores() -> pd.DataFrame:
+    """Mediciones de la sesión con el z-score (serie OMS continua) de cada indicador."""
+    shared, bundle, cache = get_shared_tables(), get_reference_bundle(), get_reference_cache()
+    df_final = child_frame()
+    gender_key = map_gender_to_key(st.session_state["child_gender"])
+    df = df_final.copy()
+    for indicator_es, indicator_en in indicator_map_es.items():
+        child_metric, _ = indicator_metrics[indicator_en]
+        if child_metric not in df_final.columns:
+            continue
+        try:
+            _, df_ref = load_stitched_reference(links_data, indicator_en, "z", gender_key,
+                                                shared, bundle, cache)
+        except KeyError:
+            continue
+        if df_ref is None or not {"L", "M", "S"}.issubset(df_ref.columns):
+            continue
+        scores = row_scores.scores(("stitched", indicator_en, "z", gender_key), df_ref,
+                                   indicator_en, df_final, child_metric,
+                                   st.session_state["child_birthdate"])
+        df[z_column(indicator_es)] = scores["Z-score"]
+    return df
+
+@fragment("validacion", "child_data", "child_gender", "child_birthdate")
+def render_validation():
+    """Mediciones con valores biológicamente implausibles o errores de carga (no se eliminan)."""
+    df = child_zscores()
+    with METRICS.timer("validation"):
+        flags = flag_measurements(df, birthdate=st.session_state["child_birthdate"])
+    flagged = flags != 0
+    if not flagged.any():
+        return
+    st.warning(f"{int(flagged.sum())} medición(es) con valores a revisar: se conservan, pero "
+               "distorsionan las gráficas y el IMC.")
+    review = df.loc[flagged, [c for c in IMPORT_COLUMNS if c in df.columns]]
+    review["Revisar"] = ["; ".join(describe_flags(value)) for value in flags[flagged]]
+    st.dataframe(review, hide_index=True)
+
+render_validation()
 
 #######################################
 # FUNCIÓN PARA GRAFICAR COMPARACIÓN
 #######################################
-def compare_and_plot(indicator_en: str, indicator_es: str, score_type: str, child_metric: str,
-                     ylabel: str, child_color: str, child_x_col: str = None):
-    # Mostrar el enlace de referencia OMS
+@st.cache_resource(show_spinner=False)
+def get_chart_cache() -> ChartCache:
+    """Fondos de las curvas OMS ya dibujados, compartidos por todas las sesiones."""
+    return ChartCache(max_entries=int(os.environ.get("CRECIMIENTO_CHART_CACHE", 32)))
+
+@st.cache_resource(show_spinner=False)
+def get_reference_assets():
+    """
+    Curvas OMS como archivos estáticos (static/oms/) para las gráficas
+    interactivas; None si Streamlit no sirve estáticos (van dentro de la spec).
+    """
+    if not st.get_option("server.enableStaticServing"):
+        return None
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return ReferenceAssets(os.path.join(script_dir, "static", "oms"))
+
+def chart_renderer(interactive: bool):
+    """Destino de build_chart: ReferenceAssets (o None) para Vega-Lite, ChartCache para imagen."""
+    return get_reference_assets() if interactive else get_chart_cache()
+
+def build_chart(interactive: bool, renderer, ref_key, df_ref, indicator_en: str, indicator_es: str,
+                score_type: str, child_metric: str, ylabel: str, child_color: str,
+                child_x_col: str, df_final: pd.DataFrame):
+    """(spec Vega-Lite o imagen, z-scores, aviso) del indicador para el/la niño/a actual."""
+    build = build_indicator_spec if interactive else build_indicator_chart
+    return build(ref_key, df_ref, indicator_en, indicator_es, score_type, child_metric, ylabel,
+                 child_color, child_x_col, df_final, renderer, st.session_state["child_name"],
+                 st.session_state["child_birthdate"], row_scores=row_scores)
+
+def show_chart(chart, interactive: bool):
+    with METRICS.timer("st_image"):
+        if interactive:
+            st.vega_lite_chart(chart, width="stretch")
+        else:
+            st.image(chart)
+
+def show_reference(indicator_en: str, score_type: str):
+    """Link al Excel OMS y ventana de la tabla centrada en el valor del/la niño/a."""
+    child_gender = st.session_state["child_gender"]
+    child_age_months = edad_meses(st.session_state["child_birthdate"])
     url_ref = get_reference_link(indicator_en, score_type, child_gender, child_age_months)
     if url_ref:
         st.markdown(f"**[Link a datos OMS]({url_ref})**")
+    get_reference_data(indicator_en, score_type, child_age_months, child_gender)
 
-    df_ref = get_reference_data(indicator_en, score_type, child_age_months, child_gender)
+def compare_and_plot(indicator_en: str, indicator_es: str, score_type: str, child_metric: str,
+                     ylabel: str, child_color: str, child_x_col: str = None,
+                     interactive: bool = False):
+    gender_key = map_gender_to_key(st.session_state["child_gender"])
+    try:
+        _, df_ref = load_stitched_reference(links_data, indicator_en, score_type, gender_key,
+                                            get_shared_tables(), get_reference_bundle(),
+                                            get_reference_cache())
+    except (KeyError, requests.RequestException):
+        df_ref = None
     if df_ref is None or df_ref.empty:
         st.error("No se pudo obtener la información de referencia (OMS).")
         return
 
-    if indicator_en == "weight-for-length-height":
-        x_label = "Estatura (cm)"
-    else:
-        x_label = "Edad (meses)"
-
-    if x_label not in df_ref.columns:
-        st.error(f"Los datos OMS no contienen la columna '{x_label}'.")
+    df_final = child_frame()
+    try:
+        chart, scores, warning = build_chart(
+            interactive, chart_renderer(interactive), ("stitched", indicator_en, score_type, gender_key),
+            df_ref, indicator_en, indicator_es, score_type, child_metric, ylabel, child_color,
+            child_x_col, df_final)
+    except ValueError as e:
+        st.error(str(e))
         return
+    if warning:
+        st.warning(warning)
+    show_chart(chart, interactive)
 
-    x_ref = df_ref[x_label]
+    # Z-score y percentil exactos de cada medición (método LMS)
+    if scores is not None:
+        st.write("**Z-score y percentil del/la niño/a:**")
+        st.dataframe(scores)
 
-    # Preparar la figura
-    fig, ax = plt.subplots(figsize=(8, 5))
-
-    # Título en español
-    titulo = f"{indicator_es} ({score_type.upper()})"
+#######################################
+# SELECCIÓN DE INDICADOR (ESPAÑOL)
+#######################################
+st.markdown("### Selección del Indicador para Comparación")
 
-    # Z-scores vs. percentiles
-    if score_type == "z":
-        zscore_keys = {
-            "ZScore_-3": "-3 SD",
-            "ZScore_-2": "-2 SD",
-            "ZScore_-1": "-1 SD",
-            "ZScore_0":  "0 SD",
-            "ZScore_+1": "+1 SD",
-            "ZScore_+2": "+2 SD",
-            "ZScore_+3": "+3 SD"
-        }
-        curve_colors = {
-            "ZScore_0": "green",
-            "ZScore_-1": "yellow",
-            "ZScore_+1": "yellow",
-            "ZScore_-2": "orange",
-            "ZScore_+2": "orange",
-            "ZScore_-3": "red",
-            "ZScore_+3": "red"
-        }
-        for key, label in zscore_keys.items():
-            if key in df_ref.columns:
-                ax.plot(x_ref, df_ref[key], linestyle="--",
-                        color=curve_colors.get(key, "black"), label=label)
-    else:
-        p_keys = {
-            "P3": "P3",
-            "P5": "P5",
-            "P50": "P50",
-            "P85": "P85",
-            "P97": "P97"
-        }
-        p_colors = {
-            "P3": "red",
-            "P5": "orange",
-            "P50": "green",
-            "P85": "orange",
-            "P97": "red"
-        }
-        for key, label in p_keys.items():
-            if key in df_ref.columns:
-                ax.plot(x_ref, df_ref[key], linestyle="--",
-                        color=p_colors.get(key, "black"), label=label)
-
-    # Línea de evolución del niño
-    df_final = st.session_state["child_data"]
-    if not child_x_col:
-        child_x_col = "Estatura (cm)" if indicator_en == "weight-for-length-height" else "Edad (meses)"
-    if child_x_col in df_final.columns and child_metric in df_final.columns:
-        ax.plot(df_final[child_x_col], df_final[child_metric], "o-",
-                color=child_color, label=child_name)
+def render_dashboard(interactive: bool = False):
+    """Muestra los cinco indicadores (z y p); carga y dibujo en paralelo en un pool de hilos."""
+    shared, bundle, cache, renderer = (get_shared_tables(), get_reference_bundle(),
+                                       get_reference_cache(), chart_renderer(interactive))
+    df_final = child_frame()
+    gender_key = map_gender_to_key(st.session_state["child_gender"])
+    tasks = [(indicator_en, indicator_es, score)
+             for indicator_es, indicator_en in indicator_map_es.items() for score in ("z", "p")]
+
+    def build(task):
+        indicator_en, indicator_es, score = task
+        child_metric, ylabel = indicator_metrics[indicator_en]
+        try:
+            _, df_ref = load_stitched_reference(links_data, indicator_en, score, gender_key,
+                                                shared, bundle, cache)
+        except KeyError:
+            df_ref = None
+        if df_ref is None:
+            raise ValueError("No se pudo obtener la información de referencia (OMS).")
+        return build_chart(interactive, renderer, ("stitched", indicator_en, score, gender_key),
+                           df_ref, indicator_en, indicator_es, score, child_metric, ylabel,
+                           "blue", None, df_final)
+
+    results, timing = render_concurrently(build, tasks)
+    by_key = {(ind_es, score): outcome for (_, ind_es, score), outcome in zip(tasks, results)}
+    for indicator_es in indicator_map_es:
+        for col, score in zip(st.columns(2), ("z", "p")):
+            if (indicator_es, score) not in by_key:
+                continue
+            result, error = by_key[(indicator_es, score)]
+            with col:
+                if error is not None:
+                    st.error(f"{indicator_es} ({score.upper()}): {error}")
+                    continue
+                chart, scores, warning = result
+                if warning:
+                    st.warning(warning)
+                show_chart(chart, interactive)
+                if scores is not None:
+                    st.dataframe(scores, hide_index=True)
+    st.caption(f"Tablero generado en {timing['wall']:.2f} s "
+               f"(gráfica más lenta: {timing['slowest']:.2f} s, suma: {timing['total']:.2f} s)")
+
+VISTAS = ["Un indicador", "Tablero (todos los indicadores)"]
+# Interactivas: el navegador dibuja una spec Vega-Lite (zoom, menos CPU y bytes por rerun)
+GRAFICAS = ["Interactivas (navegador)", "Imagen (servidor)"]
+st.session_state.setdefault(
+    "grafica", GRAFICAS[1 if os.environ.get("CRECIMIENTO_CHARTS", "interactive") == "image" else 0])
+
+@fragment("selector", "vista")
+def render_selector():
+    st.radio("Vista", VISTAS, horizontal=True, key="vista",
+             on_change=rerun_dependents, args=("vista",))
+    st.radio("Gráficas", GRAFICAS, horizontal=True, key="grafica",
+             on_change=rerun_dependents, args=("grafica",))
+    if st.session_state["vista"] == VISTAS[0]:
+        st.selectbox("Indicador", list(indicator_map_es), key="indicador",
+                     on_change=rerun_dependents, args=("indicador",))
+        st.selectbox("Tipo", ["z", "p"], key="tipo",
+                     on_change=rerun_dependents, args=("tipo",))
+
+render_selector()
+
+@fragment("referencia", "vista", "indicador", "tipo", "child_gender", "child_birthdate")
+def render_reference():
+    if st.session_state["vista"] != VISTAS[0]:
+        return
+    indicator_en = indicator_map_es[st.session_state["indicador"]]
+    if indicator_en == "weight-for-length-height":
+        # La ventana se centra en la última estatura
+        st.session_state["fragment_deps"].depend("referencia", "child_data")
+    show_reference(indicator_en, st.session_state["tipo"])
+
+render_reference()
+
+@fragment("graficas", "vista", "grafica", "indicador", "tipo", "child_data", "child_name",
+          "child_gender", "child_birthdate")
+def render_charts():
+    interactive = st.session_state["grafica"] == GRAFICAS[0]
+    if st.session_state["vista"] != VISTAS[0]:
+        render_dashboard(interactive)
+        return
+    selected_indicator_es = st.session_state["indicador"]
+    # Obtenemos la clave en inglés
+    selected_indicator_en = indicator_map_es[selected_indicator_es]
+
+    # Graficar según el indicador
+    if selected_indicator_en in indicator_metrics:
+        child_metric, ylabel = indicator_metrics[selected_indicator_en]
+        compare_and_plot(selected_indicator_en, selected_indicator_es, st.session_state["tipo"],
+                         child_metric=child_metric, ylabel=ylabel, child_color="blue",
+                         interactive=interactive)
     else:
-        st.warning(f"No se encontró la columna '{child_x_col}' o '{child_metric}' en los datos del/la niño/a.")
+        st.warning("Indicador no soportado en la comparación.")
 
-    ax.set_title(titulo)
-    ax.set_xlabel("Estatura (cm)" if indicator_en == "weight-for-length-height" else "Edad (meses)")
-    ax.set_ylabel(ylabel)
-    ax.legend()
-    st.pyplot(fig)
+render_charts()
 
 #######################################
-# SELECCIÓN DE INDICADOR (ESPAÑOL)
+# VELOCIDAD DE CRECIMIENTO Y CRUCES DE CENTILES
 #######################################
-st.markdown("### Selección del Indicador para Comparación")
-indicator_es_list = list(indicator_map_es.keys())
-selected_indicator_es = st.selectbox("Indicador", indicator_es_list)
-score_type = st.selectbox("Tipo", ["z", "p"])
-
-# Obtenemos la clave en inglés
-selected_indicator_en = indicator_map_es[selected_indicator_es]
-
-# Graficar según el indicador
-if selected_indicator_en == "length-height-for-age":
-    compare_and_plot(selected_indicator_en, selected_indicator_es, score_type,
-                     child_metric="Estatura (cm)", ylabel="Estatura (cm)",
-                     child_color="blue")
-
-elif selected_indicator_en == "weight-for-age":
-    compare_and_plot(selected_indicator_en, selected_indicator_es, score_type,
-                     child_metric="Peso (kg)", ylabel="Peso (kg)",
-                     child_color="blue")
-
-elif selected_indicator_en == "weight-for-length-height":
-    compare_and_plot(selected_indicator_en, selected_indicator_es, score_type,
-                     child_metric="Peso (kg)", ylabel="Peso (kg)",
-                     child_color="blue")
-
-elif selected_indicator_en == "body-mass-index-for-age":
-    compare_and_plot(selected_indicator_en, selected_indicator_es, score_type,
-                     child_metric="IMC", ylabel="IMC (kg/m²)",
-                     child_color="blue")
-
-elif selected_indicator_en == "head-circumference-for-age":
-    compare_and_plot(selected_indicator_en, selected_indicator_es, score_type,
-                     child_metric="Perímetro Cefálico (cm)", ylabel="Perímetro Cefálico (cm)",
-                     child_color="blue")
-
-else:
-    st.warning("Indicador no soportado en la comparación.")
\ No newline at end of file
+@fragment("analitica", "child_data", "child_gender", "child_birthdate")
+def render_growth_analytics():
+    """Velocidad entre visitas, Δz y líneas de centiles cruzadas de cada indicador."""
+    df = child_zscores()
+    with METRICS.timer("growth_analytics"):
+        result = growth_analytics(df)
+    alerts = int(result[COL_ALERTA].sum())
+    if alerts:
+        st.warning(f"{alerts} visita(s) con un cruce de {CROSSING_ALERT_LINES} o más líneas "
+                   "de centiles respecto de la visita anterior.")
+    columns = ["Fecha", "Días desde la visita anterior"] + [
+        c for c in result.columns
+        if c.startswith(("Velocidad", "Δz", "Líneas cruzadas"))] + [COL_ALERTA]
+    st.dataframe(result[columns], hide_index=True)
+
+with st.expander("Velocidad de crecimiento y cruces de centiles"):
+    render_growth_analytics()
+
+#######################################
+# ESTADO DE LA CACHÉ DE REFERENCIAS
+#######################################
+cache_stats = get_reference_cache().stats()
+st.sidebar.caption(
+    f"Caché OMS: {cache_stats['hits']} aciertos, {cache_stats['misses']} fallos, "
+    f"{cache_stats['network_calls']} peticiones de red"
+)
+shared_stats = get_shared_tables().stats()
+with st.sidebar.expander(f"Memoria de referencias: {shared_stats['bytes'] / 2**20:.1f} MB "
+                         f"en {shared_stats['tables']} tablas"):
+    st.dataframe(get_shared_tables().memory_report(), hide_index=True)
+
+#######################################
+# MÉTRICAS DE RENDIMIENTO (CRECIMIENTO_METRICS=1)
+#######################################
+@st.cache_resource(show_spinner=False)
+def setup_metrics():
+    """Registra los contadores de las cachés y, si se pide, el log JSON de tiempos."""
+    METRICS.register_collector("reference_cache", get_reference_cache().stats)
+    METRICS.register_collector("shared_tables", get_shared_tables().stats)
+    METRICS.register_collector("chart_cache", get_chart_cache().stats)
+    log_path = os.environ.get("CRECIMIENTO_METRICS_LOG")
+    if log_path:
+        handler = logging.FileHandler(log_path)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        metrics_logger = logging.getLogger("crecimiento.metrics")
+        metrics_logger.addHandler(handler)
+        metrics_logger.setLevel(logging.INFO)
+    return True
+
+if METRICS.enabled:
+    setup_metrics()
+    METRICS.record("rerun", time.perf_counter() - rerun_start)
+    prom_path = os.environ.get("CRECIMIENTO_METRICS_FILE")
+    if prom_path:
+        METRICS.write_prometheus(prom_path)
+    with st.sidebar.expander("Rendimiento por etapa"):
+        st.dataframe(METRICS.summary().round(2), hide_index=True)
+        for name, values in METRICS.collect().items():
+            if "hit_rate" in values:
+                st.caption(f"{name}: {values['hit_rate']:.0%} aciertos "
+                           f"({values['hits']} de {values['hits'] + values['misses']})")
+        if st.button("Reiniciar métricas"):
+            METRICS.reset()
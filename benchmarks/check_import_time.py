@@ -0,0 +1,69 @@
+"""
+Comprueba el presupuesto de tiempo de importación de los módulos livianos del
+paquete con ``python -X importtime`` (cada módulo en un intérprete nuevo).
+
+Falla (código 1) si un módulo supera su presupuesto o si arrastra alguna
+dependencia pesada (matplotlib, openpyxl, requests, streamlit, pandas, NumPy)
+que solo debe cargarse al usarse. Uso:
+
+    python benchmarks/check_import_time.py [--runs 5] [--scale 1.0]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulo -> presupuesto en milisegundos (tiempo acumulado de importación)
+BUDGETS_MS = {
+    "crecimiento": 5,
+    "crecimiento.core": 20,
+    "crecimiento.cache": 30,
+    "crecimiento.metrics": 40,
+    "crecimiento.__main__": 30,
+}
+HEAVY_MODULES = ("matplotlib", "openpyxl", "requests", "streamlit", "pandas", "numpy")
+
+
+def import_time_ms(module: str) -> tuple:
+    """(ms acumulados de 'module', dependencias pesadas cargadas) en un proceso limpio."""
+    code = (f"import sys, {module}; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR,
+                          capture_output=True, text=True, check=True)
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1])
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return (cumulative or 0) / 1000, heavy
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--runs", type=int, default=5, help="Repeticiones (se toma el mínimo)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Multiplica los presupuestos (máquinas lentas)")
+    args = parser.parse_args(argv)
+
+    failed = []
+    for module, budget in BUDGETS_MS.items():
+        samples = [import_time_ms(module) for _ in range(args.runs)]
+        best = min(ms for ms, _ in samples)
+        heavy = sorted({m for _, mods in samples for m in mods})
+        limit = budget * args.scale
+        ok = best <= limit and not heavy
+        print(f"{module:<24} {best:7.1f} ms  (presupuesto {limit:.0f} ms)"
+              f"{'  importa ' + ', '.join(heavy) if heavy else ''}{'' if ok else '  FALLA'}")
+        if not ok:
+            failed.append(module)
+    if failed:
+        print(f"Fuera de presupuesto: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+Prueba de carga del servicio HTTP de puntuación (``python -m crecimiento serve``).
+
+Lanza peticiones con varios clientes en paralelo (una conexión keep-alive
+por cliente) durante un tiempo fijo e informa peticiones/s, filas/s y
+latencias p50/p90/p99. Solo usa la biblioteca estándar (y pyarrow para
+--format arrow).
+
+    python -m crecimiento serve --workers 4 &
+    python benchmarks/load_test.py --endpoint single --concurrency 16
+    python benchmarks/load_test.py --endpoint batch --batch-size 1000 --format arrow
+"""
+import argparse
+import http.client
+import json
+import statistics
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def make_rows(n: int, seed: int = 0) -> pd.DataFrame:
+    """Mediciones sintéticas de niños/as de 0 a 5 años."""
+    rng = np.random.default_rng(seed)
+    birth = pd.Timestamp("2021-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+    days = rng.integers(1, 1800, n)
+    months = days / 30.4375
+    return pd.DataFrame({
+        "Sexo": np.where(rng.random(n) < 0.5, "Niño", "Niña"),
+        "Fecha de Nacimiento": birth.strftime("%Y-%m-%d"),
+        "Fecha": (birth + pd.to_timedelta(days, unit="D")).strftime("%Y-%m-%d"),
+        "Peso (kg)": np.round(3.3 + 4.56 * np.log1p(months / 1.8) + rng.normal(0, 0.8, n), 1),
+        "Estatura (cm)": np.round(49.9 + 30.4 * np.log1p(months / 6) + rng.normal(0, 2, n), 1),
+        "Perímetro Cefálico (cm)": np.round(34.5 + 5.2 * np.log1p(months / 5), 1),
+    })
+
+
+def make_bodies(args) -> list:
+    """(ruta, content-type, cuerpo, filas) pregenerados para no medir la serialización del cliente."""
+    bodies = []
+    for seed in range(16):
+        if args.endpoint == "single":
+            row = make_rows(1, seed).iloc[0].to_dict()
+            bodies.append(("/score", "application/json", json.dumps(row).encode(), 1))
+            continue
+        df = make_rows(args.batch_size, seed)
+        if args.format == "arrow":
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            body, ctype = sink.getvalue().to_pybytes(), ARROW_STREAM
+        else:
+            body, ctype = json.dumps({"rows": df.to_dict(orient="records")}).encode(), "application/json"
+        bodies.append(("/score/batch", ctype, body, len(df)))
+    return bodies
+
+
+def client(url, bodies, deadline, latencies, errors, rows, lock):
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+    local, local_rows, local_errors, i = [], 0, 0, 0
+    while time.perf_counter() < deadline:
+        path, ctype, body, n = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request("POST", path, body=body, headers={"Content-Type": ctype})
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        elapsed = time.perf_counter() - start
+        if ok:
+            local.append(elapsed)
+            local_rows += n
+        else:
+            local_errors += 1
+    conn.close()
+    with lock:
+        latencies.extend(local)
+        rows[0] += local_rows
+        errors[0] += local_errors
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=("single", "batch"), default="single")
+    parser.add_argument("--format", choices=("json", "arrow"), default="json",
+                        help="Formato del cuerpo en --endpoint batch")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="Clientes simultáneos")
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga")
+    parser.add_argument("--warmup", type=float, default=1.0, help="Segundos de calentamiento")
+    parser.add_argument("--json", action="store_true", help="Imprime el resultado como JSON")
+    args = parser.parse_args(argv)
+
+    bodies = make_bodies(args)
+    lock = threading.Lock()
+
+    def run(duration):
+        latencies, errors, rows = [], [0], [0]
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=client, args=(args.url, bodies, deadline, latencies,
+                                                         errors, rows, lock))
+                   for _ in range(args.concurrency)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return latencies, errors[0], rows[0], time.perf_counter() - start
+
+    if args.warmup > 0:
+        run(args.warmup)
+    latencies, errors, rows, wall = run(args.duration)
+    if not latencies:
+        print(f"Ninguna petición correcta ({errors} errores); ¿está el servicio en {args.url}?")
+        return 1
+    ms = np.percentile(np.array(latencies) * 1e3, [50, 90, 99])
+    result = {
+        "endpoint": args.endpoint,
+        "format": args.format if args.endpoint == "batch" else "json",
+        "batch_size": args.batch_size if args.endpoint == "batch" else 1,
+        "concurrency": args.concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / wall,
+        "rows_per_second": rows / wall,
+        "p50_ms": ms[0],
+        "p90_ms": ms[1],
+        "p99_ms": ms[2],
+        "mean_ms": statistics.fmean(latencies) * 1e3,
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"{result['requests']:,} peticiones ({errors} errores) en {wall:.1f} s con "
+              f"{args.concurrency} clientes")
+        print(f"  {result['requests_per_second']:,.1f} peticiones/s, "
+              f"{result['rows_per_second']:,.0f} filas/s")
+        print(f"  latencia p50 {ms[0]:.2f} ms, p90 {ms[1]:.2f} ms, p99 {ms[2]:.2f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
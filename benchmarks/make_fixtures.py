@@ -0,0 +1,93 @@
+"""
+Genera los Excel sintéticos con el formato de las tablas OMS usados por los
+benchmarks (uno por enlace de who_links.json, con el mismo nombre de archivo).
+
+Las curvas son aproximaciones LMS plausibles, no los valores oficiales; solo
+sirven para medir el rendimiento sin red. Uso:
+
+    python benchmarks/make_fixtures.py [directorio]
+"""
+import json
+import os
+import sys
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from crecimiento.bundle import iter_reference_links  # noqa: E402
+from crecimiento.cache import url_filename  # noqa: E402
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+ZSCORE_COLUMNS = [("SD3neg", -3), ("SD2neg", -2), ("SD1neg", -1), ("SD0", 0),
+                  ("SD1", 1), ("SD2", 2), ("SD3", 3)]
+PERCENTILE_COLUMNS = [("P01", .001), ("P1", .01), ("P3", .03), ("P5", .05), ("P10", .1),
+                      ("P15", .15), ("P25", .25), ("P50", .5), ("P75", .75), ("P85", .85),
+                      ("P90", .9), ("P95", .95), ("P97", .97), ("P99", .99), ("P999", .999)]
+
+
+def x_axis(filename: str, age_range: str):
+    """Columna X y sus valores, como en los Excel OMS del mismo rango."""
+    if filename.startswith(("wfl", "tab_wfl")):
+        return "Length", np.arange(45, 110.01, 0.5)
+    if filename.startswith(("wfh", "tab_wfh")):
+        return "Height", np.arange(65, 120.01, 0.5)
+    if age_range in ("0-13-weeks", "0-13"):
+        return "Week", np.arange(0, 14)
+    if age_range == "0-2":
+        return "Month", np.arange(0, 25)
+    if age_range == "2-5":
+        return "Month", np.arange(24, 61)
+    return "Month", np.arange(0, 61)
+
+
+def lms_curves(indicator: str, t: np.ndarray):
+    """Parámetros L, M, S sintéticos en función de 't' (meses o cm)."""
+    ones = np.ones_like(t, dtype="float64")
+    if indicator == "weight-for-age":
+        return 0.2 - 0.003 * t, 3.3 + 4.56 * np.log1p(t / 1.8), 0.14 - 0.0003 * t
+    if indicator == "length-height-for-age":
+        return ones, 49.9 + 30.4 * np.log1p(t / 6), 0.038 - 0.0001 * t
+    if indicator == "body-mass-index-for-age":
+        return -0.3 * ones, 13.9 + 3 * np.exp(-((t - 8) / 12) ** 2), 0.09 - 0.0001 * t
+    if indicator == "head-circumference-for-age":
+        return ones, 34.5 + 13 * np.log1p(t / 5) / np.log1p(12), 0.035 - 0.0001 * t
+    # weight-for-length-height: t en cm
+    return -0.35 * ones, 2.4 + 0.0016 * (t - 40) ** 2 + 0.02 * (t - 45), 0.08 + 0.0001 * t
+
+
+def make_table(indicator: str, score_type: str, filename: str, age_range: str) -> pd.DataFrame:
+    x_col, x = x_axis(filename, age_range)
+    t = x / 4.35 if x_col == "Week" else x
+    L, M, S = lms_curves(indicator, t)
+    df = pd.DataFrame({x_col: x, "L": np.round(L, 4), "M": np.round(M, 4), "S": np.round(S, 5)})
+    if score_type == "z":
+        columns = ZSCORE_COLUMNS
+    else:
+        columns = [(name, NormalDist().inv_cdf(p)) for name, p in PERCENTILE_COLUMNS]
+    for name, z in columns:
+        df[name] = np.round(df["M"] * (1 + df["L"] * df["S"] * z) ** (1 / df["L"]), 1)
+    return df
+
+
+def main(out_dir: str = FIXTURES_DIR) -> int:
+    with open(os.path.join(REPO_DIR, "who_links.json"), "r") as f:
+        links_data = json.load(f)
+    os.makedirs(out_dir, exist_ok=True)
+    count = 0
+    for indicator, score_type, _, age_range, url in iter_reference_links(links_data):
+        filename = url_filename(url)
+        df = make_table(indicator, score_type, filename, age_range)
+        df.to_excel(os.path.join(out_dir, filename), index=False)
+        count += 1
+    print(f"{count} archivos escritos en {out_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,120 @@
+"""
+Latencia por interacción de la app, con fragmentos (rerun parcial) y sin ellos.
+
+Ejecuta TablaCrecimiento.py con streamlit.testing (AppTest) sobre un paquete
+construido con los Excel sintéticos de ``benchmarks/fixtures/``, sin red. Para
+cada interacción se abre una sesión nueva, se hace el rerun completo inicial
+(sin medir) y se mide el rerun que provoca la interacción, primero con
+CRECIMIENTO_FRAGMENTS=0 (toda la página) y luego con fragmentos. Se informa la
+mediana, la reducción y qué fragmentos se volvieron a ejecutar.
+
+    python benchmarks/rerun_latency.py
+    python benchmarks/rerun_latency.py --rows 500 --repeat 10 --filter celda
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from streamlit.proto.WidgetStates_pb2 import WidgetStates  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from crecimiento.bundle import build_bundle  # noqa: E402
+from crecimiento.metrics import METRICS  # noqa: E402
+from run_benchmarks import BIRTHDATE, FIXTURES_DIR, make_measurements  # noqa: E402
+
+APP = os.path.join(REPO_DIR, "TablaCrecimiento.py")
+DEFAULT_ROWS = 50
+DEFAULT_REPEAT = 5
+TIMEOUT = 300
+
+
+#######################################
+# INTERACCIONES
+#######################################
+def edit_cell(at: AppTest) -> AppTest:
+    """Cambia el peso de la última fila del editor (AppTest no sabe editar st.data_editor)."""
+    editor = next(df for df in at.dataframe if df.key == "child_data_editor")
+    delta = {"edited_rows": {str(len(editor.value) - 1): {"Peso (kg)": 17.3}},
+             "added_rows": [], "deleted_rows": []}
+    states = WidgetStates()
+    states.CopyFrom(at._tree.get_widget_states())
+    states.widgets.add(id=editor.proto.id, string_value=json.dumps(delta))
+    return at._run(states)
+
+
+INTERACTIONS = {
+    "nombre": lambda at: at.text_input(key="child_name").input("Ana").run(),
+    "celda": edit_cell,
+    "indicador": lambda at: at.selectbox(key="indicador").select("Peso para la talla").run(),
+    "graficas": lambda at: at.radio(key="grafica").set_value("Imagen (servidor)").run(),
+    "sexo": lambda at: at.radio(key="child_gender").set_value("Niña").run(),
+}
+
+
+def new_session(data) -> AppTest:
+    at = AppTest.from_file(APP, default_timeout=TIMEOUT)
+    at.session_state["child_birthdate"] = BIRTHDATE
+    at.session_state["child_data"] = data.copy()
+    return at.run()
+
+
+def measure(name: str, fragments: bool, data, repeat: int) -> dict:
+    os.environ["CRECIMIENTO_FRAGMENTS"] = "1" if fragments else "0"
+    times, stages = [], set()
+    for _ in range(repeat):
+        at = new_session(data)
+        METRICS.reset()
+        start = time.perf_counter()
+        at = INTERACTIONS[name](at)
+        times.append(time.perf_counter() - start)
+        if at.exception:
+            raise SystemExit(f"{name}: {at.exception[0].message}")
+        stages = set(METRICS.summary()["Etapa"])
+    ran = sorted(s[len("fragment_"):] for s in stages if s.startswith("fragment_"))
+    return {"median": statistics.median(times), "fragments": ran}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS,
+                        help="Mediciones del/la niño/a en el editor")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Sesiones medidas por interacción y modo")
+    parser.add_argument("--filter", default=None, help="Solo interacciones cuyo nombre contenga esto")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    os.chdir(REPO_DIR)  # la app abre who_links.json con ruta relativa
+    METRICS.enabled = True
+    names = [n for n in INTERACTIONS if not args.filter or args.filter in n]
+    data = make_measurements(args.rows)
+    with tempfile.TemporaryDirectory() as work_dir:
+        with open(os.path.join(REPO_DIR, "who_links.json"), "r") as f:
+            build_bundle(json.load(f), work_dir, source_dir=FIXTURES_DIR)
+        os.environ.update(CRECIMIENTO_BUNDLE_DIR=work_dir, CRECIMIENTO_PREFETCH="0",
+                          CRECIMIENTO_DB=os.path.join(work_dir, "crecimiento.db"))
+        new_session(data)  # calentamiento: tablas OMS y fondos en las cachés del proceso
+        print(f"{args.rows} mediciones, mediana de {args.repeat} sesiones")
+        print(f"{'interacción':<12} {'completo (ms)':>14} {'fragmentos (ms)':>16} {'reducción':>10}"
+              "  fragmentos ejecutados")
+        for name in names:
+            full = measure(name, False, data, args.repeat)
+            partial = measure(name, True, data, args.repeat)
+            reduction = 1 - partial["median"] / full["median"]
+            print(f"{name:<12} {full['median'] * 1000:>14.1f} {partial['median'] * 1000:>16.1f} "
+                  f"{reduction:>10.0%}  {', '.join(partial['fragments'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
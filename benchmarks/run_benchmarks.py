@@ -0,0 +1,292 @@
+"""
+Benchmarks de la cadena de referencias OMS y del cálculo de z-scores.
+
+Se ejecutan sin red sobre los Excel sintéticos de ``benchmarks/fixtures/``
+(ver make_fixtures.py). Cada etapa se mide por separado y también un rerun
+completo de la app (sin Streamlit), con 1, 100, 10.000 y 1.000.000 de
+mediciones. Los resultados se guardan por máquina en ``benchmarks/results/``
+y, si ya existe una línea base, la corrida falla (código 1) cuando alguna
+etapa es más lenta que la base por encima del umbral.
+
+    python benchmarks/run_benchmarks.py                  # medir y comparar
+    python benchmarks/run_benchmarks.py --save           # fijar nueva línea base
+    python benchmarks/run_benchmarks.py --sizes 1 100 --filter zscores
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from crecimiento.analytics import growth_analytics, z_column  # noqa: E402
+from crecimiento.bundle import ReferenceBundle, build_bundle  # noqa: E402
+from crecimiento.cache import url_filename  # noqa: E402
+from crecimiento.charts import ChartCache  # noqa: E402
+from crecimiento.derived import DerivedEngine  # noqa: E402
+from crecimiento.lut import LMSGrid  # noqa: E402
+from crecimiento.pipeline import (build_indicator_chart, build_indicator_spec,  # noqa: E402
+                                  calcular_zscores_nino, indicator_metrics, load_chart_reference,
+                                  load_stitched_reference, read_oms_excel_original,
+                                  rename_for_chart)
+from crecimiento.store import ReferenceIndex, SharedFrameStore  # noqa: E402
+from crecimiento.vegalite import ReferenceAssets  # noqa: E402
+from crecimiento.zscore import LMSTable  # noqa: E402
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+SIZES = (1, 100, 10_000, 1_000_000)
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25
+# Diferencias menores que esto (segundos) se consideran ruido
+NOISE_FLOOR = 0.002
+# Tiempo máximo aproximado por benchmark; con etapas lentas se repite menos
+TIME_BUDGET = 10.0
+
+INDICATOR = "weight-for-age"
+INDICATOR_ES = "Peso para la edad"
+SCORE_TYPE = "z"
+BIRTHDATE = date(2020, 1, 15)
+
+
+#######################################
+# DATOS SINTÉTICOS
+#######################################
+def make_measurements(n: int, seed: int = 0) -> pd.DataFrame:
+    """Tabla del editor con 'n' mediciones entre el nacimiento y los 5 años."""
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.integers(0, 1826, n))
+    months = days / 30.4375
+    return pd.DataFrame({
+        "Fecha": pd.Timestamp(BIRTHDATE) + pd.to_timedelta(days, unit="D"),
+        "Peso (kg)": np.round(3.3 + 4.56 * np.log1p(months / 1.8) + rng.normal(0, 0.8, n), 1),
+        "Estatura (cm)": np.round(49.9 + 30.4 * np.log1p(months / 6) + rng.normal(0, 2, n), 1),
+        "Perímetro Cefálico (cm)": np.round(34.5 + 5.2 * np.log1p(months / 5) + rng.normal(0, 1, n), 1),
+    })
+
+
+class Context:
+    """Paquete binario, almacenes compartidos y tablas de referencia de los benchmarks."""
+
+    def __init__(self, work_dir: str):
+        with open(os.path.join(REPO_DIR, "who_links.json"), "r") as f:
+            self.links_data = json.load(f)
+        self.url = self.links_data[INDICATOR][SCORE_TYPE]["boys"]["0-5"]
+        self.xlsx_path = os.path.join(FIXTURES_DIR, url_filename(self.url))
+        if not os.path.exists(self.xlsx_path):
+            raise SystemExit(f"Falta {self.xlsx_path}; ejecute benchmarks/make_fixtures.py")
+        build_bundle(self.links_data, work_dir, source_dir=FIXTURES_DIR)
+        self.bundle = ReferenceBundle.open(work_dir)
+        self.shared = SharedFrameStore(max_bytes=256 * 2**20)
+        self.chart_cache = ChartCache()
+        self.assets = ReferenceAssets(os.path.join(work_dir, "static"))
+        self.df_original, self.df_chart = self.load_reference(self.shared)
+        stitched, _ = load_stitched_reference(self.links_data, INDICATOR, SCORE_TYPE, "boys",
+                                           self.shared, self.bundle, None)
+        self.lms_table = LMSTable.from_frame(stitched)
+        self.lms_grid = LMSGrid.from_table(self.lms_table)
+
+    def load_reference(self, shared: SharedFrameStore):
+        return load_chart_reference(self.url, INDICATOR, SCORE_TYPE, shared, self.bundle, None)
+
+    def chart(self, df_final: pd.DataFrame):
+        child_metric, ylabel = indicator_metrics[INDICATOR]
+        return build_indicator_chart(self.url, self.df_chart, INDICATOR, INDICATOR_ES, SCORE_TYPE,
+                                     child_metric, ylabel, "blue", None, df_final,
+                                     self.chart_cache, "Benchmark", BIRTHDATE)
+
+    def spec(self, df_final: pd.DataFrame):
+        child_metric, ylabel = indicator_metrics[INDICATOR]
+        return build_indicator_spec(self.url, self.df_chart, INDICATOR, INDICATOR_ES, SCORE_TYPE,
+                                    child_metric, ylabel, "blue", None, df_final,
+                                    self.assets, "Benchmark", BIRTHDATE)
+
+
+#######################################
+# BENCHMARKS
+#######################################
+def reference_benchmarks(ctx: Context) -> dict:
+    """Etapas que no dependen del número de mediciones."""
+    x_value = 37
+    return {
+        "read_oms_excel_original": lambda: read_oms_excel_original(ctx.xlsx_path),
+        "bundle_load": lambda: ctx.bundle.load(ctx.url),
+        "rename_for_chart": lambda: rename_for_chart(ctx.df_original, INDICATOR, SCORE_TYPE),
+        "get_reference_window": lambda: ReferenceIndex(ctx.df_original, "Month").window(x_value, 5),
+        "load_chart_reference_cold": lambda: ctx.load_reference(SharedFrameStore(256 * 2**20)),
+        "load_chart_reference_warm": lambda: ctx.load_reference(ctx.shared),
+        "load_stitched_reference_cold": lambda: load_stitched_reference(
+            ctx.links_data, INDICATOR, SCORE_TYPE, "boys", SharedFrameStore(256 * 2**20),
+            ctx.bundle, None),
+    }
+
+
+def measurement_benchmarks(ctx: Context, n: int) -> dict:
+    """Etapas y rerun completo con 'n' mediciones."""
+    df_child = make_measurements(n)
+    params = {"birthdate": BIRTHDATE}
+    warm_engine = DerivedEngine()
+    df_final = warm_engine.compute(df_child, params)
+    index = ReferenceIndex(ctx.df_original, "Month")
+    ages = df_final["Edad (meses)"].to_numpy(dtype="float64")
+    child_metric, ylabel = indicator_metrics[INDICATOR]
+    chart_key = ("benchmark", n)
+    age_days = (df_final["Fecha"] - pd.Timestamp(BIRTHDATE)).dt.days.to_numpy(dtype="float64")
+    weights = df_final["Peso (kg)"].to_numpy(dtype="float64")
+    # Cohorte de 'n' mediciones, 10 visitas por niño/a, para la analítica entre visitas
+    cohort = df_final.assign(ID=np.arange(n) // 10)
+    cohort[z_column(INDICATOR_ES)] = ctx.lms_table.zscores(age_days, weights, True)
+
+    def rerun():
+        # Rerun tras editar la tabla: referencias en memoria, columnas derivadas
+        # recalculadas, ventana de vista previa, gráfica y z-scores
+        _, df_ref = ctx.load_reference(ctx.shared)
+        df = DerivedEngine().compute(df_child, params)
+        ReferenceIndex(ctx.df_original, "Month").window(ages[-1], 5)
+        return ctx.chart(df)
+
+    return {
+        "derived_columns": lambda: DerivedEngine().compute(df_child, params),
+        "derived_columns_unchanged": lambda: warm_engine.compute(df_final, params),
+        "reference_nearest": lambda: index.nearest_many(ages),
+        "zscores": lambda: calcular_zscores_nino(ctx.df_chart, INDICATOR, df_final,
+                                                 child_metric, BIRTHDATE),
+        "zscores_lms_table": lambda: ctx.lms_table.zscores(age_days, weights, True),
+        "zscores_lms_grid": lambda: ctx.lms_grid.zscores(age_days, weights, True),
+        "growth_analytics": lambda: growth_analytics(cohort, id_col="ID"),
+        "chart_render": lambda: ctx.chart_cache.render(
+            chart_key, ctx.df_chart, "Edad (meses)", SCORE_TYPE, INDICATOR_ES, "Edad (meses)",
+            ylabel, df_final["Edad (meses)"], df_final[child_metric], "Benchmark", "blue"),
+        "compare_and_plot": lambda: ctx.chart(df_final),
+        "compare_and_plot_vega": lambda: ctx.spec(df_final),
+        "end_to_end_rerun": rerun,
+    }
+
+
+def measure(func, repeat: int) -> dict:
+    """Una llamada de calentamiento y luego hasta 'repeat' mediciones (dentro de TIME_BUDGET)."""
+    start = time.perf_counter()
+    func()
+    first = time.perf_counter() - start
+    runs = max(1, min(repeat, int(TIME_BUDGET / max(first, 1e-9))))
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times), "runs": runs}
+
+
+#######################################
+# RESULTADOS Y REGRESIONES
+#######################################
+def machine_id() -> str:
+    return (f"{platform.node()}-{platform.machine()}-py{sys.version_info.major}"
+            f".{sys.version_info.minor}").replace(os.sep, "_")
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Nombres de los benchmarks más lentos que la base por encima del umbral."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        delta = result["median"] - base["median"]
+        if delta > NOISE_FLOOR and result["median"] > base["median"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def report(results: dict, baseline: dict, regressions: list) -> None:
+    width = max(len(name) for name in results)
+    print(f"{'benchmark':<{width}}  {'mediana':>11}  {'mínimo':>11}  {'base':>11}  {'cambio':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        base_txt = f"{base['median'] * 1e3:9.3f}ms" if base else " " * 11
+        change = f"{(result['median'] / base['median'] - 1) * 100:+7.1f}%" if base else ""
+        flag = "  REGRESIÓN" if name in regressions else ""
+        print(f"{name:<{width}}  {result['median'] * 1e3:9.3f}ms  {result['min'] * 1e3:9.3f}ms  "
+              f"{base_txt}  {change:>8}{flag}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES),
+                        help="Números de mediciones a probar")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Mediciones por benchmark (se toma la mediana)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Regresión tolerada respecto a la base (0.25 = 25%%)")
+    parser.add_argument("--filter", default=None, help="Solo benchmarks cuyo nombre contenga esto")
+    parser.add_argument("--results-dir", default=RESULTS_DIR)
+    parser.add_argument("--save", action="store_true",
+                        help="Guarda esta corrida como nueva línea base")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    results_path = os.path.join(args.results_dir, f"{machine_id()}.json")
+    baseline = {}
+    if os.path.exists(results_path):
+        with open(results_path, "r") as f:
+            baseline = json.load(f)["benchmarks"]
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work_dir:
+        ctx = Context(work_dir)
+        suites = [("", reference_benchmarks(ctx))]
+        for n in args.sizes:
+            suites.append((f"[n={n}]", measurement_benchmarks(ctx, n)))
+        for suffix, benchmarks in suites:
+            for name, func in benchmarks.items():
+                full_name = name + suffix
+                if args.filter and args.filter not in full_name:
+                    continue
+                results[full_name] = measure(func, args.repeat)
+                print(f"  {full_name}: {results[full_name]['median'] * 1e3:.3f} ms", file=sys.stderr)
+        ctx.chart_cache.clear()
+
+    regressions = compare(results, baseline, args.threshold)
+    report(results, baseline, regressions)
+
+    if args.save or not baseline:
+        os.makedirs(args.results_dir, exist_ok=True)
+        with open(results_path, "w") as f:
+            json.dump({
+                "machine": machine_id(),
+                "commit": git_commit(),
+                "date": datetime.now().isoformat(timespec="seconds"),
+                "benchmarks": {**baseline, **results},
+            }, f, indent=2)
+        print(f"Línea base guardada en {results_path}")
+        return 0
+    if regressions:
+        print(f"{len(regressions)} benchmark(s) más lentos que la base en más de "
+              f"{args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Utilidades de crecimiento infantil (OMS) reutilizables fuera de la app de Streamlit."""
@@ -0,0 +1,361 @@
+"""
+Línea de comandos del paquete: ``python -m crecimiento <comando> ...``
+
+Comandos:
+    bundle   Convierte los Excel OMS de who_links.json en un paquete binario.
+    score    Calcula edad, IMC, z-scores y percentiles de una cohorte (CSV, Parquet o Arrow).
+    prefetch Descarga en paralelo todos los Excel OMS a la caché en disco.
+    grids    Precalcula rejillas densas de L, M, S para puntuar cohortes grandes.
+    analytics Velocidades, Δz y cruces de centiles entre visitas de una cohorte puntuada.
+    serve    Servicio HTTP de puntuación (JSON o Arrow) con varios procesos.
+    report   Informes PDF/PNG de crecimiento de los niños/as guardados, en paralelo.
+    convert  Convierte mediciones entre CSV, Parquet y Arrow con el esquema explícito.
+    memory   Bytes por columna de una cohorte, estándar y compacta, y bloques según un presupuesto.
+"""
+import argparse
+import json
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_LINKS = os.path.join(REPO_DIR, "who_links.json")
+DEFAULT_CACHE_DIR = os.path.join(REPO_DIR, "temp")
+DEFAULT_BUNDLE_DIR = os.path.join(REPO_DIR, "reference_bundle")
+DEFAULT_GRID_DIR = os.path.join(REPO_DIR, "reference_grids")
+DEFAULT_DB = os.environ.get("CRECIMIENTO_DB", os.path.join(REPO_DIR, "crecimiento.db"))
+
+
+def memory_size(text) -> int:
+    """Tamaño como '512M' o '2G' (argparse); compact importa pandas solo al usarlo."""
+    from crecimiento.compact import parse_size
+
+    return parse_size(text)
+
+
+def cmd_bundle(args) -> int:
+    from crecimiento.bundle import build_bundle
+    from crecimiento.cache import ReferenceCache
+
+    with open(args.links, "r") as f:
+        links_data = json.load(f)
+    cache = None if args.source_dir else ReferenceCache(args.cache_dir)
+    manifest = build_bundle(links_data, args.out, source_dir=args.source_dir,
+                            cache=cache, log=print)
+    print(f"Paquete escrito en {args.out} ({len(manifest['tables'])} tablas)")
+    return 0
+
+
+def cmd_score(args) -> int:
+    from crecimiento.cohort import score_file
+    from crecimiento.compact import MemoryBudgetError
+
+    with open(args.links, "r") as f:
+        links_data = json.load(f)
+    try:
+        result = score_file(args.input, args.output, links_data, bundle_dir=args.bundle_dir,
+                            cache_dir=args.cache_dir, source_dir=args.source_dir,
+                            chunksize=args.chunksize, workers=args.workers,
+                            grid_dir=args.grid_dir, where=args.where,
+                            memory_budget=args.memory_budget, id_col=args.id_col)
+    except MemoryBudgetError as e:
+        args.parser.error(str(e))
+    print(f"{result['rows']:,} filas en {result['seconds']:.2f} s "
+          f"({result['rows_per_second']:,.0f} filas/s, bloques de {result['chunksize']:,}) "
+          f"-> {args.output}")
+    return 0
+
+
+def cmd_prefetch(args) -> int:
+    from crecimiento.cache import ReferenceCache
+    from crecimiento.prefetch import make_session, prefetch_all
+
+    with open(args.links, "r") as f:
+        links_data = json.load(f)
+    session = make_session(pool_size=args.workers, retries=args.retries)
+    cache = ReferenceCache(args.cache_dir, session=session, timeout=args.timeout)
+    result = prefetch_all(links_data, cache, workers=args.workers, per_host=args.per_host, log=print)
+    return 1 if result["failed"] else 0
+
+
+def cmd_grids(args) -> int:
+    from crecimiento.bundle import ReferenceBundle, load_reference_frame
+    from crecimiento.cache import ReferenceCache
+    from crecimiento.lut import build_grids
+
+    with open(args.links, "r") as f:
+        links_data = json.load(f)
+    bundle = ReferenceBundle.open(args.bundle_dir) if args.bundle_dir else None
+    cache = None if args.source_dir else ReferenceCache(args.cache_dir)
+    manifest = build_grids(
+        links_data, args.out,
+        lambda url: load_reference_frame(url, bundle=bundle, cache=cache, source_dir=args.source_dir),
+        log=print)
+    print(f"Rejillas escritas en {args.out} ({len(manifest['grids'])} rejillas)")
+    return 0
+
+
+def cmd_analytics(args) -> int:
+    import time
+
+    from crecimiento.analytics import COL_ALERTA, child_summary, growth_analytics
+    from crecimiento.columnar import MeasurementWriter
+    from crecimiento.compact import CohortReader, MemoryBudgetError
+
+    start = time.perf_counter()
+    # Cohorte compacta; si no cabe en --memory-budget, por bloques de niños/as completos
+    try:
+        reader = CohortReader(args.input, id_col=args.id_col, where=args.where,
+                              memory_budget=args.memory_budget)
+    except MemoryBudgetError as e:
+        args.parser.error(str(e))
+    writer = MeasurementWriter(args.output)
+    # El resumen también por bloques, en el orden de aparición de los niños/as
+    summary_writer = MeasurementWriter(args.summary) if args.summary else None
+    rows = children = alerts = 0
+    try:
+        for chunk in reader:
+            result = growth_analytics(chunk, id_col=args.id_col,
+                                      min_interval_days=args.min_interval_days)
+            writer.write(result)
+            rows += len(result)
+            children += chunk[args.id_col].nunique()
+            alerts += int(result[COL_ALERTA].sum())
+            if summary_writer is not None:
+                summary_writer.write(child_summary(result, args.id_col))
+            # Liberar el bloque antes de leer el siguiente, no al reasignar las variables
+            del chunk, result
+    finally:
+        writer.close()
+        if summary_writer is not None:
+            summary_writer.close()
+    elapsed = time.perf_counter() - start
+    print(f"{rows:,} filas, {children:,} niños/as, {alerts:,} alertas de cruce "
+          f"({reader.chunks} bloque{'s' if reader.chunks > 1 else ''}) en {elapsed:.2f} s "
+          f"-> {args.output}")
+    return 0
+
+
+def cmd_memory(args) -> int:
+    from crecimiento.columnar import bounded_scan, to_frame
+    from crecimiento.compact import (ANALYTICS_WORKING_FACTOR, SAMPLE_ROWS, CohortReader,
+                                     MemoryBudgetError, format_size, memory_report)
+
+    try:
+        reader = CohortReader(args.input, id_col=args.id_col, where=args.where,
+                              memory_budget=args.memory_budget)
+    except MemoryBudgetError as e:
+        args.parser.error(str(e))
+    sample = reader.dataset.head(SAMPLE_ROWS, filter=reader.filter,
+                                 **bounded_scan(reader.dataset))
+    standard = memory_report(to_frame(sample), rows=reader.rows)
+    compact = memory_report(reader.sample, rows=reader.rows)
+    report = standard.merge(compact, on="Columna", how="left",
+                            suffixes=(" estándar", " compacto"))
+    print(report[["Columna", "Tipo estándar", "Bytes estándar", "Tipo compacto",
+                  "Bytes compacto"]].to_string(
+        index=False, formatters={"Bytes estándar": format_size, "Bytes compacto": format_size}))
+    total = reader.rows * reader.row_bytes
+    print(f"\n{reader.rows:,} filas (estimado con {len(reader.sample):,}): "
+          f"{format_size(standard['Bytes'].iloc[-1])} estándar, {format_size(total)} compacta; "
+          f"analytics necesita ~{format_size(total * ANALYTICS_WORKING_FACTOR)}.")
+    if args.memory_budget:
+        print(f"Con {format_size(args.memory_budget)}: {reader.chunks} "
+              f"bloque{'s' if reader.chunks > 1 else ''}.")
+    return 0
+
+
+def cmd_serve(args) -> int:
+    import uvicorn
+
+    # Cada proceso de uvicorn llama a crecimiento.service:app_from_env, que lee el entorno
+    for name, value in (("CRECIMIENTO_LINKS", args.links),
+                        ("CRECIMIENTO_BUNDLE_DIR", args.bundle_dir),
+                        ("CRECIMIENTO_GRID_DIR", args.grid_dir),
+                        ("CRECIMIENTO_SOURCE_DIR", args.source_dir),
+                        ("CRECIMIENTO_CACHE_DIR", args.cache_dir)):
+        if value:
+            os.environ[name] = value
+    uvicorn.run("crecimiento.service:app_from_env", factory=True, host=args.host, port=args.port,
+                workers=args.workers, log_level=args.log_level)
+    return 0
+
+
+def cmd_report(args) -> int:
+    from crecimiento.reports import generate_reports
+
+    with open(args.links, "r") as f:
+        links_data = json.load(f)
+    bundle_dir = args.bundle_dir if os.path.isdir(args.bundle_dir) else None
+    result = generate_reports(links_data, args.db, args.out, child_ids=args.children,
+                              fmt=args.format, bundle_dir=bundle_dir, cache_dir=args.cache_dir,
+                              score_types=args.score_types, workers=args.workers)
+    pages = sum(r["pages"] for r in result["reports"])
+    print(f"{len(result['reports'])} informes ({pages} páginas) en {result['seconds']:.2f} s "
+          f"({result['reports_per_second']:.1f} informes/s) -> {args.out}")
+    return 0
+
+
+def cmd_convert(args) -> int:
+    import time
+
+    from crecimiento.columnar import read_measurements, write_measurements
+
+    start = time.perf_counter()
+    df = read_measurements(args.input, columns=args.columns, where=args.where)
+    write_measurements(df, args.output, sort_by=args.sort_by, row_group_size=args.row_group_size)
+    elapsed = time.perf_counter() - start
+    print(f"{len(df):,} filas, {len(df.columns)} columnas en {elapsed:.2f} s -> {args.output}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m crecimiento",
+                                     description="Herramientas de crecimiento infantil (OMS).")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_bundle = sub.add_parser("bundle", help="Precompila los Excel OMS a un paquete binario.")
+    p_bundle.add_argument("--links", default=DEFAULT_LINKS, help="Ruta a who_links.json.")
+    p_bundle.add_argument("--out", default=DEFAULT_BUNDLE_DIR, help="Directorio de salida.")
+    p_bundle.add_argument("--source-dir", default=None,
+                          help="Directorio con los .xlsx locales (sin red).")
+    p_bundle.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                          help="Caché de descargas cuando no se usa --source-dir.")
+    p_bundle.set_defaults(func=cmd_bundle)
+
+    p_score = sub.add_parser("score", help="Puntúa una cohorte completa desde un CSV.")
+    p_score.add_argument("input", help="CSV, Parquet o Arrow con Sexo, Fecha de Nacimiento, Fecha "
+                                       "y mediciones.")
+    p_score.add_argument("-o", "--output", required=True, help="Salida .parquet, .arrow o .csv.")
+    p_score.add_argument("--links", default=DEFAULT_LINKS, help="Ruta a who_links.json.")
+    p_score.add_argument("--bundle-dir", default=DEFAULT_BUNDLE_DIR,
+                         help="Paquete precompilado de referencias (si existe).")
+    p_score.add_argument("--source-dir", default=None,
+                         help="Directorio con los .xlsx locales (sin red).")
+    p_score.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                         help="Caché de descargas cuando falta el paquete.")
+    p_score.add_argument("--chunksize", type=int, default=50_000, help="Filas por bloque.")
+    p_score.add_argument("--workers", type=int, default=None,
+                         help="Procesos (por defecto, uno por CPU; 1 = sin pool).")
+    p_score.add_argument("--grid-dir", default=None,
+                         help="Rejillas precalculadas (python -m crecimiento grids) en lugar "
+                              "de interpolar las tablas.")
+    p_score.add_argument("--where", action="append", default=None,
+                         help="Condición 'columna operador valor' (p. ej. \"Clínica == Norte\"); "
+                              "se puede repetir. En Parquet/Arrow se aplica al leer.")
+    p_score.add_argument("--memory-budget", type=memory_size, default=None,
+                         help="Memoria máxima (p. ej. 2G) para los bloques en vuelo; fija "
+                              "--chunksize según los bytes por fila de una muestra.")
+    p_score.add_argument("--id-col", default=None,
+                         help="Columna que identifica a cada niño/a: valida además fechas "
+                              "repetidas y descensos de estatura entre visitas del mismo bloque.")
+    p_score.set_defaults(func=cmd_score, parser=p_score)
+
+    p_prefetch = sub.add_parser("prefetch", help="Descarga todo el catálogo OMS a la caché.")
+    p_prefetch.add_argument("--links", default=DEFAULT_LINKS, help="Ruta a who_links.json.")
+    p_prefetch.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Directorio de la caché.")
+    p_prefetch.add_argument("--workers", type=int, default=8, help="Descargas simultáneas.")
+    p_prefetch.add_argument("--per-host", type=int, default=4,
+                            help="Máximo de conexiones simultáneas por host.")
+    p_prefetch.add_argument("--retries", type=int, default=3,
+                            help="Reintentos con espera exponencial por archivo.")
+    p_prefetch.add_argument("--timeout", type=float, default=30, help="Timeout por petición (s).")
+    p_prefetch.set_defaults(func=cmd_prefetch)
+
+    p_grids = sub.add_parser("grids", help="Precalcula rejillas densas de L, M, S (float32).")
+    p_grids.add_argument("--links", default=DEFAULT_LINKS, help="Ruta a who_links.json.")
+    p_grids.add_argument("--out", default=DEFAULT_GRID_DIR, help="Directorio de salida.")
+    p_grids.add_argument("--bundle-dir", default=DEFAULT_BUNDLE_DIR,
+                         help="Paquete precompilado de referencias (si existe).")
+    p_grids.add_argument("--source-dir", default=None,
+                         help="Directorio con los .xlsx locales (sin red).")
+    p_grids.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                         help="Caché de descargas cuando falta el paquete.")
+    p_grids.set_defaults(func=cmd_grids)
+
+    p_analytics = sub.add_parser("analytics",
+                                 help="Velocidades y cruces de centiles de una cohorte puntuada.")
+    p_analytics.add_argument("input", help="Salida de 'score' (.parquet, .arrow o .csv).")
+    p_analytics.add_argument("-o", "--output", required=True, help="Salida .parquet, .arrow o .csv.")
+    p_analytics.add_argument("--id-col", required=True,
+                             help="Columna que identifica a cada niño/a.")
+    p_analytics.add_argument("--summary", default=None,
+                             help="Resumen por niño/a (.csv, .parquet o .arrow), opcional.")
+    p_analytics.add_argument("--min-interval-days", type=int, default=14,
+                             help="Intervalo mínimo entre visitas para calcular velocidades.")
+    p_analytics.add_argument("--where", action="append", default=None,
+                             help="Condición 'columna operador valor' (p. ej. \"Clínica == Norte\"); "
+                                  "se puede repetir. En Parquet/Arrow se aplica al leer.")
+    p_analytics.add_argument("--memory-budget", type=memory_size, default=None,
+                             help="Memoria máxima (p. ej. 4G): si la cohorte no cabe se procesa "
+                                  "por bloques de niños/as completos.")
+    p_analytics.set_defaults(func=cmd_analytics, parser=p_analytics)
+
+    p_memory = sub.add_parser("memory",
+                              help="Bytes por columna de una cohorte, estándar y compacta.")
+    p_memory.add_argument("input", help="Archivo .csv, .parquet o .arrow/.feather.")
+    p_memory.add_argument("--id-col", default=None,
+                          help="Columna que identifica a cada niño/a (categórica).")
+    p_memory.add_argument("--where", action="append", default=None,
+                          help="Condición 'columna operador valor'; se puede repetir.")
+    p_memory.add_argument("--memory-budget", type=memory_size, default=None,
+                          help="Presupuesto (p. ej. 4G) para calcular los bloques de analytics.")
+    p_memory.set_defaults(func=cmd_memory, parser=p_memory)
+
+    p_serve = sub.add_parser("serve", help="Servicio HTTP de puntuación (ver crecimiento/service.py).")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=8000)
+    p_serve.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                         help="Procesos de uvicorn (cada uno con las referencias en memoria).")
+    p_serve.add_argument("--links", default=DEFAULT_LINKS, help="Ruta a who_links.json.")
+    p_serve.add_argument("--bundle-dir", default=DEFAULT_BUNDLE_DIR,
+                         help="Paquete precompilado de referencias (si existe).")
+    p_serve.add_argument("--grid-dir", default=None, help="Rejillas precalculadas (opcional).")
+    p_serve.add_argument("--source-dir", default=None,
+                         help="Directorio con los .xlsx locales (sin red).")
+    p_serve.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                         help="Caché de descargas cuando falta el paquete.")
+    p_serve.add_argument("--log-level", default="warning")
+    p_serve.set_defaults(func=cmd_serve)
+
+    p_report = sub.add_parser("report", help="Informes de crecimiento por niño/a (PDF o PNG).")
+    p_report.add_argument("-o", "--out", required=True, help="Directorio de salida.")
+    p_report.add_argument("--db", default=DEFAULT_DB, help="Base SQLite de mediciones.")
+    p_report.add_argument("--children", type=int, nargs="+", default=None,
+                          help="Ids de los niños/as (por defecto, todos los de la base).")
+    p_report.add_argument("--format", choices=["pdf", "png"], default="pdf",
+                          help="PDF de varias páginas o un PNG por página.")
+    p_report.add_argument("--score-types", nargs="+", choices=["z", "p"], default=["z", "p"],
+                          help="Gráficas de z-scores, de percentiles o ambas.")
+    p_report.add_argument("--workers", type=int, default=None,
+                          help="Procesos (por defecto, uno por CPU; 1 = sin pool).")
+    p_report.add_argument("--links", default=DEFAULT_LINKS, help="Ruta a who_links.json.")
+    p_report.add_argument("--bundle-dir", default=DEFAULT_BUNDLE_DIR,
+                          help="Paquete precompilado de referencias (si existe).")
+    p_report.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                          help="Caché de descargas cuando falta el paquete.")
+    p_report.set_defaults(func=cmd_report)
+
+    p_convert = sub.add_parser("convert", help="Convierte mediciones entre CSV, Parquet y Arrow.")
+    p_convert.add_argument("input", help="Archivo .csv, .parquet o .arrow/.feather.")
+    p_convert.add_argument("output", help="Archivo .csv, .parquet o .arrow/.feather.")
+    p_convert.add_argument("--columns", nargs="+", default=None, help="Solo estas columnas.")
+    p_convert.add_argument("--where", action="append", default=None,
+                           help="Condición 'columna operador valor' (p. ej. \"Clínica == Norte\"); "
+                                "se puede repetir. En Parquet/Arrow se aplica al leer.")
+    p_convert.add_argument("--sort-by", nargs="+", default=None,
+                           help="Ordena por estas columnas (p. ej. la clínica) para que los "
+                                "filtros por ellas lean solo sus grupos de filas.")
+    p_convert.add_argument("--row-group-size", type=int, default=64_000,
+                           help="Filas por grupo de Parquet / lote de Arrow.")
+    p_convert.set_defaults(func=cmd_convert)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+Analítica de seguimiento entre visitas: velocidad de crecimiento, cambio de
+z-score y cruces de líneas de centiles mayores, para un niño/a o una cohorte.
+
+Todo se calcula en bloque sobre la tabla ordenada por (niño/a, fecha): cada
+medición se compara con la medición válida anterior del mismo niño/a, que se
+obtiene con un acumulado de posiciones (``np.maximum.accumulate``) y una
+máscara de "misma persona", sin bucles por niño/a. Así una cohorte de
+millones de mediciones se procesa en segundos.
+
+Líneas de centiles mayores: las de las gráficas OMS/UK-WHO, separadas por
+2/3 de DE (P0.4, P2, P9, P25, P50, P75, P91, P98, P99.6). Cruzar dos o más
+líneas entre visitas consecutivas es el criterio habitual de alerta por
+caída (o subida) en la curva.
+"""
+import numpy as np
+import pandas as pd
+
+from crecimiento.columnar import to_datetime
+from crecimiento.core import indicator_map_es
+from crecimiento.zscore import DAYS_PER_MONTH
+
+# z-score de las líneas de centiles mayores (P0.4 ... P99.6)
+MAJOR_CENTILE_Z = np.array([-8, -6, -4, -2, 0, 2, 4, 6, 8], dtype="float64") / 3
+# Líneas cruzadas (en valor absoluto) a partir de las que se marca la alerta
+CROSSING_ALERT_LINES = 2
+# Intervalo mínimo entre visitas para calcular velocidades (con menos, el
+# error de medición domina la diferencia)
+MIN_INTERVAL_DAYS = 14
+
+VELOCITY_COLUMNS = {
+    "Peso (kg)": "Velocidad peso (kg/mes)",
+    "Estatura (cm)": "Velocidad estatura (cm/mes)",
+    "Perímetro Cefálico (cm)": "Velocidad perímetro cefálico (cm/mes)",
+}
+COL_ALERTA = "Alerta de cruce de centiles"
+
+
+def z_column(indicator_es: str) -> str:
+    """Nombre de la columna de z-score de un indicador (como en cohort.score_frame)."""
+    return f"Z-score ({indicator_es})"
+
+
+def previous_valid(codes: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    Para filas ya ordenadas por (niño/a, fecha), posición de la fila válida
+    anterior del mismo niño/a, o -1 si no hay.
+    """
+    n = len(codes)
+    last = np.maximum.accumulate(np.where(valid, np.arange(n), -1))
+    prev = np.empty(n, dtype=np.int64)
+    prev[0] = -1
+    prev[1:] = last[:-1]
+    same = prev >= 0
+    same[same] = codes[prev[same]] == codes[same]
+    return np.where(same, prev, -1)
+
+
+def centile_band(z: np.ndarray) -> np.ndarray:
+    """Cantidad de líneas de centiles mayores por debajo de 'z' (NaN si falta z)."""
+    band = np.searchsorted(MAJOR_CENTILE_Z, z, side="right").astype("float64")
+    return np.where(np.isnan(z), np.nan, band)
+
+
+def growth_analytics(df: pd.DataFrame, id_col: str = None, date_col: str = "Fecha",
+                     min_interval_days: int = MIN_INTERVAL_DAYS) -> pd.DataFrame:
+    """
+    Copia de 'df' (mismo orden e índice) con, por cada medición respecto de la
+    anterior del mismo niño/a:
+    - "Días desde la visita anterior".
+    - Velocidad de peso, estatura y perímetro cefálico por mes (VELOCITY_COLUMNS).
+    - "Δz (<indicador>)" y "Líneas cruzadas (<indicador>)" (con signo) para cada
+      columna "Z-score (<indicador>)" presente.
+    - COL_ALERTA: alguna caída o subida de CROSSING_ALERT_LINES o más líneas.
+    'id_col' identifica a cada niño/a (None = todas las filas son del mismo).
+    """
+    out = df.copy()
+    n = len(out)
+    if n == 0:
+        return out
+    fecha = to_datetime(out[date_col])
+    days = (fecha - pd.Timestamp("1970-01-01")).dt.days.to_numpy(dtype="float64")
+    if id_col is None:
+        codes = np.zeros(n, dtype=np.int64)
+    else:
+        codes = pd.factorize(out[id_col], use_na_sentinel=True)[0].astype(np.int64)
+    # Filas sin fecha (o sin id) no tienen anterior ni sirven de anterior
+    has_date = ~np.isnan(days) & (codes >= 0)
+    order = np.lexsort((np.where(has_date, days, np.inf), codes))
+    codes_s, days_s = codes[order], days[order]
+
+    def per_row(valid_sorted):
+        """(anterior válida de cada fila ordenada, días desde esa anterior)."""
+        prev = previous_valid(codes_s, valid_sorted & has_date[order])
+        prev[~has_date[order]] = -1
+        interval = np.where(prev >= 0, days_s - days_s[np.maximum(prev, 0)], np.nan)
+        return prev, interval
+
+    def scatter(values_sorted):
+        result = np.empty(n, dtype="float64")
+        result[order] = values_sorted
+        return result
+
+    _, interval = per_row(np.ones(n, dtype=bool))
+    out["Días desde la visita anterior"] = scatter(interval)
+
+    for col, vel_col in VELOCITY_COLUMNS.items():
+        if col not in out.columns:
+            continue
+        values = pd.to_numeric(out[col], errors="coerce").to_numpy(dtype="float64")[order]
+        prev, interval = per_row(~np.isnan(values))
+        delta = values - values[np.maximum(prev, 0)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            velocity = np.where((prev >= 0) & (interval >= min_interval_days),
+                                delta / (interval / DAYS_PER_MONTH), np.nan)
+        out[vel_col] = scatter(velocity)
+
+    alert = np.zeros(n, dtype=bool)
+    for indicator_es in indicator_map_es:
+        z_col = z_column(indicator_es)
+        if z_col not in out.columns:
+            continue
+        z = pd.to_numeric(out[z_col], errors="coerce").to_numpy(dtype="float64")[order]
+        prev, _ = per_row(~np.isnan(z))
+        has_prev = prev >= 0
+        z_prev = z[np.maximum(prev, 0)]
+        band = centile_band(z)
+        crossed = np.where(has_prev, band - band[np.maximum(prev, 0)], np.nan)
+        out[f"Δz ({indicator_es})"] = scatter(np.where(has_prev, z - z_prev, np.nan))
+        out[f"Líneas cruzadas ({indicator_es})"] = pd.array(scatter(crossed)).astype("Int64")
+        alert[order] |= np.abs(np.nan_to_num(crossed)) >= CROSSING_ALERT_LINES
+    out[COL_ALERTA] = alert
+    return out
+
+
+def child_summary(analytics: pd.DataFrame, id_col: str) -> pd.DataFrame:
+    """
+    Resumen por niño/a de growth_analytics(): visitas, mayor caída y mayor
+    subida en líneas de centiles por indicador y si tuvo alguna alerta.
+    """
+    grouped = analytics.groupby(id_col, sort=True)
+    summary = {"Visitas": grouped.size(), COL_ALERTA: grouped[COL_ALERTA].any()}
+    for indicator_es in indicator_map_es:
+        col = f"Líneas cruzadas ({indicator_es})"
+        if col in analytics.columns:
+            summary[f"Mayor caída ({indicator_es})"] = grouped[col].min()
+            summary[f"Mayor subida ({indicator_es})"] = grouped[col].max()
+    return pd.DataFrame(summary).reset_index()
@@ -0,0 +1,163 @@
+"""
+Paquete binario precompilado con las tablas de referencia OMS.
+
+Cada Excel de who_links.json se convierte una sola vez en un arreglo ``.npy``
+(orden por columnas, float64, mapeable en memoria) más un ``manifest.json`` con
+los nombres y tipos originales de las columnas. Cargar una tabla desde el
+paquete evita ``pd.read_excel``/openpyxl en cada rerun.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.cache import atomic_write, url_filename
+
+MANIFEST_FILENAME = "manifest.json"
+BUNDLE_VERSION = 1
+
+
+def iter_reference_links(links_data: dict):
+    """Recorre who_links.json como tuplas (indicador, tipo, sexo, rango, url)."""
+    for indicator, by_score in links_data.items():
+        for score_type, by_gender in by_score.items():
+            for gender_key, by_range in by_gender.items():
+                for age_range, url in by_range.items():
+                    yield indicator, score_type, gender_key, age_range, url
+
+
+def table_name(indicator: str, score_type: str, gender_key: str, age_range: str) -> str:
+    """Nombre de archivo (sin extensión) de una tabla dentro del paquete."""
+    return f"{indicator}__{score_type}__{gender_key}__{age_range}"
+
+
+def frame_to_array(df: pd.DataFrame):
+    """Convierte un DataFrame OMS a (arreglo float64 por columnas, columnas, tipos)."""
+    columns = [str(c) for c in df.columns]
+    numeric = df.apply(pd.to_numeric, errors="coerce")
+    dtypes = ["int64" if pd.api.types.is_integer_dtype(numeric[c]) else "float64"
+              for c in numeric.columns]
+    array = np.asfortranarray(numeric.to_numpy(dtype="float64"))
+    return array, columns, dtypes
+
+
+def build_bundle(links_data: dict, out_dir: str, source_dir: str = None, cache=None,
+                 log=None) -> dict:
+    """
+    Convierte todos los Excel de 'links_data' al paquete en 'out_dir'.
+
+    Si se indica 'source_dir' se leen los .xlsx locales (nombrados como en la
+    URL, sin la query); si no, se obtienen a través de 'cache' (ReferenceCache).
+    Devuelve el manifiesto escrito.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    tables = {}
+    for indicator, score_type, gender_key, age_range, url in iter_reference_links(links_data):
+        if source_dir is not None:
+            xlsx_path = os.path.join(source_dir, url_filename(url))
+        else:
+            xlsx_path = cache.fetch(url)
+        if not os.path.exists(xlsx_path):
+            if log:
+                log(f"Omitido (no existe): {xlsx_path}")
+            continue
+
+        with open(xlsx_path, "rb") as f:
+            source_sha256 = hashlib.sha256(f.read()).hexdigest()
+        df = pd.read_excel(xlsx_path, sheet_name=0)
+        array, columns, dtypes = frame_to_array(df)
+
+        name = table_name(indicator, score_type, gender_key, age_range)
+        np.save(os.path.join(out_dir, name + ".npy"), array)
+        tables[name] = {
+            "file": name + ".npy",
+            "indicator": indicator,
+            "score_type": score_type,
+            "gender": gender_key,
+            "age_range": age_range,
+            "url": url,
+            "source_sha256": source_sha256,
+            "columns": columns,
+            "dtypes": dtypes,
+            "rows": int(array.shape[0]),
+        }
+        if log:
+            log(f"{name}: {array.shape[0]} filas")
+
+    manifest = {"version": BUNDLE_VERSION, "tables": tables}
+    data = json.dumps(manifest, indent=2, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    atomic_write(os.path.join(out_dir, MANIFEST_FILENAME), data)
+    return manifest
+
+
+class ReferenceBundle:
+    """Lectura de un paquete generado por build_bundle()."""
+
+    def __init__(self, directory: str, manifest: dict):
+        self.directory = directory
+        self.manifest = manifest
+        self._by_url = {t["url"]: name for name, t in manifest["tables"].items()}
+        self._arrays = {}
+
+    @classmethod
+    def open(cls, directory: str):
+        """Abre el paquete en 'directory'; devuelve None si no existe o es de otra versión."""
+        try:
+            with open(os.path.join(directory, MANIFEST_FILENAME), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != BUNDLE_VERSION:
+            return None
+        return cls(directory, manifest)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._by_url
+
+    def load_array(self, name: str) -> np.ndarray:
+        """Arreglo mapeado en memoria (solo lectura) de la tabla 'name'."""
+        array = self._arrays.get(name)
+        if array is None:
+            path = os.path.join(self.directory, self.manifest["tables"][name]["file"])
+            array = self._arrays[name] = np.load(path, mmap_mode="r")
+        return array
+
+    def load(self, url: str) -> pd.DataFrame:
+        """
+        DataFrame con las columnas originales del Excel para 'url'.
+        Devuelve None si la URL (con su versión sfvrsn) no está en el paquete.
+        """
+        name = self._by_url.get(url)
+        if name is None:
+            return None
+        meta = self.manifest["tables"][name]
+        array = self.load_array(name)
+        # Sin copias: las columnas float64 quedan como vistas del .npy mapeado
+        return pd.DataFrame({
+            col: array[:, i].astype(dtype, copy=False)
+            for i, (col, dtype) in enumerate(zip(meta["columns"], meta["dtypes"]))
+        }, copy=False)
+
+
+def load_reference_frame(url: str, bundle: ReferenceBundle = None, cache=None,
+                         source_dir: str = None) -> pd.DataFrame:
+    """
+    Tabla OMS original para 'url': del paquete si la contiene; si no, del
+    .xlsx local en 'source_dir' o descargado a través de 'cache'.
+    Devuelve None si no hay ninguna fuente disponible.
+    """
+    if bundle is not None:
+        df = bundle.load(url)
+        if df is not None:
+            return df
+    if source_dir is not None:
+        xlsx_path = os.path.join(source_dir, url_filename(url))
+    elif cache is not None:
+        xlsx_path = cache.fetch(url)
+    else:
+        return None
+    if not os.path.exists(xlsx_path):
+        return None
+    return pd.read_excel(xlsx_path, sheet_name=0)
@@ -0,0 +1,210 @@
+"""
+Caché persistente en disco para los Excel de referencia OMS.
+
+Cada URL (incluida la etiqueta de versión ``sfvrsn``) se guarda bajo una clave
+derivada de su hash, de modo que un cambio de versión produce una entrada nueva.
+Los aciertos se sirven directamente desde disco; solo cuando vence el TTL se
+revalida con ``ETag``/``Last-Modified``. Las escrituras son atómicas y las
+entradas menos usadas recientemente se eliminan al superar el presupuesto de bytes.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+DEFAULT_TTL = 7 * 24 * 3600          # segundos antes de revalidar
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024  # presupuesto total de la caché
+INDEX_FILENAME = "index.json"
+
+
+def url_key(url: str) -> str:
+    """Clave estable (sha256) para una URL completa, incluida su query."""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def url_filename(url: str) -> str:
+    """Nombre de archivo de la URL, sin parámetros de consulta."""
+    return url.split("/")[-1].split("?")[0]
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Escribe en un temporal del mismo directorio y lo renombra sobre 'path'."""
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class ReferenceCache:
+    """Caché LRU en disco, con revalidación HTTP condicional tras 'ttl' segundos."""
+
+    def __init__(self, directory: str, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, session=None, timeout: float = 30):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.session = session
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "revalidated": 0,
+                          "not_modified": 0, "stale_served": 0,
+                          "network_calls": 0, "evictions": 0}
+        os.makedirs(self.directory, exist_ok=True)
+        self._index = self._load_index()
+
+    #######################################
+    # ÍNDICE
+    #######################################
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, INDEX_FILENAME)
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Descartamos entradas cuyo archivo ya no existe
+        return {k: v for k, v in index.items()
+                if os.path.exists(os.path.join(self.directory, v["filename"]))}
+
+    def _save_index(self) -> None:
+        data = json.dumps(self._index, indent=2, sort_keys=True).encode("utf-8")
+        atomic_write(self.index_path, data)
+
+    #######################################
+    # API PÚBLICA
+    #######################################
+    def path_for(self, url: str) -> str:
+        """Ruta local donde se guarda (o guardaría) el contenido de 'url'."""
+        return os.path.join(self.directory, f"{url_key(url)[:16]}_{url_filename(url)}")
+
+    def fetch(self, url: str) -> str:
+        """
+        Devuelve la ruta local del archivo para 'url'.
+        Solo hace una petición de red si no está en caché o si venció el TTL.
+        """
+        key = url_key(url)
+        path = self.path_for(url)
+        with self._lock:
+            entry = self._index.get(key)
+            now = time.time()
+            if entry is not None and os.path.exists(path):
+                entry["last_access"] = now  # solo en memoria; se persiste en la próxima escritura
+                if now - entry["fetched_at"] < self.ttl:
+                    self._counters["hits"] += 1
+                    return path
+                headers = {}
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+            else:
+                entry = None
+                headers = {}
+                self._counters["misses"] += 1
+
+        # La red queda fuera del lock para no serializar descargas concurrentes
+        if entry is None:
+            response = self._get(url)
+            response.raise_for_status()
+            return self._store(url, key, response)
+        return self._revalidate(url, key, headers)
+
+    def stats(self) -> dict:
+        """Contadores de aciertos/fallos y tamaño actual de la caché."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._index)
+            stats["bytes"] = sum(e["size"] for e in self._index.values())
+        return stats
+
+    def clear(self) -> None:
+        """Elimina todas las entradas de la caché."""
+        with self._lock:
+            for entry in self._index.values():
+                path = os.path.join(self.directory, entry["filename"])
+                if os.path.exists(path):
+                    os.remove(path)
+            self._index = {}
+            self._save_index()
+
+    #######################################
+    # INTERNOS
+    #######################################
+    def _get(self, url: str, headers: dict = None):
+        import requests
+
+        with self._lock:
+            self._counters["network_calls"] += 1
+        getter = self.session.get if self.session is not None else requests.get
+        return getter(url, headers=headers or {}, verify=False, timeout=self.timeout)
+
+    def _revalidate(self, url: str, key: str, headers: dict) -> str:
+        import requests
+
+        try:
+            response = self._get(url, headers)
+            if response.status_code != 304:
+                response.raise_for_status()
+        except requests.RequestException:
+            # Sin red: mejor servir la copia vencida que fallar
+            with self._lock:
+                self._counters["stale_served"] += 1
+            return self.path_for(url)
+        if response.status_code == 304:
+            with self._lock:
+                self._counters["not_modified"] += 1
+                if key in self._index:
+                    self._index[key]["fetched_at"] = time.time()
+                    self._save_index()
+            return self.path_for(url)
+        with self._lock:
+            self._counters["revalidated"] += 1
+        return self._store(url, key, response)
+
+    def _store(self, url: str, key: str, response) -> str:
+        path = self.path_for(url)
+        content = response.content
+        atomic_write(path, content)
+        now = time.time()
+        with self._lock:
+            self._index[key] = {
+                "url": url,
+                "filename": os.path.basename(path),
+                "size": len(content),
+                "sha256": hashlib.sha256(content).hexdigest(),
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": now,
+                "last_access": now,
+            }
+            self._evict(keep=key)
+            self._save_index()
+        return path
+
+    def _evict(self, keep: str) -> None:
+        total = sum(e["size"] for e in self._index.values())
+        lru_order = sorted(self._index.items(), key=lambda item: item[1]["last_access"])
+        for key, entry in lru_order:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            path = os.path.join(self.directory, entry["filename"])
+            if os.path.exists(path):
+                os.remove(path)
+            total -= entry["size"]
+            del self._index[key]
+            self._counters["evictions"] += 1
@@ -0,0 +1,217 @@
+"""
+Gráficas de crecimiento con la capa de referencia OMS en caché.
+
+Las curvas OMS (SD o percentiles) solo dependen de (indicador, tipo, sexo,
+rango de edad), así que se dibujan una vez por clave sobre un lienzo Agg y se
+guarda el fondo rasterizado. En cada rerun se restaura ese fondo y solo se
+dibujan encima la serie del niño/a y la leyenda (blitting), de modo que el
+costo por rerun no depende de cuántas filas tenga la tabla de referencia.
+
+Se usa ``matplotlib.figure.Figure`` directamente (sin pyplot), así las figuras
+no quedan registradas globalmente y se liberan al salir de la caché.
+matplotlib se importa al crear la primera figura, no al importar el módulo.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+ZSCORE_CURVES = {
+    "ZScore_-3": ("-3 SD", "red"),
+    "ZScore_-2": ("-2 SD", "orange"),
+    "ZScore_-1": ("-1 SD", "yellow"),
+    "ZScore_0":  ("0 SD", "green"),
+    "ZScore_+1": ("+1 SD", "yellow"),
+    "ZScore_+2": ("+2 SD", "orange"),
+    "ZScore_+3": ("+3 SD", "red"),
+}
+PERCENTILE_CURVES = {
+    "P3": ("P3", "red"),
+    "P5": ("P5", "orange"),
+    "P50": ("P50", "green"),
+    "P85": ("P85", "orange"),
+    "P97": ("P97", "red"),
+}
+
+FIGSIZE = (8, 5)
+DPI = 100
+
+
+def _as_float(values) -> np.ndarray:
+    return pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64")
+
+
+def draw_reference_curves(ax, df_ref: pd.DataFrame, x_col: str, score_type: str) -> list:
+    """Dibuja las curvas OMS en 'ax' y devuelve sus artistas (para la leyenda)."""
+    curves = ZSCORE_CURVES if score_type == "z" else PERCENTILE_CURVES
+    x_ref = df_ref[x_col]
+    handles = []
+    for key, (label, color) in curves.items():
+        if key in df_ref.columns:
+            line, = ax.plot(x_ref, df_ref[key], linestyle="--", color=color, label=label)
+            handles.append(line)
+    return handles
+
+
+def new_figure(title: str, xlabel: str, ylabel: str):
+    """Figura Agg independiente de pyplot con título y ejes."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return fig, ax
+
+
+def close_figure(fig) -> None:
+    """Libera los artistas de una figura que ya no se usará."""
+    fig.clear()
+
+
+class ReferenceLayer:
+    """Fondo rasterizado de las curvas OMS para una clave concreta."""
+
+    def __init__(self, df_ref: pd.DataFrame, x_col: str, score_type: str,
+                 title: str, xlabel: str, ylabel: str):
+        self.fig, self.ax = new_figure(title, xlabel, ylabel)
+        self.handles = draw_reference_curves(self.ax, df_ref, x_col, score_type)
+        # Límites fijos: el fondo solo es válido mientras no cambien
+        self.ax.set_xlim(self.ax.get_xlim())
+        self.ax.set_ylim(self.ax.get_ylim())
+        self.fig.tight_layout()
+        self.fig.canvas.draw()
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.lock = threading.Lock()
+
+    def contains(self, x: np.ndarray, y: np.ndarray) -> bool:
+        """True si todos los puntos válidos caen dentro de los límites del fondo."""
+        valid = ~(np.isnan(x) | np.isnan(y))
+        if not valid.any():
+            return True
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        x, y = x[valid], y[valid]
+        return bool((x >= x0).all() and (x <= x1).all() and (y >= y0).all() and (y <= y1).all())
+
+    def render(self, x: np.ndarray, y: np.ndarray, label: str, color: str) -> np.ndarray:
+        """Imagen RGBA: fondo en caché + serie del niño/a + leyenda."""
+        with self.lock:
+            canvas = self.fig.canvas
+            canvas.restore_region(self.background)
+            line, = self.ax.plot(x, y, "o-", color=color, label=label)
+            legend = self.ax.legend(handles=self.handles + [line])
+            try:
+                self.ax.draw_artist(line)
+                self.ax.draw_artist(legend)
+                return np.asarray(canvas.buffer_rgba()).copy()
+            finally:
+                line.remove()
+                legend.remove()
+
+    def close(self) -> None:
+        with self.lock:
+            close_figure(self.fig)
+
+
+def render_full(df_ref: pd.DataFrame, x_col: str, score_type: str, title: str, xlabel: str,
+                ylabel: str, x: np.ndarray, y: np.ndarray, label: str, color: str) -> np.ndarray:
+    """Camino lento: figura completa (se usa si la serie sale de los límites del fondo)."""
+    fig, ax = new_figure(title, xlabel, ylabel)
+    try:
+        handles = draw_reference_curves(ax, df_ref, x_col, score_type)
+        line, = ax.plot(x, y, "o-", color=color, label=label)
+        ax.legend(handles=handles + [line])
+        fig.tight_layout()
+        fig.canvas.draw()
+        return np.asarray(fig.canvas.buffer_rgba()).copy()
+    finally:
+        close_figure(fig)
+
+
+class ChartCache:
+    """Capas de referencia por clave, con desalojo LRU y cierre explícito de figuras."""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._layers = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "full_renders": 0}
+
+    def layer(self, key, df_ref: pd.DataFrame, x_col: str, score_type: str,
+              title: str, xlabel: str, ylabel: str) -> ReferenceLayer:
+        with self._lock:
+            layer = self._layers.get(key)
+            if layer is not None:
+                self._layers.move_to_end(key)
+                self._counters["hits"] += 1
+                return layer
+            self._counters["misses"] += 1
+        layer = ReferenceLayer(df_ref, x_col, score_type, title, xlabel, ylabel)
+        with self._lock:
+            existing = self._layers.get(key)
+            if existing is not None:
+                layer.close()
+                return existing
+            self._layers[key] = layer
+            while len(self._layers) > self.max_entries:
+                _, evicted = self._layers.popitem(last=False)
+                evicted.close()
+        return layer
+
+    def render(self, key, df_ref: pd.DataFrame, x_col: str, score_type: str, title: str,
+               xlabel: str, ylabel: str, child_x, child_y, label: str, color: str) -> np.ndarray:
+        """Imagen RGBA de la gráfica completa, reutilizando el fondo de 'key'."""
+        x, y = _as_float(child_x), _as_float(child_y)
+        layer = self.layer(key, df_ref, x_col, score_type, title, xlabel, ylabel)
+        if layer.contains(x, y):
+            return layer.render(x, y, label, color)
+        with self._lock:
+            self._counters["full_renders"] += 1
+        return render_full(df_ref, x_col, score_type, title, xlabel, ylabel, x, y, label, color)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["layers"] = len(self._layers)
+        return stats
+
+    def clear(self) -> None:
+        with self._lock:
+            for layer in self._layers.values():
+                layer.close()
+            self._layers.clear()
+
+
+def render_concurrently(func, tasks, max_workers: int = None):
+    """
+    Ejecuta func(tarea) para todas las tareas en un pool de hilos (carga de
+    datos y dibujo Agg de figuras independientes), conservando el orden.
+
+    Devuelve ([(resultado, error), ...], tiempos) donde tiempos tiene el total
+    de pared ('wall'), la tarea más lenta ('slowest') y la suma ('total').
+    """
+    def timed(task):
+        start = time.perf_counter()
+        try:
+            return func(task), None, time.perf_counter() - start
+        except Exception as e:
+            return None, e, time.perf_counter() - start
+
+    start = time.perf_counter()
+    workers = max_workers or min(len(tasks), (os.cpu_count() or 1) + 4) or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        outcomes = list(pool.map(timed, tasks))
+    durations = [d for _, _, d in outcomes]
+    timing = {
+        "wall": time.perf_counter() - start,
+        "slowest": max(durations, default=0.0),
+        "total": sum(durations),
+    }
+    return [(result, error) for result, error, _ in outcomes], timing
@@ -0,0 +1,219 @@
+"""
+Puntuación por lotes de cohortes completas (``python -m crecimiento score``).
+
+El archivo de entrada (CSV, Parquet o Arrow) tiene una fila por medición con,
+al menos, las columnas ``Sexo`` (Niño/Niña), ``Fecha de Nacimiento`` y
+``Fecha``, más las mediciones que haya (``Peso (kg)``, ``Estatura (cm)``,
+``Perímetro Cefálico (cm)``). El archivo se lee por bloques, cada bloque se
+puntúa en un pool de procesos y los resultados se escriben en el mismo orden
+de entrada, con memoria acotada (``--memory-budget`` fija el tamaño de bloque).
+"""
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.bundle import ReferenceBundle, load_reference_frame
+from crecimiento.cache import ReferenceCache
+from crecimiento.columnar import MeasurementWriter, file_format, iter_measurements
+from crecimiento.compact import MIN_CHUNK_ROWS, SAMPLE_ROWS, MemoryBudgetError, format_size
+from crecimiento.core import indicator_map_es, calcular_edad_meses_vec, calcular_imc_vec
+from crecimiento.lut import GridSet
+from crecimiento.stitch import stitch_reference
+from crecimiento.validation import annotate
+from crecimiento.zscore import INDICATOR_SPECS, LMSTable, score_indicator, zscore_to_percentile
+
+COL_SEXO = "Sexo"
+COL_NACIMIENTO = "Fecha de Nacimiento"
+COL_FECHA = "Fecha"
+MEASUREMENT_COLUMNS = ["Peso (kg)", "Estatura (cm)", "Perímetro Cefálico (cm)"]
+GENDER_KEYS = {"Niño": "boys", "Niña": "girls", "boys": "boys", "girls": "girls"}
+
+DEFAULT_CHUNKSIZE = 50_000
+# Bytes por fila que añade score_frame: edades, IMC y z-score/percentil por indicador
+# (float64) y las banderas de calidad (máscara int32 y código de categoría)
+SCORED_ROW_BYTES = 8 * (3 + 2 * len(indicator_map_es)) + 8
+
+
+class ReferenceTables:
+    """Tablas LMS (z-scores) continuas, cargadas bajo demanda y memorizadas por indicador y sexo."""
+
+    def __init__(self, links_data: dict, bundle_dir: str = None, cache_dir: str = None,
+                 source_dir: str = None, grid_dir: str = None):
+        self.links_data = links_data
+        self.bundle = ReferenceBundle.open(bundle_dir) if bundle_dir else None
+        # Con rejillas precalculadas (python -m crecimiento grids) se usan en lugar de las tablas
+        self.grids = GridSet.open(grid_dir) if grid_dir else None
+        self.cache = ReferenceCache(cache_dir) if cache_dir and not source_dir else None
+        self.source_dir = source_dir
+        self._tables = {}
+
+    def get(self, indicator: str, gender_key: str):
+        """LMSTable (o LMSGrid) de la serie continua de la combinación, o None."""
+        key = (indicator, gender_key)
+        if key not in self._tables:
+            table = self.grids.get(indicator, gender_key) if self.grids is not None else None
+            if table is None:
+                try:
+                    df = stitch_reference(self.links_data, indicator, "z", gender_key, self._load)
+                except KeyError:
+                    df = None
+                table = LMSTable.from_frame(df) if df is not None else None
+            self._tables[key] = table
+        return self._tables[key]
+
+    def _load(self, url: str) -> pd.DataFrame:
+        return load_reference_frame(url, bundle=self.bundle, cache=self.cache,
+                                    source_dir=self.source_dir)
+
+
+def score_column_names(indicator_es: str):
+    return f"Z-score ({indicator_es})", f"Percentil ({indicator_es})"
+
+
+def score_frame(df: pd.DataFrame, tables: ReferenceTables, id_col: str = None) -> pd.DataFrame:
+    """
+    Añade edad, IMC y z-score/percentil de cada indicador a un bloque de mediciones.
+    Cada indicador y sexo tiene una sola serie continua, así que todas sus filas
+    se puntúan juntas en una llamada vectorizada, sin enrutar por rango de edad.
+    Al final, las banderas de calidad de validation.annotate; las reglas entre
+    visitas solo con 'id_col' (sin id, las filas pueden ser de distintos niños/as).
+    """
+    out = df.copy()
+    n = len(out)
+    fecha = pd.to_datetime(out[COL_FECHA], errors="coerce")
+    nacimiento = pd.to_datetime(out[COL_NACIMIENTO], errors="coerce")
+    for col in MEASUREMENT_COLUMNS:
+        if col in out.columns:
+            out[col] = pd.to_numeric(out[col], errors="coerce").astype("float64")
+        else:
+            out[col] = np.nan
+    out[COL_FECHA] = fecha
+    out[COL_NACIMIENTO] = nacimiento
+
+    age_months = calcular_edad_meses_vec(nacimiento, fecha)
+    age_days = (fecha - nacimiento).dt.days.to_numpy(dtype="float64")
+    out["Edad (meses)"] = age_months
+    out["Edad (días)"] = age_days
+    out["IMC"] = calcular_imc_vec(out["Peso (kg)"], out["Estatura (cm)"])
+
+    gender_key = out[COL_SEXO].map(GENDER_KEYS).to_numpy(dtype=object)
+    height_cm = out["Estatura (cm)"].to_numpy(dtype="float64")
+    by_gender = {g: gender_key == g for g in ("boys", "girls")}
+
+    for indicator_es, indicator in indicator_map_es.items():
+        metric = INDICATOR_SPECS[indicator][0]
+        values = out[metric].to_numpy(dtype="float64")
+        z = np.full(n, np.nan)
+        for g, mask in by_gender.items():
+            if not mask.any():
+                continue
+            table = tables.get(indicator, g)
+            if table is None:
+                continue
+            z[mask], _ = score_indicator(indicator, table, age_days=age_days[mask],
+                                         height_cm=height_cm[mask], values=values[mask])
+
+        z_col, p_col = score_column_names(indicator_es)
+        out[z_col] = z
+        out[p_col] = zscore_to_percentile(z)
+    return annotate(out, id_col=id_col, visits=id_col is not None)
+
+
+#######################################
+# POOL DE PROCESOS
+#######################################
+_worker_tables = None
+
+
+def _init_worker(links_data, bundle_dir, cache_dir, source_dir, grid_dir):
+    global _worker_tables
+    _worker_tables = ReferenceTables(links_data, bundle_dir, cache_dir, source_dir, grid_dir)
+
+
+def _score_chunk(chunk: pd.DataFrame, id_col: str = None) -> pd.DataFrame:
+    return score_frame(chunk, _worker_tables, id_col)
+
+
+def budget_chunksize(input_path: str, memory_budget: int, workers: int, where=None) -> int:
+    """
+    Filas por bloque para que los bloques en vuelo (2 por proceso y el que se
+    escribe, cada uno con su entrada y su salida) quepan en 'memory_budget'
+    bytes, según los bytes por fila de una muestra de la entrada.
+    """
+    if file_format(input_path) != "csv" or where:
+        sample = next(iter_measurements(input_path, batch_size=SAMPLE_ROWS, where=where), None)
+    else:
+        sample = pd.read_csv(input_path, nrows=SAMPLE_ROWS, dtype=str)
+    if sample is None or sample.empty:
+        return DEFAULT_CHUNKSIZE
+    input_bytes = sample.memory_usage(deep=True, index=False).sum() / len(sample)
+    # Salida = copia de la entrada + columnas nuevas
+    chunk_row_bytes = 2 * input_bytes + SCORED_ROW_BYTES
+    rows = int(memory_budget / (chunk_row_bytes * (2 * workers + 1)))
+    if rows < MIN_CHUNK_ROWS:
+        raise MemoryBudgetError("Presupuesto de memoria insuficiente: "
+                                f"{format_size(memory_budget)} da bloques de {rows:,} filas con "
+                                f"{workers} procesos (mínimo {MIN_CHUNK_ROWS:,}).")
+    return rows
+
+
+def score_file(input_path: str, output_path: str, links_data: dict, bundle_dir: str = None,
+               cache_dir: str = None, source_dir: str = None, chunksize: int = DEFAULT_CHUNKSIZE,
+               workers: int = None, progress=sys.stderr, grid_dir: str = None,
+               where=None, memory_budget: int = None, id_col: str = None) -> dict:
+    """
+    Puntúa 'input_path' por bloques y escribe el resultado en 'output_path'.
+    El orden de salida es siempre el de entrada. Devuelve filas, segundos,
+    filas/s y el tamaño de bloque usado.
+    'where' (condiciones de columnar.parse_where) puntúa solo las filas que las cumplen.
+    'memory_budget' (bytes) reemplaza 'chunksize' por el de budget_chunksize.
+    'id_col' activa las reglas de validación entre visitas, dentro de cada bloque.
+    """
+    workers = workers or os.cpu_count() or 1
+    if memory_budget:
+        chunksize = budget_chunksize(input_path, memory_budget, workers, where)
+    if file_format(input_path) != "csv" or where:
+        # Parquet/Arrow mapeados en memoria, con el filtro aplicado al leer
+        reader = iter_measurements(input_path, batch_size=chunksize, where=where)
+    else:
+        reader = pd.read_csv(input_path, chunksize=chunksize, dtype=str)
+    writer = MeasurementWriter(output_path)
+    start = time.perf_counter()
+    rows = 0
+
+    def report(df):
+        nonlocal rows
+        writer.write(df)
+        rows += len(df)
+        if progress is not None:
+            elapsed = time.perf_counter() - start
+            print(f"{rows:,} filas  {rows / elapsed:,.0f} filas/s", file=progress, flush=True)
+
+    try:
+        if workers <= 1:
+            tables = ReferenceTables(links_data, bundle_dir, cache_dir, source_dir, grid_dir)
+            for chunk in reader:
+                report(score_frame(chunk, tables, id_col))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                     initargs=(links_data, bundle_dir, cache_dir, source_dir,
+                                               grid_dir)) as pool:
+                # Como mucho 2 bloques por proceso en vuelo: memoria acotada y orden estable
+                pending = deque()
+                for chunk in reader:
+                    pending.append(pool.submit(_score_chunk, chunk, id_col))
+                    if len(pending) >= 2 * workers:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "seconds": elapsed, "rows_per_second": rows / elapsed if elapsed else 0.0,
+            "chunksize": chunksize}
@@ -0,0 +1,351 @@
+"""
+Importación y exportación de mediciones en Parquet, Arrow (IPC/Feather) y CSV
+con un esquema explícito.
+
+Las columnas conocidas tienen siempre el mismo tipo, se lean de donde se lean
+(MEASUREMENT_TYPES): fechas como date32, edades como enteros con nulos y
+mediciones como float64 con nulos, en lugar de texto. El resto de columnas
+(ID, clínica, z-scores, ...) conserva el tipo que traiga el archivo.
+
+Los archivos en disco se abren como ``pyarrow.dataset`` con memoria mapeada:
+``columns`` lee solo esas columnas y ``where`` filtra antes de convertir a
+pandas, saltando los grupos de filas de Parquet cuyas estadísticas (mín/máx)
+no pueden cumplir el filtro. Con el archivo ordenado por la columna de filtro
+(``sort_by``, p. ej. la clínica) se lee solo la porción pedida.
+
+pyarrow se importa al llamar a las funciones, no al importar el módulo.
+"""
+import io
+import os
+import re
+
+import pandas as pd
+
+# Columna -> tipo Arrow (alias de pyarrow.type_for_alias)
+MEASUREMENT_TYPES = {
+    "Fecha": "date32",
+    "Fecha de Nacimiento": "date32",
+    "Sexo": "string",
+    "Edad (meses)": "int64",
+    "Edad (días)": "int64",
+    "Peso (kg)": "double",
+    "Estatura (cm)": "double",
+    "Perímetro Cefálico (cm)": "double",
+    "IMC": "double",
+}
+FORMATS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow",
+           ".csv": "csv"}
+# Filas por grupo de Parquet / lote de Arrow: granularidad del salto por estadísticas
+DEFAULT_ROW_GROUP_SIZE = 64_000
+
+_WHERE = re.compile(r"^\s*(.+?)\s*(==|!=|<=|>=|=|<|>)\s*(.*?)\s*$")
+
+
+def file_format(source, fmt: str = None) -> str:
+    """'parquet', 'arrow' o 'csv' según 'fmt' o la extensión (de la ruta o de source.name)."""
+    if fmt:
+        return fmt
+    name = source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")
+    ext = os.path.splitext(str(name))[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Formato no soportado: '{ext}' (use {', '.join(sorted(FORMATS))}).")
+    return FORMATS[ext]
+
+
+def measurement_schema(columns) -> "pyarrow.Schema":
+    """Esquema explícito de las columnas conocidas presentes en 'columns'."""
+    import pyarrow as pa
+
+    return pa.schema([pa.field(c, pa.type_for_alias(MEASUREMENT_TYPES[c]))
+                      for c in columns if c in MEASUREMENT_TYPES])
+
+
+#######################################
+# CONVERSIÓN
+#######################################
+def conform(table):
+    """Tabla Arrow con las columnas conocidas convertidas a MEASUREMENT_TYPES."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    for field in measurement_schema(table.column_names):
+        i = table.schema.get_field_index(field.name)
+        column = table.column(i)
+        if column.type == field.type:
+            continue
+        if pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        if pa.types.is_integer(field.type) and pa.types.is_floating(column.type):
+            column = pc.round(column)
+        # safe=False: de timestamp a date32 se descarta la hora
+        column = column.cast(field.type, safe=False)
+        table = table.set_column(i, field, column)
+    return table
+
+
+def to_datetime(series: pd.Series, **kwargs) -> pd.Series:
+    """
+    pd.to_datetime(errors="coerce") que convierte las columnas de Arrow (las
+    fechas date32 de compact_frame) en Arrow: pandas las recorre como objetos.
+    """
+    if isinstance(series.dtype, pd.ArrowDtype):
+        import pyarrow as pa
+
+        values = pa.array(series).cast(pa.timestamp("s"))
+        # Por posición: el índice de 'series' (p. ej. un bloque de iloc) no empieza en 0
+        return values.to_pandas().set_axis(series.index).rename(series.name)
+    return pd.to_datetime(series, errors="coerce", **kwargs)
+
+
+def to_table(df: pd.DataFrame):
+    """DataFrame -> tabla Arrow con el esquema explícito (sin el índice)."""
+    import pyarrow as pa
+
+    df = df.copy(deep=False)
+    for col, alias in MEASUREMENT_TYPES.items():
+        if col not in df.columns:
+            continue
+        if alias == "date32":
+            df[col] = to_datetime(df[col], format="mixed")
+        elif alias != "string":
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("float64")
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Categorías (compact_frame) como valores: el esquema del archivo no depende de la
+    # representación en memoria y los lotes de Arrow IPC no pueden cambiar de diccionario
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(field.type.value_type))
+    return conform(table)
+
+
+def _pandas_type(arrow_type):
+    import pyarrow as pa
+
+    return pd.Int64Dtype() if pa.types.is_integer(arrow_type) else None
+
+
+def to_frame(table) -> pd.DataFrame:
+    """Tabla Arrow -> DataFrame: fechas como datetime64 y enteros con nulos como Int64."""
+    return conform(table).to_pandas(types_mapper=_pandas_type, date_as_object=False)
+
+
+#######################################
+# FILTROS
+#######################################
+def parse_where(conditions, schema):
+    """
+    Expresión de pyarrow.dataset a partir de condiciones de texto como
+    "Clínica == Norte" o "Fecha >= 2024-01-01" (todas deben cumplirse). El
+    valor se convierte al tipo de la columna en 'schema'. None si no hay.
+    """
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    expression = None
+    for condition in conditions or ():
+        match = _WHERE.match(condition)
+        if not match:
+            raise ValueError(f"Condición inválida: '{condition}' (use 'columna operador valor').")
+        name, op, raw = match.groups()
+        if name not in schema.names:
+            raise ValueError(f"La columna '{name}' no existe (hay: {', '.join(schema.names)}).")
+        arrow_type = schema.field(name).type
+        if pa.types.is_dictionary(arrow_type):
+            arrow_type = arrow_type.value_type
+        try:
+            value = pa.scalar(raw).cast(arrow_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            raise ValueError(f"'{raw}' no es un valor válido para '{name}' ({arrow_type}).")
+        field = ds.field(name)
+        term = {"==": field == value, "=": field == value, "!=": field != value,
+                "<": field < value, "<=": field <= value, ">": field > value,
+                ">=": field >= value}[op]
+        expression = term if expression is None else expression & term
+    return expression
+
+
+#######################################
+# LECTURA
+#######################################
+def _csv_options():
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+
+    # Fechas como timestamp y enteros como double: conform() los lleva al tipo final
+    read_as = {"date32": pa.timestamp("s"), "int64": pa.float64(), "double": pa.float64(),
+               "string": pa.string()}
+    return pcsv.ConvertOptions(
+        column_types={col: read_as[alias] for col, alias in MEASUREMENT_TYPES.items()},
+        strings_can_be_null=True)
+
+
+def open_dataset(path: str, fmt: str = None, mmap: bool = True):
+    """
+    Dataset de pyarrow sobre el archivo, con memoria mapeada salvo 'mmap=False'
+    (las páginas mapeadas cuentan en la memoria residente del proceso).
+    """
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    fmt = file_format(path, fmt)
+    arrow_format = ({"parquet": "parquet", "arrow": "ipc"}.get(fmt)
+                    or ds.CsvFileFormat(convert_options=_csv_options()))
+    return ds.dataset(os.path.abspath(path), format=arrow_format,
+                      filesystem=fs.LocalFileSystem(use_mmap=mmap))
+
+
+def bounded_scan(dataset) -> dict:
+    """
+    Opciones de lectura con memoria acotada para to_batches/to_table/head. Por
+    defecto el escáner decodifica hasta 16 lotes por delante del consumidor y,
+    en Parquet, precarga los grupos de filas: con un filtro, casi todo el
+    archivo llega a memoria antes de descartar filas.
+    """
+    import pyarrow.dataset as ds
+
+    options = {"batch_readahead": 1, "fragment_readahead": 1}
+    if isinstance(dataset.format, ds.ParquetFileFormat):
+        options["fragment_scan_options"] = ds.ParquetFragmentScanOptions(pre_buffer=False)
+    return options
+
+
+def _read_buffer(source, fmt: str):
+    """Tabla Arrow de un archivo en memoria (p. ej. el de st.file_uploader)."""
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+    import pyarrow.parquet as pq
+
+    data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+    if fmt == "parquet":
+        return pq.read_table(pa.BufferReader(data))
+    if fmt == "arrow":
+        return pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    return pcsv.read_csv(pa.BufferReader(data), convert_options=_csv_options())
+
+
+def read_measurements(source, columns=None, where=None, fmt: str = None) -> pd.DataFrame:
+    """
+    Lee mediciones de una ruta o de un archivo en memoria. 'columns' limita las
+    columnas leídas y 'where' (condiciones de parse_where) las filas.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        dataset = open_dataset(source, fmt)
+        table = dataset.to_table(columns=columns, filter=parse_where(where, dataset.schema))
+    else:
+        table = _read_buffer(source, file_format(source, fmt))
+        expression = parse_where(where, table.schema)
+        if expression is not None:
+            table = table.filter(expression)
+        if columns:
+            table = table.select(columns)
+    return to_frame(table)
+
+
+def iter_measurements(path: str, batch_size: int = DEFAULT_ROW_GROUP_SIZE, columns=None,
+                      where=None, fmt: str = None):
+    """Como read_measurements, pero por bloques de hasta 'batch_size' filas (memoria acotada)."""
+    import pyarrow as pa
+
+    dataset = open_dataset(path, fmt)
+    for batch in dataset.to_batches(columns=columns, filter=parse_where(where, dataset.schema),
+                                    batch_size=batch_size, **bounded_scan(dataset)):
+        if batch.num_rows:
+            yield to_frame(pa.Table.from_batches([batch]))
+
+
+#######################################
+# ESCRITURA
+#######################################
+def write_measurements(df: pd.DataFrame, dest, fmt: str = None, sort_by=None,
+                       row_group_size: int = DEFAULT_ROW_GROUP_SIZE) -> None:
+    """
+    Escribe 'df' en una ruta o archivo abierto ('fmt' o la extensión decide
+    el formato). 'sort_by' ordena las filas para que los filtros por esas
+    columnas salten grupos de filas enteros al leer.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    fmt = file_format(dest, fmt)
+    if fmt == "csv":
+        if sort_by:
+            df = df.sort_values(list(sort_by), kind="stable")
+        df.to_csv(dest, index=False, date_format="%Y-%m-%d")
+        return
+    table = to_table(df)
+    if sort_by:
+        table = table.sort_by([(col, "ascending") for col in sort_by])
+    if fmt == "parquet":
+        pq.write_table(table, dest, row_group_size=row_group_size, compression="zstd")
+    else:
+        # Arrow IPC sin comprimir: se puede mapear en memoria y leer sin copias
+        with pa.ipc.new_file(dest, table.schema) as writer:
+            writer.write_table(table, max_chunksize=row_group_size)
+
+
+def measurements_bytes(df: pd.DataFrame, fmt: str) -> bytes:
+    """Contenido del archivo de 'df' en 'fmt' (para descargas)."""
+    buffer = io.BytesIO()
+    write_measurements(df, buffer, fmt=fmt)
+    return buffer.getvalue()
+
+
+def _file_schema(schema, df: pd.DataFrame):
+    """
+    'schema' (el del primer grupo de filas de 'df') sin campos de tipo null: una
+    columna vacía en ese grupo toma el tipo de sus valores en todo 'df', o texto
+    si no tiene ninguno. El esquema de un archivo no cambia una vez abierto.
+    """
+    import pyarrow as pa
+
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            values = df[field.name].dropna()
+            arrow_type = pa.array(values, from_pandas=True).type if len(values) else pa.null()
+            if pa.types.is_null(arrow_type):
+                arrow_type = pa.large_string()
+            schema = schema.set(i, field.with_type(arrow_type))
+    return schema
+
+
+class MeasurementWriter:
+    """Escribe bloques en Parquet o Arrow (streaming, esquema explícito) o CSV según la extensión."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = file_format(path)
+        self._writer = None
+        self._schema = None
+        self._empty = None
+        self._first = True
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.format != "csv":
+            if self._writer is None and not len(df):
+                # Solo columnas: si no llega ninguna fila, close escribe el archivo con su esquema
+                self._empty = df
+            # Un grupo de filas por vez: la copia en Arrow (float64) no duplica el bloque entero
+            for start in range(0, len(df), DEFAULT_ROW_GROUP_SIZE):
+                table = to_table(df.iloc[start:start + DEFAULT_ROW_GROUP_SIZE])
+                if self._writer is None:
+                    self._open(_file_schema(table.schema, df))
+                self._writer.write_table(table.cast(self._schema))
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def _open(self, schema) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._schema = schema
+        if self.format == "parquet":
+            self._writer = pq.ParquetWriter(self.path, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(self.path, schema)
+
+    def close(self) -> None:
+        if self._writer is None and self._empty is not None:
+            self._open(_file_schema(to_table(self._empty).schema, self._empty))
+        if self._writer is not None:
+            self._writer.close()
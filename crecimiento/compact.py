@@ -0,0 +1,241 @@
+"""
+Representación compacta de cohortes en memoria.
+
+La representación por defecto (columnar.to_frame) usa float64 para las
+mediciones, Int64 para las edades, datetime64 para las fechas y texto para
+ids y nombres. Para cohortes de millones de mediciones, compact_frame usa:
+
+- float32 para mediciones, IMC, z-scores y demás decimales (7 cifras
+  significativas, de sobra para mediciones con un decimal);
+- Int16 para la edad en días y en meses (fuera de rango quedan nulas);
+- date32 (4 bytes) para las fechas;
+- categorías para Sexo, ids, nombres y demás columnas de texto: cada valor
+  repetido se guarda una vez.
+
+Al escribir, las columnas de MEASUREMENT_TYPES vuelven a su tipo explícito
+(columnar.to_table) y las categorías a texto; z-scores y demás decimales quedan
+en float32.
+
+CohortReader lee la cohorte compacta de una vez o, si no entra en un
+presupuesto de memoria, por bloques de niños/as completos. memory_report
+informa los bytes por columna.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.columnar import (MEASUREMENT_TYPES, bounded_scan, conform, open_dataset,
+                                  parse_where, to_table)
+
+# Filas leídas para estimar los bytes por fila
+SAMPLE_ROWS = 50_000
+# Bloque mínimo con presupuesto de memoria: cada bloque vuelve a recorrer el archivo
+MIN_CHUNK_ROWS = 10_000
+# Memoria de growth_analytics respecto de su entrada compacta (copia de la
+# tabla, posiciones ordenadas y columnas nuevas en float64), medida con 1M filas
+ANALYTICS_WORKING_FACTOR = 6
+
+_SIZE = re.compile(r"^\s*([\d.]+)\s*([KMGT]?)i?B?\s*$", re.IGNORECASE)
+_UNITS = {"": 1, "K": 2**10, "M": 2**20, "G": 2**30, "T": 2**40}
+
+
+class MemoryBudgetError(ValueError):
+    """El presupuesto de memoria no alcanza para leer o puntuar la cohorte."""
+
+
+def parse_size(text) -> int:
+    """Bytes de un tamaño como '512M', '2GB', '1.5G' o un número de bytes."""
+    match = _SIZE.match(str(text))
+    if not match:
+        raise ValueError(f"Tamaño inválido: '{text}' (p. ej. 512M o 2G).")
+    number, unit = match.groups()
+    return int(float(number) * _UNITS[unit.upper()])
+
+
+def format_size(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+#######################################
+# CONVERSIÓN
+#######################################
+def _to_int16(column):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    info = np.iinfo(np.int16)
+    in_range = pc.and_(pc.greater_equal(column, info.min), pc.less_equal(column, info.max))
+    return pc.if_else(in_range, column, pa.scalar(None, column.type)).cast(pa.int16())
+
+
+def compact_table(table, categorical=()):
+    """Tabla Arrow con los tipos compactos; 'categorical' añade columnas no textuales (ids)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    table = conform(table)
+    for i, field in enumerate(table.schema):
+        column = table.column(i)
+        if pa.types.is_dictionary(field.type):
+            continue
+        if (field.name in categorical or pa.types.is_string(field.type)
+                or pa.types.is_large_string(field.type)):
+            column = pc.dictionary_encode(column)
+        elif pa.types.is_integer(field.type) and MEASUREMENT_TYPES.get(field.name) == "int64":
+            column = _to_int16(column)
+        elif pa.types.is_floating(field.type) and field.type != pa.float32():
+            column = column.cast(pa.float32())
+        else:
+            continue
+        table = table.set_column(i, field.name, column)
+    return table
+
+
+def _pandas_type(arrow_type):
+    import pyarrow as pa
+
+    if pa.types.is_date32(arrow_type):
+        return pd.ArrowDtype(arrow_type)
+    if pa.types.is_integer(arrow_type):
+        # Entero con nulos del mismo ancho (Int16 de las edades, Int32 de las banderas)
+        prefix = "Int" if pa.types.is_signed_integer(arrow_type) else "UInt"
+        return pd.api.types.pandas_dtype(f"{prefix}{arrow_type.bit_width}")
+    return None
+
+
+def compact_frame(data, categorical=()) -> pd.DataFrame:
+    """DataFrame compacto a partir de un DataFrame o de una tabla Arrow."""
+    table = to_table(data) if isinstance(data, pd.DataFrame) else data
+    # split_blocks: una columna por bloque, sin la copia de consolidar por tipo
+    return compact_table(table, categorical).to_pandas(types_mapper=_pandas_type,
+                                                      split_blocks=True)
+
+
+def memory_report(df: pd.DataFrame, rows: int = None) -> pd.DataFrame:
+    """
+    Bytes en memoria por columna de 'df' (incluidos textos y categorías) y su
+    total. Con 'rows', extrapolados a esa cantidad de filas.
+    """
+    usage = df.memory_usage(deep=True, index=False)
+    per_row = usage / max(len(df), 1)
+    total_rows = len(df) if rows is None else rows
+    report = pd.DataFrame({"Columna": usage.index, "Tipo": df.dtypes.astype(str).to_numpy(),
+                           "Bytes/fila": per_row.to_numpy(),
+                           "Bytes": (per_row * total_rows).round().astype("int64").to_numpy()})
+    total = pd.DataFrame({"Columna": ["Total"], "Tipo": [""], "Bytes/fila": [per_row.sum()],
+                          "Bytes": [int(round(per_row.sum() * total_rows))]})
+    return pd.concat([report, total], ignore_index=True)
+
+
+#######################################
+# LECTURA CON PRESUPUESTO DE MEMORIA
+#######################################
+def _release_memory() -> None:
+    # El asignador de pyarrow retiene lo liberado; devolverlo al sistema entre bloques
+    import pyarrow as pa
+
+    pa.default_memory_pool().release_unused()
+
+
+def child_groups(ids, rows_per_chunk: int) -> list:
+    """
+    Reparte los ids (columna Arrow, una fila por medición) en grupos con unas
+    'rows_per_chunk' mediciones: cada grupo suma como mucho eso más las del
+    niño/a más grande, y un niño/a nunca se parte.
+    """
+    import pyarrow.compute as pc
+
+    counts = pc.value_counts(ids)
+    values, n = counts.field("values"), counts.field("counts").to_numpy()
+    group = (np.cumsum(n) - n) // max(rows_per_chunk, 1)
+    bounds = np.flatnonzero(np.diff(group)) + 1
+    return [values.take(sel) for sel in np.split(np.arange(len(n)), bounds)]
+
+
+class CohortReader:
+    """
+    Lee una cohorte (CSV, Parquet o Arrow) como DataFrames compactos.
+
+    Sin 'memory_budget' (bytes) o si la cohorte cabe, un solo bloque. Si no,
+    (filas x bytes por fila compacta x 'working_factor') se reparte en bloques
+    de niños/as completos según 'id_col', y cada bloque vuelve a leer el
+    archivo filtrando por sus ids (con Parquet/Arrow, solo esas filas llegan a
+    pandas). Los bloques salen en el orden de aparición de los niños/as.
+    """
+
+    def __init__(self, path: str, id_col: str = None, columns=None, where=None,
+                 memory_budget: int = None, working_factor: float = ANALYTICS_WORKING_FACTOR,
+                 fmt: str = None):
+        # Con presupuesto, lecturas normales: cada bloque recorre el archivo y mapeado
+        # acabaría entero en la memoria residente
+        self.dataset = open_dataset(path, fmt, mmap=not memory_budget)
+        self.id_col = id_col
+        self.columns = columns
+        self.categorical = (id_col,) if id_col else ()
+        self.filter = parse_where(where, self.dataset.schema)
+        self.rows = self.dataset.count_rows(filter=self.filter)
+        sample = self.dataset.head(SAMPLE_ROWS, columns=columns, filter=self.filter,
+                                   **bounded_scan(self.dataset))
+        self.sample = compact_frame(sample, self.categorical)
+        self.row_bytes = float(self.sample.memory_usage(deep=True, index=False).sum()
+                               / max(len(self.sample), 1))
+        self.groups = None
+        needed = self.rows * self.row_bytes * working_factor
+        if memory_budget and needed > memory_budget:
+            if id_col is None:
+                raise MemoryBudgetError(f"La cohorte necesita ~{format_size(needed)} y el "
+                                        f"presupuesto es {format_size(memory_budget)}: indique la "
+                                        "columna de id para leerla por bloques de niños/as.")
+            rows_per_chunk = int(memory_budget / (self.row_bytes * working_factor))
+            if rows_per_chunk < MIN_CHUNK_ROWS:
+                raise MemoryBudgetError("Presupuesto de memoria insuficiente: "
+                                        f"{format_size(memory_budget)} da bloques de "
+                                        f"{rows_per_chunk:,} filas (mínimo {MIN_CHUNK_ROWS:,}).")
+            ids = self.dataset.to_table(columns=[id_col], filter=self.filter,
+                                        **bounded_scan(self.dataset)).column(id_col)
+            self.groups = child_groups(ids, rows_per_chunk)
+            del ids
+            _release_memory()
+
+    @property
+    def chunks(self) -> int:
+        return 1 if self.groups is None else len(self.groups)
+
+    def read(self, expression=None) -> pd.DataFrame:
+        """
+        Filas que cumplen 'expression' (y el filtro de la cohorte) como DataFrame
+        compacto. Cada lote se compacta al leerlo: la tabla en float64 no llega
+        a existir entera.
+        """
+        import pyarrow as pa
+
+        if self.filter is not None:
+            expression = self.filter if expression is None else self.filter & expression
+        tables = [compact_table(pa.Table.from_batches([batch]), self.categorical)
+                  for batch in self.dataset.to_batches(columns=self.columns, filter=expression,
+                                                       **bounded_scan(self.dataset))
+                  if batch.num_rows]
+        if not tables:
+            schema = self.dataset.schema
+            empty = schema.empty_table().select(self.columns) if self.columns else schema.empty_table()
+            tables = [compact_table(empty, self.categorical)]
+        frame = compact_frame(pa.concat_tables(tables), self.categorical)
+        del tables
+        _release_memory()
+        return frame
+
+    def __iter__(self):
+        import pyarrow.dataset as ds
+
+        if self.groups is None:
+            yield self.read()
+            return
+        for values in self.groups:
+            term = ds.field(self.id_col).isin(values)
+            if values.null_count:
+                term = term | ds.field(self.id_col).is_null()
+            yield self.read(term)
@@ -0,0 +1,125 @@
+"""
+Lógica pura de indicadores OMS compartida por la app y los procesos por lotes.
+
+Importar este módulo no tiene efectos secundarios ni carga NumPy/pandas: las
+funciones escalares son Python puro y las vectorizadas importan NumPy y
+pandas al llamarse, para que la CLI y los workers arranquen rápido.
+"""
+from datetime import datetime
+
+#######################################
+# DICCIONARIOS DE INDICADORES
+#######################################
+# Mostramos en el tablero nombres en español, pero internamente usamos inglés.
+indicator_map_es = {
+    "Talla para la edad": "length-height-for-age",
+    "Peso para la edad": "weight-for-age",
+    "Peso para la talla": "weight-for-length-height",
+    "IMC para la edad": "body-mass-index-for-age",
+    "Perímetro cefálico para la edad": "head-circumference-for-age"
+}
+
+#######################################
+# FUNCIONES AUXILIARES
+#######################################
+def map_gender_to_key(gender_label: str) -> str:
+    """Convierte 'Niño' -> 'boys' y 'Niña' -> 'girls'."""
+    return "boys" if gender_label == "Niño" else "girls"
+
+def get_age_range(age_months: int, indicator: str = None) -> str:
+    """Ajusta la lógica de rangos de edad según el indicador."""
+    if indicator == "weight-for-age":
+        return "0-13-weeks" if age_months < 3 else "0-5"
+    elif indicator == "length-height-for-age":
+        if age_months < 3:
+            return "0-13-weeks"
+        elif age_months < 24:
+            return "0-2"
+        else:
+            return "2-5"
+    elif indicator == "weight-for-length-height":
+        return "0-2" if age_months < 24 else "2-5"
+    elif indicator == "body-mass-index-for-age":
+        if age_months < 3:
+            return "0-13-weeks"
+        elif age_months < 24:
+            return "0-2"
+        else:
+            return "2-5"
+    elif indicator == "head-circumference-for-age":
+        return "0-13" if age_months <= 13 else "0-5"
+    else:
+        return "0-2" if age_months <= 24 else "2-5"
+
+def lookup_reference_link(links_data: dict, indicator: str, score_type: str, gender: str,
+                          age_months: int) -> str:
+    """URL del Excel OMS según indicador, tipo (z/p), sexo y rango; KeyError si no existe."""
+    gender_key = map_gender_to_key(gender)
+    age_range = get_age_range(age_months, indicator)
+    return links_data[indicator][score_type][gender_key][age_range]
+
+#######################################
+# CAMPOS DERIVADOS
+#######################################
+def calcular_imc(row):
+    try:
+        peso = float(row["Peso (kg)"])
+        est = float(row["Estatura (cm)"])
+        if peso > 0 and est > 0:
+            return round(peso / ((est/100)**2), 2)
+    except:
+        pass
+    return None
+
+def calcular_edad_meses(birthdate: datetime, measurement_date: datetime):
+    import pandas as pd
+
+    if pd.isnull(measurement_date):
+        return None
+    months = (measurement_date.year - birthdate.year)*12 + (measurement_date.month - birthdate.month)
+    if measurement_date.day < birthdate.day:
+        months -= 1
+    return months
+
+def calcular_imc_vec(peso, estatura) -> "np.ndarray":
+    """Versión vectorizada de calcular_imc: NaN si falta o no es positivo."""
+    import numpy as np
+    import pandas as pd
+
+    peso = pd.to_numeric(pd.Series(peso), errors="coerce").to_numpy(dtype="float64")
+    est = pd.to_numeric(pd.Series(estatura), errors="coerce").to_numpy(dtype="float64")
+    valid = (peso > 0) & (est > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        imc = np.round(peso / (est / 100) ** 2, 2)
+    return np.where(valid, imc, np.nan)
+
+def _fechas(values, like=None) -> "pd.DatetimeIndex":
+    """Fechas como DatetimeIndex; una fecha única se repite a la longitud de 'like'."""
+    import numpy as np
+    import pandas as pd
+
+    if np.ndim(values) == 0 and like is not None:
+        fecha = pd.Timestamp(values).to_datetime64()
+        return pd.DatetimeIndex(np.full(len(like), fecha))
+    return pd.DatetimeIndex(pd.to_datetime(values, errors="coerce"))
+
+def calcular_edad_meses_vec(birthdates, measurement_dates) -> "np.ndarray":
+    """
+    Versión vectorizada de calcular_edad_meses: NaN si falta alguna fecha.
+    'birthdates' puede ser una sola fecha o un arreglo del mismo largo.
+    """
+    import numpy as np
+
+    meas = _fechas(measurement_dates)
+    birth = _fechas(birthdates, like=meas)
+    months = ((meas.year - birth.year) * 12 + (meas.month - birth.month)).to_numpy(dtype="float64")
+    months = months - (meas.day < birth.day).astype("float64")
+    return np.where(birth.isna() | meas.isna(), np.nan, months)
+
+def calcular_edad_dias_vec(birthdates, measurement_dates) -> "np.ndarray":
+    """Edad exacta en días entre cada par de fechas: NaN si falta alguna."""
+    import numpy as np
+
+    meas = _fechas(measurement_dates)
+    birth = _fechas(birthdates, like=meas)
+    return np.asarray((meas - birth).days, dtype="float64")
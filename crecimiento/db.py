@@ -0,0 +1,178 @@
+"""
+Almacén SQLite (biblioteca estándar) de niños/as y sus mediciones.
+
+- ``children``: un registro por niño/a con id propio (el nombre no es clave).
+- ``measurements``: una fila por (niño/a, fecha), con índice por esas columnas.
+
+Se usa modo WAL para que varias sesiones de Streamlit lean y escriban a la vez
+sin bloquearse, y cada hilo tiene su propia conexión. Al guardar solo se
+escriben las filas nuevas o modificadas y se borran las eliminadas.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS children (
+    id         INTEGER PRIMARY KEY,
+    name       TEXT NOT NULL,
+    sex        TEXT NOT NULL,
+    birthdate  TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    UNIQUE (name, sex, birthdate)
+);
+CREATE TABLE IF NOT EXISTS measurements (
+    id                    INTEGER PRIMARY KEY,
+    child_id              INTEGER NOT NULL REFERENCES children(id) ON DELETE CASCADE,
+    fecha                 TEXT NOT NULL,
+    peso_kg               REAL,
+    estatura_cm           REAL,
+    perimetro_cefalico_cm REAL,
+    updated_at            TEXT NOT NULL,
+    UNIQUE (child_id, fecha)
+);
+CREATE INDEX IF NOT EXISTS idx_measurements_child_fecha ON measurements (child_id, fecha);
+"""
+
+# Columna del editor -> columna de la base de datos
+MEASUREMENT_COLUMNS = {
+    "Peso (kg)": "peso_kg",
+    "Estatura (cm)": "estatura_cm",
+    "Perímetro Cefálico (cm)": "perimetro_cefalico_cm",
+}
+
+
+def _iso_date(value) -> str:
+    return pd.Timestamp(value).strftime("%Y-%m-%d")
+
+
+def _to_rows(df: pd.DataFrame) -> dict:
+    """Filas {fecha ISO: (peso, estatura, perímetro)} a partir del DataFrame del editor."""
+    fechas = pd.to_datetime(df["Fecha"], errors="coerce")
+    values = []
+    for col in MEASUREMENT_COLUMNS:
+        series = df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+        values.append(pd.to_numeric(series, errors="coerce").to_numpy(dtype="float64"))
+    rows = {}
+    for i, fecha in enumerate(fechas):
+        if pd.isnull(fecha):
+            continue
+        rows[fecha.strftime("%Y-%m-%d")] = tuple(
+            None if np.isnan(v[i]) else float(v[i]) for v in values)
+    return rows
+
+
+class MeasurementStore:
+    """Acceso a la base de mediciones; seguro entre hilos (una conexión por hilo)."""
+
+    def __init__(self, path: str, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    #######################################
+    # NIÑOS/AS
+    #######################################
+    def upsert_child(self, name: str, sex: str, birthdate) -> int:
+        """Id del niño/a con ese nombre, sexo y fecha de nacimiento (lo crea si no existe)."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO children (name, sex, birthdate, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name, sex, birthdate) DO NOTHING",
+                (name, sex, _iso_date(birthdate), datetime.now().isoformat(timespec="seconds")))
+            row = conn.execute(
+                "SELECT id FROM children WHERE name = ? AND sex = ? AND birthdate = ?",
+                (name, sex, _iso_date(birthdate))).fetchone()
+        return row[0]
+
+    def list_children(self) -> pd.DataFrame:
+        """Niños/as guardados con su número de mediciones."""
+        return pd.read_sql_query(
+            "SELECT c.id, c.name, c.sex, c.birthdate, COUNT(m.id) AS mediciones "
+            "FROM children c LEFT JOIN measurements m ON m.child_id = c.id "
+            "GROUP BY c.id ORDER BY c.name, c.birthdate", self._connect())
+
+    def get_child(self, child_id: int) -> dict:
+        row = self._connect().execute(
+            "SELECT id, name, sex, birthdate FROM children WHERE id = ?", (child_id,)).fetchone()
+        if row is None:
+            return None
+        return {"id": row[0], "name": row[1], "sex": row[2], "birthdate": row[3]}
+
+    #######################################
+    # MEDICIONES
+    #######################################
+    def load_history(self, child_id: int) -> pd.DataFrame:
+        """Historial completo del niño/a, ordenado por fecha (una consulta indexada)."""
+        df = pd.read_sql_query(
+            "SELECT fecha, peso_kg, estatura_cm, perimetro_cefalico_cm FROM measurements "
+            "WHERE child_id = ? ORDER BY fecha", self._connect(), params=(child_id,))
+        df = df.rename(columns={"fecha": "Fecha", **{v: k for k, v in MEASUREMENT_COLUMNS.items()}})
+        df["Fecha"] = pd.to_datetime(df["Fecha"])
+        for col in MEASUREMENT_COLUMNS:
+            df[col] = df[col].astype("float64")
+        return df
+
+    def save_measurements(self, child_id: int, df: pd.DataFrame) -> dict:
+        """
+        Sincroniza la base con 'df' escribiendo solo las diferencias: inserta o
+        actualiza las filas nuevas/modificadas y borra las fechas que ya no están.
+        Devuelve cuántas filas se escribieron y cuántas se borraron.
+        """
+        new_rows = _to_rows(df)
+        conn = self._connect()
+        with conn:
+            current = {
+                fecha: (peso, est, pc)
+                for fecha, peso, est, pc in conn.execute(
+                    "SELECT fecha, peso_kg, estatura_cm, perimetro_cefalico_cm "
+                    "FROM measurements WHERE child_id = ?", (child_id,))
+            }
+            changed = [(fecha, values) for fecha, values in new_rows.items()
+                       if current.get(fecha) != values]
+            deleted = [fecha for fecha in current if fecha not in new_rows]
+            self._write(conn, child_id, changed, deleted)
+        return {"written": len(changed), "deleted": len(deleted)}
+
+    def patch_measurements(self, child_id: int, df: pd.DataFrame, removed_fechas=()) -> dict:
+        """
+        Escribe solo las filas de 'df' (las tocadas en el editor) y borra las
+        fechas 'removed_fechas', sin leer el historial guardado.
+        """
+        new_rows = _to_rows(df)
+        deleted = [fecha for fecha in dict.fromkeys(map(_iso_date, removed_fechas))
+                   if fecha not in new_rows]
+        conn = self._connect()
+        with conn:
+            self._write(conn, child_id, list(new_rows.items()), deleted)
+        return {"written": len(new_rows), "deleted": len(deleted)}
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, child_id: int, changed: list, deleted: list) -> None:
+        now = datetime.now().isoformat(timespec="seconds")
+        conn.executemany(
+            "INSERT INTO measurements (child_id, fecha, peso_kg, estatura_cm, "
+            "perimetro_cefalico_cm, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (child_id, fecha) DO UPDATE SET peso_kg = excluded.peso_kg, "
+            "estatura_cm = excluded.estatura_cm, "
+            "perimetro_cefalico_cm = excluded.perimetro_cefalico_cm, "
+            "updated_at = excluded.updated_at",
+            [(child_id, fecha, *values, now) for fecha, values in changed])
+        conn.executemany("DELETE FROM measurements WHERE child_id = ? AND fecha = ?",
+                         [(child_id, fecha) for fecha in deleted])
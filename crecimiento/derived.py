@@ -0,0 +1,130 @@
+"""
+Motor de columnas derivadas (edad, IMC, ...) calculadas de forma vectorizada.
+
+Cada columna derivada declara las columnas y parámetros de los que depende.
+El motor las evalúa en orden topológico sobre columnas completas de
+NumPy/pandas y recuerda una huella de sus entradas, de modo que en la
+siguiente llamada solo se recalculan las columnas cuyas entradas cambiaron.
+Los valores faltantes o inválidos se devuelven siempre como NA explícitos.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.core import calcular_edad_dias_vec, calcular_edad_meses_vec, calcular_imc_vec
+
+
+@dataclass(frozen=True)
+class DerivedColumn:
+    """Columna 'name' = func(df, params), con sus dependencias declaradas."""
+    name: str
+    inputs: Tuple[str, ...]
+    func: Callable
+    params: Tuple[str, ...] = ()
+    dtype: str = "float64"
+
+
+DERIVED_COLUMNS = (
+    DerivedColumn("Edad (meses)", ("Fecha",),
+                  lambda df, p: calcular_edad_meses_vec(p["birthdate"], df["Fecha"]),
+                  params=("birthdate",), dtype="Int64"),
+    DerivedColumn("Edad (días)", ("Fecha",),
+                  lambda df, p: calcular_edad_dias_vec(p["birthdate"], df["Fecha"]),
+                  params=("birthdate",), dtype="Int64"),
+    DerivedColumn("IMC", ("Peso (kg)", "Estatura (cm)"),
+                  lambda df, p: calcular_imc_vec(df["Peso (kg)"], df["Estatura (cm)"])),
+)
+
+
+def topological_order(columns) -> list:
+    """Ordena las columnas para que cada una vaya después de las derivadas de las que depende."""
+    by_name = {c.name: c for c in columns}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(col):
+        if col.name in done:
+            return
+        if col.name in visiting:
+            raise ValueError(f"Dependencia circular en la columna derivada '{col.name}'.")
+        visiting.add(col.name)
+        for dep in col.inputs:
+            if dep in by_name:
+                visit(by_name[dep])
+        visiting.discard(col.name)
+        done.add(col.name)
+        ordered.append(col)
+
+    for col in columns:
+        visit(col)
+    return ordered
+
+
+def _hash_series(series: pd.Series) -> bytes:
+    return pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes()
+
+
+def _fingerprint(df: pd.DataFrame, col: DerivedColumn, params: dict) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(len(df)).encode())
+    for name in col.inputs:
+        series = df[name] if name in df.columns else pd.Series(np.nan, index=df.index)
+        digest.update(_hash_series(series))
+    for name in col.params:
+        digest.update(repr(params.get(name)).encode())
+    return digest.hexdigest()
+
+
+class DerivedEngine:
+    """Evalúa DERIVED_COLUMNS (u otras) recalculando solo lo que cambió."""
+
+    def __init__(self, columns=DERIVED_COLUMNS):
+        self.columns = topological_order(columns)
+        self._fingerprints = {}  # columna -> (huella de entradas, hash de la salida)
+        self.last_recomputed = []
+
+    def compute(self, df: pd.DataFrame, params: dict = None) -> pd.DataFrame:
+        """Devuelve una copia de 'df' con todas las columnas derivadas al día."""
+        params = params or {}
+        out = df.copy()
+        self.last_recomputed = []
+        for col in self.columns:
+            fingerprint = _fingerprint(out, col, params)
+            previous = self._fingerprints.get(col.name)
+            if (col.name in out.columns and previous is not None and previous[0] == fingerprint
+                    and previous[1] == _hash_series(out[col.name])):
+                continue
+            values = np.asarray(col.func(out, params), dtype="float64") if len(out) else []
+            out[col.name] = pd.Series(values, index=out.index, dtype="float64").astype(col.dtype)
+            self._fingerprints[col.name] = (fingerprint, _hash_series(out[col.name]))
+            self.last_recomputed.append(col.name)
+        return out
+
+    def update_rows(self, df: pd.DataFrame, rows, params: dict = None) -> None:
+        """
+        Recalcula las columnas derivadas de las filas 'rows' (etiquetas del
+        índice) de 'df', en su lugar. Para ediciones puntuales: las fórmulas
+        solo se evalúan en esas filas y cada columna se escribe una vez.
+        """
+        params = params or {}
+        rows = list(rows)
+        if not rows:
+            return
+        pos = df.index.get_indexer(rows)
+        part = df.iloc[pos]
+        for col in self.columns:
+            values = np.asarray(col.func(part, params), dtype="float64")
+            if col.name in df.columns:
+                column = pd.to_numeric(df[col.name], errors="coerce").to_numpy(
+                    dtype="float64", na_value=np.nan, copy=True)
+            else:
+                column = np.full(len(df), np.nan)
+            column[pos] = values
+            # Una sola escritura de la columna (en NumPy) en lugar de .loc fila a fila
+            df[col.name] = pd.Series(column, index=df.index).astype(col.dtype)
+            if any(col.name in c.inputs for c in self.columns):
+                part = df.iloc[pos]
+        # Las huellas guardadas ya no describen las columnas completas
+        self._fingerprints.clear()
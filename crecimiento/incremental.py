@@ -0,0 +1,186 @@
+"""
+Recalculo incremental a partir del estado de cambios de ``st.data_editor``.
+
+El editor guarda en ``st.session_state[key]`` solo lo que cambió respecto a
+la tabla que recibió: ``edited_rows`` ({posición: {columna: valor}}),
+``added_rows`` ([{columna: valor}]) y ``deleted_rows`` ([posición]). Aquí se
+aplican esos cambios sobre la tabla de la sesión en su lugar (en el mismo
+orden que Streamlit: ediciones, borrados y altas) y se devuelven las
+etiquetas de las filas tocadas, para recalcular columnas derivadas, z-scores
+y escrituras en la base solo en esas filas. El costo de una edición no
+depende entonces del largo del historial.
+
+FragmentDeps lleva lo mismo a la página: qué claves de estado lee cada
+fragmento (``st.fragment``), para volver a ejecutar solo los que dependen de
+lo que cambió una interacción.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.db import _iso_date
+from crecimiento.pipeline import calcular_zscores_nino
+from crecimiento.zscore import LMSTable
+
+# Columna del índice en el estado del editor
+EDITOR_INDEX = "_index"
+
+
+def has_changes(delta) -> bool:
+    return bool(delta) and any(delta.get(k) for k in ("edited_rows", "added_rows", "deleted_rows"))
+
+
+def _parse_value(df: pd.DataFrame, col: str, value):
+    if value is None:
+        return pd.NaT if pd.api.types.is_datetime64_any_dtype(df[col]) else np.nan
+    if pd.api.types.is_datetime64_any_dtype(df[col]) or col == "Fecha":
+        return pd.to_datetime(value, errors="coerce")
+    if pd.api.types.is_numeric_dtype(df[col]):
+        return pd.to_numeric(value, errors="coerce")
+    return value
+
+
+def apply_editor_delta(df: pd.DataFrame, delta: dict):
+    """
+    Aplica el estado del editor a 'df' en su lugar.
+    Devuelve (filas nuevas o modificadas, fechas que dejaron de existir); las
+    filas son etiquetas del índice de 'df' ya modificado.
+    """
+    changed, removed_fechas = [], []
+    positions = df.index
+    for row_pos, row_changes in (delta.get("edited_rows") or {}).items():
+        label = positions[int(row_pos)]
+        for col, value in row_changes.items():
+            if col == EDITOR_INDEX or col not in df.columns:
+                continue
+            if col == "Fecha":
+                removed_fechas.append(df.at[label, "Fecha"])
+            df.at[label, col] = _parse_value(df, col, value)
+        changed.append(label)
+
+    deleted = [positions[int(pos)] for pos in delta.get("deleted_rows") or ()]
+    if deleted:
+        removed_fechas.extend(df.loc[deleted, "Fecha"])
+        df.drop(index=deleted, inplace=True)
+
+    added_rows = delta.get("added_rows") or ()
+    if added_rows:
+        next_label = int(df.index.max()) + 1 if len(df) else 0
+        for added in added_rows:
+            df.loc[next_label] = {
+                col: _parse_value(df, col, added.get(col)) for col in df.columns
+            }
+            changed.append(next_label)
+            next_label += 1
+
+    changed = [label for label in dict.fromkeys(changed) if label not in set(deleted)]
+    return changed, removed_fechas
+
+
+class ChangeLog:
+    """Filas modificadas desde la última carga o guardado de un niño/a en la base."""
+
+    def __init__(self, child_id: int = None):
+        self.child_id = child_id
+        self.rows = set()
+        self.removed_fechas = set()
+
+    def record(self, changed, removed_fechas) -> None:
+        self.rows.update(changed)
+        self.removed_fechas.update(_iso_date(f) for f in removed_fechas if not pd.isnull(f))
+
+    def reset(self, child_id: int) -> None:
+        self.child_id = child_id
+        self.rows.clear()
+        self.removed_fechas.clear()
+
+    def pending(self, df: pd.DataFrame):
+        """(filas de 'df' a escribir, fechas a borrar que ya no están en 'df')."""
+        rows = df.loc[[label for label in df.index if label in self.rows]]
+        present = {_iso_date(f) for f in pd.to_datetime(df["Fecha"], errors="coerce").dropna()}
+        return rows, sorted(self.removed_fechas - present)
+
+
+class RowScores:
+    """
+    z-scores por fila y tabla de referencia; tras una edición solo se
+    recalculan las filas tocadas. Seguro entre hilos (tablero).
+    """
+
+    def __init__(self):
+        self._scores = {}  # clave -> DataFrame indexado como child_data
+        self._dirty = {}   # clave -> etiquetas a recalcular
+        self._tables = {}  # clave -> LMSTable de la referencia
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scores.clear()
+            self._dirty.clear()
+            self._tables.clear()
+
+    def invalidate(self, rows) -> None:
+        """Marca 'rows' (modificadas, añadidas o borradas) como pendientes en todas las tablas."""
+        with self._lock:
+            for dirty in self._dirty.values():
+                dirty.update(rows)
+
+    def scores(self, key, df_ref: pd.DataFrame, indicator_en: str, df_final: pd.DataFrame,
+               child_metric: str, child_birthdate) -> pd.DataFrame:
+        """Igual que calcular_zscores_nino, recalculando solo las filas pendientes o nuevas."""
+        key = (key, child_metric)
+        with self._lock:
+            cached = self._scores.get(key)
+            dirty = self._dirty.get(key, set())
+            self._dirty[key] = set()
+            table = self._tables.get(key)
+        if table is None:
+            table = LMSTable.from_frame(df_ref)
+        if cached is None:
+            result = calcular_zscores_nino(df_ref, indicator_en, df_final, child_metric,
+                                           child_birthdate, table=table)
+        else:
+            stale = dirty | set(df_final.index.difference(cached.index))
+            todo = [label for label in df_final.index if label in stale]
+            kept = cached.loc[cached.index.intersection(df_final.index).difference(todo)]
+            if todo:
+                fresh = calcular_zscores_nino(df_ref, indicator_en, df_final.loc[todo],
+                                              child_metric, child_birthdate, table=table)
+                kept = pd.concat([kept, fresh]) if len(kept) else fresh
+            result = kept.reindex(df_final.index)
+        with self._lock:
+            self._scores[key] = result
+            self._tables[key] = table
+        return result
+
+
+class FragmentDeps:
+    """
+    Claves de estado que lee cada fragmento de la página. Cada fragmento las
+    declara al ejecutarse; tras un cambio solo se vuelven a ejecutar los que
+    leyeron alguna de las claves cambiadas.
+    """
+
+    def __init__(self):
+        self._deps = {}  # fragmento -> claves, en orden de la página
+
+    def clear(self) -> None:
+        """Al empezar un rerun completo: se vuelven a declarar los fragmentos que se ejecuten."""
+        self._deps.clear()
+
+    def declare(self, fragment: str, *keys: str) -> None:
+        self._deps[fragment] = set(keys)
+
+    def depend(self, fragment: str, *keys: str) -> None:
+        """Añade claves leídas solo en esta ejecución (p. ej. según el indicador elegido)."""
+        self._deps.setdefault(fragment, set()).update(keys)
+
+    @property
+    def fragments(self) -> list:
+        return list(self._deps)
+
+    def dependents(self, *keys: str) -> list:
+        """Fragmentos (en orden de la página) que leen alguna de 'keys'."""
+        changed = set(keys)
+        return [fragment for fragment, deps in self._deps.items() if deps & changed]
@@ -0,0 +1,187 @@
+"""
+Rejillas densas precalculadas (LUT) de L, M y S para puntuar cohortes grandes.
+
+Cada (indicador, sexo) se evalúa una sola vez sobre una rejilla regular de
+la serie OMS continua (ver stitch.py): un punto por día de edad o cada
+0.1 cm de longitud/talla. Puntuar una medición es entonces un índice directo
+``round((x - x0) / paso)`` más la transformación LMS, sin búsqueda binaria ni
+interpolación. Las rejillas se guardan como ``.npy`` float32 de forma (n, 3),
+mapeables en memoria, de modo que todos los procesos de trabajo comparten las
+mismas páginas.
+
+Error frente a la interpolación exacta (LMSTable), medido al construir cada
+rejilla y guardado en el manifiesto (``max_abs_error_z``):
+- En los puntos de la rejilla solo hay redondeo a float32: |Δz| < 1e-5. Es el
+  caso normal: la edad se calcula en días enteros y la talla se registra con
+  un decimal.
+- Entre puntos se usa el vecino más cercano (a lo sumo medio paso: 12 horas o
+  0.05 cm). El error depende de la pendiente de la curva; el peor caso está
+  en las primeras semanas de peso para la edad y es del orden de 0.05-0.1 DE.
+  Si las X no caen en la rejilla, conviene la interpolación exacta.
+"""
+import json
+import os
+
+import numpy as np
+
+from crecimiento.cache import atomic_write
+from crecimiento.stitch import stitch_reference
+from crecimiento.zscore import INDICATOR_SPECS, LMSTable, lms_value, lms_zscore, zscore_to_percentile
+
+GRID_MANIFEST = "manifest.json"
+GRID_VERSION = 1
+# Paso de la rejilla según la variable X
+GRID_STEPS = {"age_days": 1.0, "height_cm": 0.1}
+GENDER_KEYS = ("boys", "girls")
+
+
+class LMSGrid:
+    """L, M, S en una rejilla regular x0 + i*step; misma interfaz que LMSTable para puntuar."""
+
+    def __init__(self, lms: np.ndarray, x0: float, step: float, x_min: float, x_max: float,
+                 x_kind: str):
+        self.lms = lms
+        self.x0 = x0
+        self.step = step
+        self.x_min = x_min
+        self.x_max = x_max
+        self.x_kind = x_kind
+
+    @classmethod
+    def from_table(cls, table: LMSTable, step: float = None):
+        """Evalúa 'table' (interpolación lineal exacta) en cada punto de la rejilla."""
+        step = step or GRID_STEPS[table.x_kind]
+        x_min, x_max = float(table.x[0]), float(table.x[-1])
+        x0 = np.ceil(round(x_min / step, 6)) * step
+        n = int(np.floor(round((x_max - x0) / step, 6))) + 1
+        L, M, S = table.interpolate(x0 + step * np.arange(n))
+        lms = np.ascontiguousarray(np.column_stack([L, M, S]), dtype="float32")
+        return cls(lms, float(x0), float(step), x_min, x_max, table.x_kind)
+
+    def __len__(self) -> int:
+        return len(self.lms)
+
+    @property
+    def grid_x(self) -> np.ndarray:
+        return self.x0 + self.step * np.arange(len(self.lms))
+
+    def lookup(self, x):
+        """L, M, S (float64) del punto de la rejilla más cercano; NaN fuera de rango."""
+        x = np.asarray(x, dtype="float64")
+        with np.errstate(invalid="ignore"):
+            pos = np.rint((x - self.x0) / self.step)
+            valid = (x >= self.x_min) & (x <= self.x_max)
+        idx = np.clip(np.where(valid, pos, 0), 0, len(self.lms) - 1).astype(np.intp)
+        # Una sola lectura por fila (L, M, S contiguos) y luego columnas contiguas
+        cols = self.lms[idx].T.astype("float64", order="C")
+        cols[:, ~valid] = np.nan
+        return cols[0], cols[1], cols[2]
+
+    def zscores(self, x, y, restricted_tails: bool = False):
+        L, M, S = self.lookup(x)
+        return lms_zscore(y, L, M, S, restricted_tails=restricted_tails)
+
+    def percentiles(self, x, y, restricted_tails: bool = False):
+        return zscore_to_percentile(self.zscores(x, y, restricted_tails))
+
+
+def grid_error(table: LMSTable, grid: LMSGrid, restricted_tails: bool = False) -> dict:
+    """Máximo |Δz| de la rejilla frente a la tabla exacta, en y fuera de sus puntos."""
+    zs = np.array([-3.0, -2.0, 0.0, 2.0, 3.0])
+
+    def max_error(x):
+        L, M, S = table.interpolate(x)
+        x_all = np.repeat(x, len(zs))
+        y = lms_value(np.repeat(L, len(zs)), np.repeat(M, len(zs)), np.repeat(S, len(zs)),
+                      np.tile(zs, len(x)))
+        exact = table.zscores(x_all, y, restricted_tails)
+        approx = grid.zscores(x_all, y, restricted_tails)
+        return float(np.nanmax(np.abs(approx - exact)))
+
+    on_grid = grid.grid_x
+    # Peor caso del vecino más cercano: justo antes de medio paso
+    off_grid = on_grid[:-1] + 0.499 * grid.step
+    return {"on_grid": max_error(on_grid), "off_grid": max_error(off_grid)}
+
+
+def grid_name(indicator: str, gender_key: str) -> str:
+    return f"{indicator}__{gender_key}"
+
+
+def build_grids(links_data: dict, out_dir: str, load, log=None) -> dict:
+    """
+    Construye y guarda las rejillas de todos los indicadores y sexos en 'out_dir'.
+    'load(url)' devuelve la tabla OMS original (p. ej. load_reference_frame).
+    Devuelve el manifiesto escrito, con el error máximo medido de cada rejilla.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    grids = {}
+    for indicator, (_, _, restricted) in INDICATOR_SPECS.items():
+        for gender_key in GENDER_KEYS:
+            try:
+                df = stitch_reference(links_data, indicator, "z", gender_key, load)
+            except KeyError:
+                df = None
+            if df is None:
+                if log:
+                    log(f"Omitido (sin tablas): {indicator} {gender_key}")
+                continue
+            table = LMSTable.from_frame(df)
+            grid = LMSGrid.from_table(table)
+            error = grid_error(table, grid, restricted)
+            name = grid_name(indicator, gender_key)
+            np.save(os.path.join(out_dir, name + ".npy"), grid.lms)
+            grids[name] = {
+                "file": name + ".npy",
+                "indicator": indicator,
+                "gender": gender_key,
+                "x_kind": grid.x_kind,
+                "x0": grid.x0,
+                "step": grid.step,
+                "x_min": grid.x_min,
+                "x_max": grid.x_max,
+                "points": len(grid),
+                "max_abs_error_z": error,
+            }
+            if log:
+                log(f"{name}: {len(grid)} puntos, |Δz| máx {error['on_grid']:.1e} en la rejilla, "
+                    f"{error['off_grid']:.1e} entre puntos")
+
+    manifest = {"version": GRID_VERSION, "grids": grids}
+    data = json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+    atomic_write(os.path.join(out_dir, GRID_MANIFEST), data)
+    return manifest
+
+
+class GridSet:
+    """Lectura de las rejillas de build_grids(), mapeadas en memoria y memorizadas."""
+
+    def __init__(self, directory: str, manifest: dict):
+        self.directory = directory
+        self.manifest = manifest
+        self._grids = {}
+
+    @classmethod
+    def open(cls, directory: str):
+        """Abre las rejillas de 'directory'; None si no existen o son de otra versión."""
+        try:
+            with open(os.path.join(directory, GRID_MANIFEST), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if manifest.get("version") != GRID_VERSION:
+            return None
+        return cls(directory, manifest)
+
+    def get(self, indicator: str, gender_key: str):
+        """LMSGrid de la combinación, o None si no se generó."""
+        name = grid_name(indicator, gender_key)
+        meta = self.manifest["grids"].get(name)
+        if meta is None:
+            return None
+        grid = self._grids.get(name)
+        if grid is None:
+            lms = np.load(os.path.join(self.directory, meta["file"]), mmap_mode="r")
+            grid = self._grids[name] = LMSGrid(lms, meta["x0"], meta["step"], meta["x_min"],
+                                               meta["x_max"], meta["x_kind"])
+        return grid
@@ -0,0 +1,197 @@
+"""
+Instrumentación ligera de las etapas de un rerun (descarga, lectura del Excel,
+renombrado, dibujo, st.image, ...).
+
+``METRICS.timer("etapa")`` (gestor de contexto) y ``@timed("etapa")``
+(decorador) registran cuántas veces se ejecutó cada etapa y cuánto tardó.
+Los contadores de las cachés se leen en el momento de exportar mediante
+colectores registrados con ``register_collector``. Los datos se exportan como
+líneas JSON (logger ``crecimiento.metrics``) y como texto Prometheus.
+
+Con el registro desactivado (por defecto; ``CRECIMIENTO_METRICS=1`` lo activa)
+``timer`` devuelve un contexto nulo compartido y el decorador solo comprueba
+un atributo, así que el costo es despreciable.
+"""
+import bisect
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+from crecimiento.cache import atomic_write
+
+# Límites (segundos) de los buckets del histograma Prometheus
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Muestras recientes por etapa para calcular p50/p95
+RECENT_SAMPLES = 1024
+
+logger = logging.getLogger("crecimiento.metrics")
+
+_NULL_TIMER = nullcontext()
+
+
+class _StageStats:
+    __slots__ = ("count", "total", "max", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+
+class _Timer:
+    __slots__ = ("registry", "stage", "start")
+
+    def __init__(self, registry, stage: str):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Registro de tiempos por etapa, seguro entre hilos y compartido por el proceso."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._stages = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    #######################################
+    # REGISTRO
+    #######################################
+    def timer(self, stage: str):
+        """Gestor de contexto que mide el bloque como 'stage' (no-op si está desactivado)."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _StageStats()
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.recent.append(seconds)
+            i = bisect.bisect_left(BUCKETS, seconds)
+            if i < len(BUCKETS):
+                stats.buckets[i] += 1
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"ts": round(time.time(), 3), "stage": stage,
+                                    "seconds": round(seconds, 6)}))
+
+    def register_collector(self, name: str, func) -> None:
+        """'func()' devuelve un dict de contadores (p. ej. cache.stats()); reemplaza al anterior."""
+        with self._lock:
+            self._collectors[name] = func
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+    #######################################
+    # CONSULTA Y EXPORTACIÓN
+    #######################################
+    def summary(self) -> "pd.DataFrame":
+        """Una fila por etapa: llamadas y latencias en milisegundos."""
+        import numpy as np
+        import pandas as pd
+
+        with self._lock:
+            rows = []
+            for stage, stats in sorted(self._stages.items()):
+                recent = np.fromiter(stats.recent, dtype="float64")
+                rows.append({
+                    "Etapa": stage,
+                    "Llamadas": stats.count,
+                    "Media (ms)": stats.total / stats.count * 1e3,
+                    "p50 (ms)": float(np.percentile(recent, 50)) * 1e3,
+                    "p95 (ms)": float(np.percentile(recent, 95)) * 1e3,
+                    "Máx (ms)": stats.max * 1e3,
+                    "Total (s)": stats.total,
+                })
+        return pd.DataFrame(rows, columns=["Etapa", "Llamadas", "Media (ms)", "p50 (ms)",
+                                           "p95 (ms)", "Máx (ms)", "Total (s)"])
+
+    def collect(self) -> dict:
+        """Contadores de todos los colectores, con la tasa de aciertos si aplica."""
+        with self._lock:
+            collectors = dict(self._collectors)
+        collected = {}
+        for name, func in collectors.items():
+            try:
+                values = dict(func())
+            except Exception as e:
+                logger.warning(json.dumps({"collector": name, "error": str(e)}))
+                continue
+            if "hits" in values and "misses" in values:
+                lookups = values["hits"] + values["misses"]
+                values["hit_rate"] = values["hits"] / lookups if lookups else 0.0
+            collected[name] = values
+        return collected
+
+    def to_json(self) -> dict:
+        return {"stages": self.summary().to_dict(orient="records"), "collectors": self.collect()}
+
+    def to_prometheus(self) -> str:
+        """Métricas en formato de texto de Prometheus."""
+        lines = [
+            "# HELP crecimiento_stage_seconds Duración de cada etapa del rerun.",
+            "# TYPE crecimiento_stage_seconds histogram",
+        ]
+        with self._lock:
+            stages = [(stage, stats.count, stats.total, list(stats.buckets))
+                      for stage, stats in sorted(self._stages.items())]
+        for stage, count, total, buckets in stages:
+            cumulative = 0
+            for bound, n in zip(BUCKETS, buckets):
+                cumulative += n
+                lines.append(f'crecimiento_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'crecimiento_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'crecimiento_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'crecimiento_stage_seconds_count{{stage="{stage}"}} {count}')
+        for name, values in sorted(self.collect().items()):
+            for key, value in sorted(values.items()):
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+                    lines.append(f'crecimiento_{key}{{source="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str) -> None:
+        """Escribe el archivo de texto de forma atómica (para el textfile collector)."""
+        atomic_write(path, self.to_prometheus().encode("utf-8"))
+
+
+METRICS = Metrics(enabled=os.environ.get("CRECIMIENTO_METRICS", "0") == "1")
+
+
+def timed(stage: str, registry: Metrics = None):
+    """Decorador que mide cada llamada a la función como 'stage'."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            reg = registry or METRICS
+            if not reg.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                reg.record(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
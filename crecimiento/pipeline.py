@@ -0,0 +1,241 @@
+"""
+Etapas de la app que no dependen de Streamlit: lectura y renombrado de las
+tablas OMS, z-scores del/la niño/a y armado de la gráfica de un indicador.
+
+TablaCrecimiento.py las envuelve con la caché y los mensajes de la interfaz;
+aquí se pueden llamar desde hilos de trabajo y desde los benchmarks.
+"""
+import os
+
+import pandas as pd
+
+from crecimiento.metrics import METRICS, timed
+from crecimiento.stitch import stitch_reference
+from crecimiento.zscore import LMSTable, score_indicator
+
+# Medición del/la niño/a y etiqueta del eje Y para cada indicador
+indicator_metrics = {
+    "length-height-for-age": ("Estatura (cm)", "Estatura (cm)"),
+    "weight-for-age": ("Peso (kg)", "Peso (kg)"),
+    "weight-for-length-height": ("Peso (kg)", "Peso (kg)"),
+    "body-mass-index-for-age": ("IMC", "IMC (kg/m²)"),
+    "head-circumference-for-age": ("Perímetro Cefálico (cm)", "Perímetro Cefálico (cm)"),
+}
+
+#######################################
+# LECTURA Y RENOMBRADO DE TABLAS OMS
+#######################################
+@timed("read_excel")
+def read_oms_excel_original(xlsx_path: str) -> pd.DataFrame:
+    """
+    Lee el Excel OMS **sin renombrar** para mostrar la ventana centrada con nombres originales.
+    """
+    if not os.path.exists(xlsx_path):
+        return None
+    df_original = pd.read_excel(xlsx_path, sheet_name=0)
+    return df_original
+
+@timed("rename_for_chart")
+def rename_for_chart(df: pd.DataFrame, indicator: str, score_type: str) -> pd.DataFrame:
+    """
+    Crea una copia y renombra columnas SOLO para la lógica interna de la gráfica.
+    No afecta la vista previa con columnas originales.
+    """
+    df_chart = df.copy()
+
+    rename_map_z = {
+        "Month": "Edad (meses)",
+        "Height": "Estatura (cm)",
+        "SD3neg": "ZScore_-3",
+        "SD2neg": "ZScore_-2",
+        "SD1neg": "ZScore_-1",
+        "SD0":    "ZScore_0",
+        "SD1":    "ZScore_+1",
+        "SD2":    "ZScore_+2",
+        "SD3":    "ZScore_+3"
+    }
+    rename_map_p = {
+        "Month": "Edad (meses)",
+        "Height": "Estatura (cm)",
+        "P3": "P3",
+        "P5": "P5",
+        "P50": "P50",
+        "P85": "P85",
+        "P97": "P97"
+    }
+    rename_map = rename_map_z if score_type == "z" else rename_map_p
+    df_chart = df_chart.rename(columns=rename_map)
+
+    if indicator == "weight-for-length-height":
+        x_col = "Estatura (cm)"
+    else:
+        x_col = "Edad (meses)"
+
+    # Convertir a numérico
+    if x_col in df_chart.columns:
+        df_chart[x_col] = pd.to_numeric(df_chart[x_col], errors="coerce")
+        df_chart.dropna(subset=[x_col], inplace=True)
+
+    if score_type == "z":
+        # Z-scores
+        for col in ["ZScore_-3", "ZScore_-2", "ZScore_-1", "ZScore_0", "ZScore_+1", "ZScore_+2", "ZScore_+3"]:
+            if col in df_chart.columns:
+                df_chart[col] = pd.to_numeric(df_chart[col], errors="coerce")
+        if "ZScore_0" in df_chart.columns:
+            df_chart.dropna(subset=["ZScore_0"], inplace=True)
+    else:
+        # Percentiles
+        for col in ["P3", "P5", "P50", "P85", "P97"]:
+            if col in df_chart.columns:
+                df_chart[col] = pd.to_numeric(df_chart[col], errors="coerce")
+
+    return df_chart
+
+def read_reference(url: str, bundle, cache) -> pd.DataFrame:
+    """Tabla OMS original: del paquete binario si existe, si no del Excel en la caché."""
+    df = None
+    if bundle is not None:
+        with METRICS.timer("bundle_load"):
+            df = bundle.load(url)
+    if df is None:
+        with METRICS.timer("download_excel"):
+            xlsx_path = cache.fetch(url)
+        df = read_oms_excel_original(xlsx_path)
+    return df
+
+def load_chart_reference(url: str, indicator: str, score_type: str, shared, bundle, cache):
+    """
+    Devuelve (tabla original, tabla renombrada) para 'url', compartidas entre sesiones.
+    """
+    df_original = shared.get_or_load(("original", url), lambda: read_reference(url, bundle, cache))
+    if df_original is None or df_original.empty:
+        return None, None
+    df_chart = shared.get_or_load(("chart", url, indicator, score_type),
+                                  lambda: rename_for_chart(df_original, indicator, score_type))
+    return df_original, df_chart
+
+def load_stitched_reference(links_data: dict, indicator: str, score_type: str, gender_key: str,
+                            shared, bundle, cache):
+    """
+    Como load_chart_reference, pero con la serie continua de todos los rangos de
+    edad (o de longitud/talla) de la combinación. KeyError si no hay enlaces.
+    """
+    key = ("stitched", indicator, score_type, gender_key)
+
+    def load_original():
+        with METRICS.timer("stitch_reference"):
+            return stitch_reference(links_data, indicator, score_type, gender_key,
+                                    lambda url: read_reference(url, bundle, cache))
+
+    df_original = shared.get_or_load(key, load_original)
+    if df_original is None or df_original.empty:
+        return None, None
+    df_chart = shared.get_or_load(("chart",) + key,
+                                  lambda: rename_for_chart(df_original, indicator, score_type))
+    return df_original, df_chart
+
+#######################################
+# GRÁFICA Y Z-SCORES DEL/LA NIÑO/A
+#######################################
+def calcular_zscores_nino(df_ref: pd.DataFrame, indicator_en: str, df_final: pd.DataFrame,
+                          child_metric: str, child_birthdate, table: LMSTable = None) -> pd.DataFrame:
+    """
+    Calcula z-score y percentil de todas las mediciones del/la niño/a de una vez.
+    'table' evita reconstruir la LMSTable de 'df_ref' si ya se tiene.
+    """
+    table = table or LMSTable.from_frame(df_ref)
+    fechas = pd.to_datetime(df_final["Fecha"], errors="coerce")
+    age_days = (fechas - pd.Timestamp(child_birthdate)).dt.days.to_numpy(dtype="float64")
+    height_cm = pd.to_numeric(df_final["Estatura (cm)"], errors="coerce").to_numpy(dtype="float64")
+    values = pd.to_numeric(df_final[child_metric], errors="coerce").to_numpy(dtype="float64")
+    z, pct = score_indicator(indicator_en, table, age_days=age_days, height_cm=height_cm, values=values)
+    return pd.DataFrame({
+        "Fecha": fechas.dt.date,
+        child_metric: values,
+        "Z-score": z.round(2),
+        "Percentil": pct.round(1),
+    })
+
+def build_indicator_chart(ref_key, df_ref: pd.DataFrame, indicator_en: str, indicator_es: str,
+                          score_type: str, child_metric: str, ylabel: str, child_color: str,
+                          child_x_col: str, df_final: pd.DataFrame, chart_cache,
+                          child_name: str, child_birthdate, row_scores=None):
+    """
+    Genera (imagen, tabla de z-scores o None, aviso o None) de un indicador sin usar st.*,
+    para poder llamarla desde hilos de trabajo. Lanza ValueError si faltan datos OMS.
+    'ref_key' identifica la tabla de referencia (URL o clave de la serie continua).
+    Con 'row_scores' (incremental.RowScores) solo se puntúan las filas modificadas.
+    """
+    x_label, titulo, child_x, child_y, warning = _chart_inputs(
+        df_ref, indicator_en, indicator_es, score_type, child_metric, child_x_col, df_final)
+
+    # Línea de evolución del niño sobre el fondo OMS en caché
+    chart_key = (ref_key, indicator_en, score_type, titulo, ylabel)
+    with METRICS.timer("render_chart"):
+        image = chart_cache.render(chart_key, df_ref, x_label, score_type, titulo, x_label, ylabel,
+                                   child_x, child_y, child_name, child_color)
+
+    scores = _child_scores(ref_key, df_ref, indicator_en, df_final, child_metric, child_birthdate,
+                           row_scores)
+    return image, scores, warning
+
+def build_indicator_spec(ref_key, df_ref: pd.DataFrame, indicator_en: str, indicator_es: str,
+                         score_type: str, child_metric: str, ylabel: str, child_color: str,
+                         child_x_col: str, df_final: pd.DataFrame, assets,
+                         child_name: str, child_birthdate, row_scores=None):
+    """
+    Como build_indicator_chart, pero devuelve una especificación Vega-Lite
+    (dict) en lugar de la imagen. Con 'assets' (vegalite.ReferenceAssets) las
+    curvas OMS van por URL a un archivo estático; con None, dentro de la spec.
+    """
+    from crecimiento.vegalite import chart_spec, inline_reference
+
+    x_label, titulo, child_x, child_y, warning = _chart_inputs(
+        df_ref, indicator_en, indicator_es, score_type, child_metric, child_x_col, df_final)
+
+    with METRICS.timer("chart_spec"):
+        if assets is not None:
+            reference = assets.reference((ref_key, score_type, x_label), df_ref, x_label,
+                                         score_type)
+        else:
+            reference = inline_reference(df_ref, x_label, score_type)
+        spec = chart_spec(reference, score_type, titulo, x_label, ylabel, child_x, child_y,
+                          child_name, child_color)
+
+    scores = _child_scores(ref_key, df_ref, indicator_en, df_final, child_metric, child_birthdate,
+                           row_scores)
+    return spec, scores, warning
+
+def _chart_inputs(df_ref: pd.DataFrame, indicator_en: str, indicator_es: str, score_type: str,
+                  child_metric: str, child_x_col: str, df_final: pd.DataFrame):
+    """(columna X de la referencia, título, serie X/Y del niño/a, aviso o None)."""
+    if indicator_en == "weight-for-length-height":
+        x_label = "Estatura (cm)"
+    else:
+        x_label = "Edad (meses)"
+
+    if x_label not in df_ref.columns:
+        raise ValueError(f"Los datos OMS no contienen la columna '{x_label}'.")
+
+    # Título en español
+    titulo = f"{indicator_es} ({score_type.upper()})"
+
+    warning = None
+    if not child_x_col:
+        child_x_col = "Estatura (cm)" if indicator_en == "weight-for-length-height" else "Edad (meses)"
+    if child_x_col in df_final.columns and child_metric in df_final.columns:
+        child_x, child_y = df_final[child_x_col], df_final[child_metric]
+    else:
+        warning = f"No se encontró la columna '{child_x_col}' o '{child_metric}' en los datos del/la niño/a."
+        child_x, child_y = [], []
+    return x_label, titulo, child_x, child_y, warning
+
+def _child_scores(ref_key, df_ref: pd.DataFrame, indicator_en: str, df_final: pd.DataFrame,
+                  child_metric: str, child_birthdate, row_scores):
+    if not {"L", "M", "S"}.issubset(df_ref.columns) or child_metric not in df_final.columns:
+        return None
+    with METRICS.timer("zscores"):
+        if row_scores is not None:
+            return row_scores.scores(ref_key, df_ref, indicator_en, df_final, child_metric,
+                                     child_birthdate)
+        return calcular_zscores_nino(df_ref, indicator_en, df_final, child_metric, child_birthdate)
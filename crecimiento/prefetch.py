@@ -0,0 +1,89 @@
+"""
+Descarga anticipada y concurrente de todo el catálogo de who_links.json.
+
+Todas las descargas comparten una sola ``requests.Session`` (pool de
+conexiones keep-alive) con timeouts y reintentos con espera exponencial. Un
+pool de hilos acotado reparte el trabajo y un semáforo por host limita las
+conexiones simultáneas contra cada servidor.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from crecimiento.bundle import iter_reference_links
+
+DEFAULT_WORKERS = 8
+DEFAULT_PER_HOST = 4
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+
+
+def make_session(pool_size: int = DEFAULT_WORKERS, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF) -> requests.Session:
+    """Sesión HTTP con pool keep-alive y reintentos con espera exponencial."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def prefetch_all(links_data: dict, cache, workers: int = DEFAULT_WORKERS,
+                 per_host: int = DEFAULT_PER_HOST, log=None) -> dict:
+    """
+    Descarga (o revalida) en 'cache' todos los Excel de 'links_data'.
+    Devuelve un resumen con los archivos listos, los fallidos y los segundos.
+    """
+    urls = sorted({url for *_, url in iter_reference_links(links_data)})
+    host_slots = {}
+    slots_lock = threading.Lock()
+
+    def slot_for(url):
+        host = urlsplit(url).netloc
+        with slots_lock:
+            if host not in host_slots:
+                host_slots[host] = threading.BoundedSemaphore(per_host)
+            return host_slots[host]
+
+    def fetch(url):
+        with slot_for(url):
+            try:
+                cache.fetch(url)
+                return url, None
+            except Exception as e:
+                return url, e
+
+    start = time.perf_counter()
+    ok, failed = [], {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for url, error in pool.map(fetch, urls):
+            if error is None:
+                ok.append(url)
+            else:
+                failed[url] = str(error)
+                if log:
+                    log(f"Error en {url}: {error}")
+    elapsed = time.perf_counter() - start
+    if log:
+        log(f"{len(ok)}/{len(urls)} archivos listos en {elapsed:.2f} s")
+    return {"ok": ok, "failed": failed, "seconds": elapsed}
+
+
+def start_background_prefetch(links_data: dict, cache, **kwargs) -> threading.Thread:
+    """Lanza prefetch_all() en un hilo daemon para no bloquear el arranque."""
+    thread = threading.Thread(target=prefetch_all, args=(links_data, cache), kwargs=kwargs,
+                              name="crecimiento-prefetch", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,270 @@
+"""
+Informes de crecimiento en lote (``python -m crecimiento report``).
+
+Genera, sin Streamlit, un informe por niño/a guardado en la base: una página
+de resumen con la última puntuación de cada indicador y una gráfica por
+indicador y tipo (z/p), en un PDF de varias páginas o en PNG (una imagen por
+página). Las gráficas se dibujan con la misma función que la app
+(build_indicator_chart) sobre lienzos Agg.
+
+Los niños/as se reparten en un pool de procesos. Cada proceso carga una vez
+las tablas OMS y los fondos de las curvas (ChartCache) y los reutiliza para
+todos sus niños/as; solo se recicla tras 'max_tasks_per_worker' informes,
+para acotar la memoria. La salida es determinista: los metadatos no llevan
+fecha y los nombres de archivo dependen solo del id y del nombre.
+"""
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.bundle import ReferenceBundle
+from crecimiento.cache import ReferenceCache
+from crecimiento.charts import DPI, FIGSIZE, ChartCache, close_figure
+from crecimiento.core import indicator_map_es, map_gender_to_key
+from crecimiento.db import MeasurementStore
+from crecimiento.derived import DerivedEngine
+from crecimiento.pipeline import build_indicator_chart, indicator_metrics, load_stitched_reference
+from crecimiento.store import SharedFrameStore
+
+FORMATS = ("pdf", "png")
+SCORE_TYPES = ("z", "p")
+# Sin fechas en los metadatos: el mismo historial produce el mismo archivo
+PDF_METADATA = {"Creator": "crecimiento", "CreationDate": None, "ModDate": None}
+PNG_METADATA = {"Software": None}
+# Informes por proceso antes de reemplazarlo (memoria acotada)
+DEFAULT_MAX_TASKS_PER_WORKER = 50
+# Fondos OMS por proceso: 5 indicadores x 2 tipos x 2 sexos
+CHART_CACHE_ENTRIES = 20
+
+
+def report_stem(child: dict) -> str:
+    """Nombre de archivo estable: id con ceros y nombre sin acentos."""
+    name = unicodedata.normalize("NFKD", child["name"]).encode("ascii", "ignore").decode()
+    name = re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_") or "sin_nombre"
+    return f"{int(child['id']):06d}_{name}"
+
+
+def latest_scores(scores: pd.DataFrame, child_metric: str):
+    """Última medición con z-score de una tabla de calcular_zscores_nino, o None."""
+    valid = scores[scores["Z-score"].notna()]
+    if valid.empty:
+        return None
+    row = valid.iloc[-1]
+    return row["Fecha"], row[child_metric], row["Z-score"], row["Percentil"]
+
+
+#######################################
+# PÁGINAS
+#######################################
+def _page():
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=FIGSIZE, dpi=DPI)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def cover_page(child: dict, history: pd.DataFrame, summary: list):
+    """Figura de resumen: datos del niño/a y última puntuación de cada indicador."""
+    fig = _page()
+    fig.text(0.05, 0.92, child["name"], fontsize=16, weight="bold")
+    fechas = pd.to_datetime(history["Fecha"], errors="coerce").dropna()
+    last = fechas.max().strftime("%Y-%m-%d") if len(fechas) else "-"
+    fig.text(0.05, 0.85, f"Sexo: {child['sex']}    Nacimiento: {child['birthdate']}    "
+                         f"Mediciones: {len(history)}    Última: {last}", fontsize=10)
+    ax = fig.add_axes([0.05, 0.05, 0.9, 0.72])
+    ax.axis("off")
+    rows = [[indicator_es, f"{fecha}", f"{value:.2f}", f"{z:+.2f}", f"{pct:.1f}"]
+            for indicator_es, (fecha, value, z, pct) in summary]
+    if rows:
+        table = ax.table(cellText=rows, colLabels=["Indicador", "Fecha", "Valor", "Z-score",
+                                                   "Percentil"],
+                         colWidths=[0.36, 0.16, 0.16, 0.16, 0.16], loc="upper center")
+        table.auto_set_font_size(False)
+        table.set_fontsize(9)
+        table.scale(1, 1.4)
+    else:
+        ax.text(0.5, 0.8, "Sin mediciones puntuables.", ha="center")
+    return fig
+
+
+class ImagePage:
+    """
+    Página con una gráfica ya rasterizada ocupando toda la hoja. Se crea una
+    vez y solo se cambian los píxeles de cada página (crear ejes es lo caro).
+    """
+
+    def __init__(self):
+        self.fig = _page()
+        ax = self.fig.add_axes([0, 0, 1, 1])
+        ax.axis("off")
+        width, height = FIGSIZE[0] * DPI, FIGSIZE[1] * DPI
+        self.image = ax.imshow(np.zeros((height, width, 3), dtype=np.uint8),
+                               interpolation="none")
+
+    def show(self, image: np.ndarray):
+        # Sin canal alfa (el fondo es opaco): el PDF guarda un tercio menos
+        self.image.set_data(image[..., :3])
+        return self.fig
+
+
+def write_pdf(path: str, cover, images: list, page: ImagePage) -> None:
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(path, metadata=PDF_METADATA) as pdf:
+        pdf.savefig(cover)
+        for image in images:
+            pdf.savefig(page.show(image))
+
+
+def write_png(directory: str, cover, images: list, titles: list) -> None:
+    from matplotlib.image import imsave
+
+    os.makedirs(directory, exist_ok=True)
+    cover.savefig(os.path.join(directory, "00_resumen.png"), metadata=PNG_METADATA)
+    for i, (image, title) in enumerate(zip(images, titles), start=1):
+        imsave(os.path.join(directory, f"{i:02d}_{title}.png"), image, metadata=PNG_METADATA)
+
+
+#######################################
+# INFORME DE UN NIÑO/A
+#######################################
+class ReportRenderer:
+    """Dibuja informes en un proceso, con tablas y fondos OMS compartidos entre niños/as."""
+
+    def __init__(self, links_data: dict, db_path: str, bundle_dir: str = None,
+                 cache_dir: str = None, score_types=SCORE_TYPES, shared_max_mb: float = 128):
+        self.links_data = links_data
+        self.store = MeasurementStore(db_path)
+        self.bundle = ReferenceBundle.open(bundle_dir) if bundle_dir else None
+        self.cache = ReferenceCache(cache_dir) if cache_dir else None
+        self.shared = SharedFrameStore(max_bytes=int(shared_max_mb * 2**20))
+        self.chart_cache = ChartCache(max_entries=CHART_CACHE_ENTRIES)
+        self.score_types = tuple(score_types)
+        self._page = None
+
+    def render(self, child_id: int, out_dir: str, fmt: str = "pdf") -> dict:
+        """Escribe el informe de 'child_id'; devuelve id, ruta, páginas y segundos."""
+        start = time.perf_counter()
+        child = self.store.get_child(child_id)
+        if child is None:
+            raise KeyError(f"No existe el niño/a con id {child_id}.")
+        birthdate = pd.Timestamp(child["birthdate"]).date()
+        history = self.store.load_history(child_id)
+        df = DerivedEngine().compute(history, {"birthdate": birthdate})
+        gender_key = map_gender_to_key(child["sex"])
+
+        images, titles, summary = [], [], []
+        for indicator_es, indicator_en in indicator_map_es.items():
+            child_metric, ylabel = indicator_metrics[indicator_en]
+            scored = False
+            for score_type in self.score_types:
+                try:
+                    _, df_ref = load_stitched_reference(self.links_data, indicator_en, score_type,
+                                                        gender_key, self.shared, self.bundle,
+                                                        self.cache)
+                except KeyError:
+                    continue
+                if df_ref is None:
+                    continue
+                try:
+                    image, scores, _ = build_indicator_chart(
+                        ("stitched", indicator_en, score_type, gender_key), df_ref, indicator_en,
+                        indicator_es, score_type, child_metric, ylabel, "blue", None, df,
+                        self.chart_cache, child["name"], birthdate)
+                except ValueError:
+                    continue
+                images.append(image)
+                titles.append(f"{indicator_en}_{score_type}")
+                if scores is not None and not scored:
+                    latest = latest_scores(scores, child_metric)
+                    if latest is not None:
+                        summary.append((indicator_es, latest))
+                    scored = True
+
+        cover = cover_page(child, history, summary)
+        try:
+            if fmt == "pdf":
+                path = os.path.join(out_dir, report_stem(child) + ".pdf")
+                if self._page is None:
+                    self._page = ImagePage()
+                write_pdf(path, cover, images, self._page)
+            else:
+                path = os.path.join(out_dir, report_stem(child))
+                write_png(path, cover, images, titles)
+        finally:
+            close_figure(cover)
+        return {"child_id": child_id, "path": path, "pages": len(images) + 1,
+                "seconds": time.perf_counter() - start}
+
+
+#######################################
+# POOL DE PROCESOS
+#######################################
+_worker_renderer = None
+
+
+def _init_worker(links_data, db_path, bundle_dir, cache_dir, score_types):
+    global _worker_renderer
+    _worker_renderer = ReportRenderer(links_data, db_path, bundle_dir, cache_dir, score_types)
+
+
+def _render_child(child_id: int, out_dir: str, fmt: str) -> dict:
+    return _worker_renderer.render(child_id, out_dir, fmt)
+
+
+def generate_reports(links_data: dict, db_path: str, out_dir: str, child_ids=None,
+                     fmt: str = "pdf", bundle_dir: str = None, cache_dir: str = None,
+                     score_types=SCORE_TYPES, workers: int = None,
+                     max_tasks_per_worker: int = DEFAULT_MAX_TASKS_PER_WORKER,
+                     progress=sys.stderr) -> dict:
+    """
+    Escribe en 'out_dir' un informe por niño/a ('child_ids' o todos los de la
+    base). Devuelve los informes (en orden de id), segundos e informes/s.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato '{fmt}' no soportado (use {', '.join(FORMATS)}).")
+    if child_ids is None:
+        child_ids = MeasurementStore(db_path).list_children()["id"].tolist()
+    child_ids = sorted(int(i) for i in child_ids)
+    os.makedirs(out_dir, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, max(len(child_ids), 1))
+    start = time.perf_counter()
+    reports = []
+
+    def report(result):
+        reports.append(result)
+        if progress is not None:
+            elapsed = time.perf_counter() - start
+            print(f"{len(reports)}/{len(child_ids)} informes  {len(reports) / elapsed:.1f}/s  "
+                  f"{result['path']}", file=progress, flush=True)
+
+    if workers <= 1:
+        renderer = ReportRenderer(links_data, db_path, bundle_dir, cache_dir, score_types)
+        for child_id in child_ids:
+            report(renderer.render(child_id, out_dir, fmt))
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker,
+                                 initargs=(links_data, db_path, bundle_dir, cache_dir,
+                                           tuple(score_types)),
+                                 max_tasks_per_child=max_tasks_per_worker) as pool:
+            # Como mucho 2 informes por proceso en vuelo, en orden de id
+            pending = deque()
+            for child_id in child_ids:
+                pending.append(pool.submit(_render_child, child_id, out_dir, fmt))
+                if len(pending) >= 2 * workers:
+                    report(pending.popleft().result())
+            while pending:
+                report(pending.popleft().result())
+
+    elapsed = time.perf_counter() - start
+    return {"reports": reports, "seconds": elapsed,
+            "reports_per_second": len(reports) / elapsed if elapsed else 0.0}
@@ -0,0 +1,280 @@
+"""
+Servicio HTTP (ASGI, Starlette) de puntuación OMS para otros sistemas.
+
+    python -m crecimiento serve --workers 4
+    uvicorn --factory crecimiento.service:app_from_env --workers 4
+
+Cada proceso de trabajo carga al arrancar todas las tablas de referencia
+(paquete binario, rejillas o Excel) y las mantiene en memoria entre
+peticiones. El costo de puntuar está dominado por el trabajo fijo de pandas
+por llamada, así que las peticiones individuales que llegan casi a la vez se
+agrupan (MicroBatcher) y se puntúan en una sola llamada.
+
+La configuración se lee de variables de entorno para que los procesos
+lanzados por uvicorn la hereden: ``CRECIMIENTO_LINKS``,
+``CRECIMIENTO_BUNDLE_DIR``, ``CRECIMIENTO_GRID_DIR``,
+``CRECIMIENTO_SOURCE_DIR`` y ``CRECIMIENTO_CACHE_DIR``.
+
+Rutas:
+    GET  /health              Estado y tablas cargadas.
+    GET  /reference-link      Rango de edad (get_age_range) y URL del Excel OMS
+                              (?indicator=&score_type=z|p&gender=Niño|Niña&age_months=).
+    POST /score               Una medición (objeto JSON) -> objeto JSON puntuado.
+    POST /score/batch         Varias mediciones: lista JSON, {"rows": [...]} o un
+                              stream Arrow IPC (application/vnd.apache.arrow.stream).
+                              La respuesta usa el mismo formato que la petición.
+
+Las mediciones usan las columnas de ``python -m crecimiento score``: ``Sexo``,
+``Fecha de Nacimiento``, ``Fecha``, ``Peso (kg)``, ``Estatura (cm)`` y
+``Perímetro Cefálico (cm)``; el resto de campos se devuelve tal cual. Cada
+fila puntuada lleva las banderas de calidad de crecimiento.validation (sin
+las reglas entre visitas: un lote puede mezclar niños/as).
+"""
+import asyncio
+import json
+import os
+from contextlib import asynccontextmanager
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from crecimiento.cohort import GENDER_KEYS, MEASUREMENT_COLUMNS, ReferenceTables, score_frame
+from crecimiento.core import get_age_range, indicator_map_es, lookup_reference_link
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+REQUIRED_FIELDS = ("Sexo", "Fecha de Nacimiento", "Fecha")
+# Máximo de filas por petición de lote
+MAX_BATCH_ROWS = int(os.environ.get("CRECIMIENTO_MAX_BATCH_ROWS", 100_000))
+# Agrupación de peticiones individuales: espera máxima (s) y filas por grupo
+MICROBATCH_WAIT = float(os.environ.get("CRECIMIENTO_MICROBATCH_WAIT", 0.002))
+MICROBATCH_ROWS = 256
+
+_REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ServiceError(Exception):
+    """Error de la petición; se responde con 'status' y el mensaje en JSON."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def load_tables(links_data: dict, bundle_dir: str = None, cache_dir: str = None,
+                source_dir: str = None, grid_dir: str = None) -> ReferenceTables:
+    """ReferenceTables con todas las combinaciones (indicador, sexo) ya cargadas."""
+    if bundle_dir and not os.path.isdir(bundle_dir):
+        bundle_dir = None
+    tables = ReferenceTables(links_data, bundle_dir=bundle_dir, cache_dir=cache_dir,
+                             source_dir=source_dir, grid_dir=grid_dir)
+    for indicator in indicator_map_es.values():
+        for gender_key in ("boys", "girls"):
+            tables.get(indicator, gender_key)
+    return tables
+
+
+#######################################
+# FORMATOS
+#######################################
+def _records_to_frame(records) -> pd.DataFrame:
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise ServiceError("Se esperaba una lista de objetos JSON (o {\"rows\": [...]}).")
+    return pd.DataFrame.from_records(records)
+
+
+def _frame_to_records(df: pd.DataFrame) -> list:
+    # Fechas como AAAA-MM-DD; to_json convierte NaN/NaT en null
+    df = df.assign(**{col: df[col].dt.strftime("%Y-%m-%d")
+                      for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])})
+    return json.loads(df.to_json(orient="records", force_ascii=False))
+
+
+def _read_arrow(body: bytes) -> pd.DataFrame:
+    import pyarrow as pa
+
+    try:
+        return pa.ipc.open_stream(body).read_pandas()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise ServiceError(f"Cuerpo Arrow IPC inválido: {e}")
+
+
+def _write_arrow(df: pd.DataFrame) -> bytes:
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _score(tables: ReferenceTables, df: pd.DataFrame) -> pd.DataFrame:
+    missing = [c for c in REQUIRED_FIELDS if c not in df.columns]
+    if len(df) == 0:
+        # Lote vacío ([] o un stream Arrow sin filas): respuesta vacía con las columnas de salida
+        df = df.reindex(columns=[*df.columns, *missing])
+    elif missing:
+        raise ServiceError(f"Faltan los campos {missing}.")
+    unknown = sorted(set(df["Sexo"].dropna().astype(str)) - set(GENDER_KEYS))
+    if unknown:
+        raise ServiceError(f"Sexo no reconocido: {unknown} (use {sorted(GENDER_KEYS)}).")
+    return score_frame(df, tables)
+
+
+class MicroBatcher:
+    """
+    Junta las peticiones individuales que llegan dentro de 'max_wait' segundos
+    (o hasta 'max_rows') y las puntúa en una sola llamada a score_frame.
+    """
+
+    def __init__(self, tables: ReferenceTables, max_wait: float = MICROBATCH_WAIT,
+                 max_rows: int = MICROBATCH_ROWS):
+        self.tables = tables
+        self.max_wait = max_wait
+        self.max_rows = max_rows
+        self._pending = []  # [(registro, future)]
+        self._timer = None
+
+    async def score(self, record: dict) -> dict:
+        # Validar antes de agrupar: un registro inválido no debe tumbar a los demás
+        missing = [c for c in REQUIRED_FIELDS if c not in record]
+        if missing:
+            raise ServiceError(f"Faltan los campos {missing}.")
+        if str(record["Sexo"]) not in GENDER_KEYS:
+            raise ServiceError(f"Sexo no reconocido: {record['Sexo']!r} (use {sorted(GENDER_KEYS)}).")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: list) -> None:
+        records = [record for record, _ in batch]
+        try:
+            scored = await run_in_threadpool(_score, self.tables, _records_to_frame(records))
+            results = _frame_to_records(scored)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        # Cada respuesta lleva sus campos y los calculados, no los de otras peticiones
+        foreign = set().union(*records) - set(MEASUREMENT_COLUMNS)
+        for (record, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result({k: v for k, v in result.items()
+                                   if k in record or k not in foreign})
+
+
+#######################################
+# RUTAS
+#######################################
+async def health(request):
+    tables = request.app.state.tables
+    loaded = sum(tables.get(indicator, gender_key) is not None
+                 for indicator in indicator_map_es.values() for gender_key in ("boys", "girls"))
+    return JSONResponse({"status": "ok", "tables": loaded, "pid": os.getpid()})
+
+
+async def reference_link(request):
+    params = request.query_params
+    try:
+        indicator = params["indicator"]
+        score_type = params.get("score_type", "z")
+        gender = params["gender"]
+        age_months = int(params["age_months"])
+    except (KeyError, ValueError):
+        raise ServiceError("Parámetros: indicator, gender, age_months (entero) y score_type.")
+    age_range = get_age_range(age_months, indicator)
+    try:
+        url = lookup_reference_link(request.app.state.links_data, indicator, score_type, gender,
+                                    age_months)
+    except KeyError:
+        raise ServiceError(f"No hay tabla OMS para '{indicator}', tipo '{score_type}', "
+                           f"rango '{age_range}'.", status=404)
+    return JSONResponse({"indicator": indicator, "score_type": score_type,
+                         "age_range": age_range, "url": url})
+
+
+async def score_one(request):
+    try:
+        record = await request.json()
+    except ValueError:
+        raise ServiceError("El cuerpo no es JSON válido.")
+    if not isinstance(record, dict):
+        raise ServiceError("Se esperaba un objeto JSON con una medición.")
+    return JSONResponse(await request.app.state.batcher.score(record))
+
+
+async def score_batch(request):
+    body = await request.body()
+    arrow = request.headers.get("content-type", "").startswith(ARROW_STREAM)
+    if arrow:
+        df = await run_in_threadpool(_read_arrow, body)
+    else:
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            raise ServiceError("El cuerpo no es JSON válido.")
+        df = _records_to_frame(payload["rows"] if isinstance(payload, dict) and "rows" in payload
+                               else payload)
+    if len(df) > MAX_BATCH_ROWS:
+        raise ServiceError(f"Máximo {MAX_BATCH_ROWS} filas por petición.", status=413)
+    scored = await run_in_threadpool(_score, request.app.state.tables, df)
+    if arrow:
+        return Response(await run_in_threadpool(_write_arrow, scored), media_type=ARROW_STREAM)
+    return JSONResponse({"rows": _frame_to_records(scored)})
+
+
+async def _service_error(request, exc: ServiceError):
+    return JSONResponse({"error": str(exc)}, status_code=exc.status)
+
+
+def create_app(links_data: dict, bundle_dir: str = None, cache_dir: str = None,
+               source_dir: str = None, grid_dir: str = None) -> Starlette:
+    """Aplicación Starlette; las tablas se cargan al arrancar (lifespan)."""
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.links_data = links_data
+        app.state.tables = await run_in_threadpool(load_tables, links_data, bundle_dir,
+                                                   cache_dir, source_dir, grid_dir)
+        app.state.batcher = MicroBatcher(app.state.tables)
+        yield
+
+    routes = [
+        Route("/health", health, methods=["GET"]),
+        Route("/reference-link", reference_link, methods=["GET"]),
+        Route("/score", score_one, methods=["POST"]),
+        Route("/score/batch", score_batch, methods=["POST"]),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan,
+                     exception_handlers={ServiceError: _service_error})
+
+
+def app_from_env() -> Starlette:
+    """Aplicación configurada con las variables de entorno CRECIMIENTO_*."""
+    links_path = os.environ.get("CRECIMIENTO_LINKS", os.path.join(_REPO_DIR, "who_links.json"))
+    with open(links_path, "r") as f:
+        links_data = json.load(f)
+    return create_app(
+        links_data,
+        bundle_dir=os.environ.get("CRECIMIENTO_BUNDLE_DIR",
+                                  os.path.join(_REPO_DIR, "reference_bundle")),
+        cache_dir=os.environ.get("CRECIMIENTO_CACHE_DIR", os.path.join(_REPO_DIR, "temp")),
+        source_dir=os.environ.get("CRECIMIENTO_SOURCE_DIR") or None,
+        grid_dir=os.environ.get("CRECIMIENTO_GRID_DIR") or None,
+    )
@@ -0,0 +1,91 @@
+"""
+Curvas de referencia OMS continuas por (indicador, tipo, sexo).
+
+La OMS publica cada indicador en varios Excel por rango de edad (0-13
+semanas, 0-2 años, 2-5 años, ...) o de longitud/talla. Aquí se unen en una
+sola serie ordenada y sin duplicados, de modo que cualquier medición se
+resuelve con una única búsqueda, sin enrutar filas por rango.
+
+Reglas de unión:
+- El eje X se lleva a una unidad común: ``Day`` (días) y ``Month`` (días /
+  30.4375) para los indicadores por edad, ``Height`` (cm) para peso para la
+  longitud/talla (la columna ``Length`` se renombra).
+- Las tablas se recorren de la más fina a la más gruesa (semanas antes que
+  meses) y, a igual paso, en orden de X. Cada tabla reclama su intervalo
+  [mín, máx]; de las siguientes solo se toman las filas fuera de los
+  intervalos ya reclamados. Así en 0-13 semanas manda la tabla semanal y en
+  24 meses la de 0-2 años.
+- Para peso para la longitud/talla, la tabla de longitud (45-110 cm) manda
+  en su intervalo y la de talla solo aporta 110-120 cm; la diferencia entre
+  ambas en la zona común es la de medir acostado o de pie (~0.7 cm).
+"""
+import numpy as np
+import pandas as pd
+
+from crecimiento.zscore import DAYS_PER_MONTH, X_COLUMNS
+
+# Columnas X de los Excel OMS originales, en orden de preferencia
+SOURCE_X_COLUMNS = ("Day", "Week", "Month", "Length", "Height")
+
+
+def reference_sources(links_data: dict, indicator: str, score_type: str, gender_key: str) -> list:
+    """[(rango, url), ...] de todos los Excel de la combinación; KeyError si no existe."""
+    return list(links_data[indicator][score_type][gender_key].items())
+
+
+def canonical_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Copia de la tabla con el eje X en la unidad común ('Day'+'Month' o 'Height')."""
+    for col in SOURCE_X_COLUMNS:
+        if col in df.columns:
+            break
+    else:
+        raise ValueError(f"La tabla OMS no tiene columna X reconocida: {list(df.columns)}")
+    x_kind, factor = X_COLUMNS[col]
+    x = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64") * factor
+    out = df.drop(columns=[c for c in SOURCE_X_COLUMNS if c in df.columns])
+    if x_kind == "age_days":
+        out.insert(0, "Month", x / DAYS_PER_MONTH)
+        out.insert(0, "Day", x)
+    else:
+        out.insert(0, "Height", x)
+    return out[~np.isnan(x)]
+
+
+def _x_column(df: pd.DataFrame) -> str:
+    return "Day" if "Day" in df.columns else "Height"
+
+
+def stitch_frames(frames) -> pd.DataFrame:
+    """Une tablas OMS de un mismo indicador en una serie continua ordenada por X."""
+    tables = [canonical_frame(df) for df in frames if df is not None and not df.empty]
+    if not tables:
+        return None
+    x_cols = {_x_column(t) for t in tables}
+    if len(x_cols) > 1:
+        raise ValueError("No se pueden unir tablas por edad con tablas por longitud/talla.")
+    x_col = x_cols.pop()
+
+    def resolution(t):
+        x = np.sort(t[x_col].to_numpy())
+        step = float(np.median(np.diff(x))) if len(x) > 1 else np.inf
+        return step, float(x[0])
+
+    claimed, pieces = [], []
+    for table in sorted(tables, key=resolution):
+        x = table[x_col].to_numpy()
+        keep = np.ones(len(x), dtype=bool)
+        for lo, hi in claimed:
+            keep &= (x < lo) | (x > hi)
+        pieces.append(table[keep])
+        claimed.append((float(x.min()), float(x.max())))
+
+    stitched = pd.concat(pieces, ignore_index=True)
+    stitched = stitched.sort_values(x_col, kind="stable").drop_duplicates(subset=[x_col])
+    return stitched.reset_index(drop=True)
+
+
+def stitch_reference(links_data: dict, indicator: str, score_type: str, gender_key: str,
+                     load) -> pd.DataFrame:
+    """Serie continua de la combinación; 'load(url)' devuelve la tabla original (o None)."""
+    sources = reference_sources(links_data, indicator, score_type, gender_key)
+    return stitch_frames(load(url) for _, url in sources)
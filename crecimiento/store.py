@@ -0,0 +1,181 @@
+"""
+Índice en memoria de las tablas OMS para búsquedas por edad o talla.
+
+Cada tabla se ordena una sola vez por su columna X y se guarda como arreglos
+contiguos; las consultas de fila más cercana, filas que encierran un valor y
+ventanas se responden con búsqueda binaria (``np.searchsorted``), tanto para
+un valor como para arreglos completos.
+
+SharedFrameStore guarda las tablas ya leídas y renombradas una sola vez por
+proceso, con un límite de memoria y un informe de bytes por tabla.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class ReferenceIndex:
+    """Tabla OMS ordenada por 'x_col' con consultas O(log n)."""
+
+    def __init__(self, df: pd.DataFrame, x_col: str):
+        x = pd.to_numeric(df[x_col], errors="coerce").to_numpy(dtype="float64")
+        # Igual que sort_values: orden estable y NaN al final
+        order = np.argsort(x, kind="stable")
+        self.x_col = x_col
+        self.frame = df.iloc[order].reset_index(drop=True)
+        self.x = np.ascontiguousarray(x[order])
+        self.n_valid = int(np.count_nonzero(~np.isnan(self.x)))
+        self.has_duplicates = bool(np.any(np.diff(self.x[:self.n_valid]) == 0))
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    #######################################
+    # CONSULTAS VECTORIZADAS
+    #######################################
+    def nearest_many(self, values) -> np.ndarray:
+        """
+        Posición de la fila más cercana a cada valor (empates -> la primera fila,
+        como abs().idxmin()). -1 para valores NaN o tablas sin X válida.
+        """
+        values = np.atleast_1d(np.asarray(values, dtype="float64"))
+        n = self.n_valid
+        if n == 0:
+            return np.full(values.shape, -1, dtype=np.intp)
+        x = self.x[:n]
+        pos = np.searchsorted(x, values, side="left")
+        lo = np.clip(pos - 1, 0, n - 1)
+        hi = np.clip(pos, 0, n - 1)
+        choose_lo = np.abs(values - x[lo]) <= np.abs(x[hi] - values)
+        nearest = np.where(choose_lo, lo, hi)
+        if self.has_duplicates:
+            # Con X repetidas, idxmin devuelve la primera aparición
+            nearest = np.searchsorted(x, x[nearest], side="left")
+        return np.where(np.isnan(values), -1, nearest)
+
+    def brackets(self, values):
+        """
+        Para cada valor: (fila inferior, fila superior, peso de interpolación).
+        Fuera del rango de la tabla se devuelven los extremos con peso NaN.
+        """
+        values = np.atleast_1d(np.asarray(values, dtype="float64"))
+        n = self.n_valid
+        x = self.x[:n]
+        lo = np.clip(np.searchsorted(x, values, side="right") - 1, 0, max(n - 2, 0))
+        hi = np.minimum(lo + 1, n - 1)
+        dx = x[hi] - x[lo]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            weight = np.where(dx > 0, (values - x[lo]) / dx, 0.0)
+        outside = (values < x[0]) | (values > x[-1]) | np.isnan(values)
+        return lo, hi, np.where(outside, np.nan, weight)
+
+    def window_starts(self, values, window: int = 5) -> np.ndarray:
+        """Fila inicial de la ventana de 'window' filas centrada en cada valor."""
+        nearest = self.nearest_many(values)
+        total = len(self.frame)
+        start = np.maximum(0, nearest - window // 2)
+        start = np.where(start + window > total, np.maximum(0, total - window), start)
+        return np.where(nearest < 0, -1, start)
+
+    def windows(self, values, window: int = 5) -> list:
+        """Lista de ventanas (DataFrames) para un arreglo de valores."""
+        return [self.frame.iloc[0:0] if s < 0 else self.frame.iloc[s:s + window]
+                for s in self.window_starts(values, window)]
+
+    #######################################
+    # CONSULTAS DE UN SOLO VALOR
+    #######################################
+    def nearest(self, value: float) -> int:
+        return int(self.nearest_many(value)[0])
+
+    def window(self, value: float, window: int = 5) -> pd.DataFrame:
+        """Ventana de 'window' filas centrada en la fila más cercana a 'value'."""
+        return self.windows(value, window)[0]
+
+
+class ReferenceStore:
+    """Índices por (clave, columna X), construidos una sola vez y compartidos entre hilos."""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def index(self, key: str, df: pd.DataFrame, x_col: str) -> ReferenceIndex:
+        """Índice de 'df' ordenado por 'x_col'; 'key' identifica la tabla (p. ej. su URL)."""
+        cache_key = (key, x_col)
+        index = self._indexes.get(cache_key)
+        if index is None:
+            index = ReferenceIndex(df, x_col)
+            with self._lock:
+                index = self._indexes.setdefault(cache_key, index)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+
+class SharedFrameStore:
+    """
+    DataFrames de referencia compartidos por todo el proceso, con desalojo LRU
+    por bytes. Cada tabla se carga una sola vez aunque varias sesiones la pidan
+    a la vez; quien la recibe obtiene una copia superficial (copy-on-write),
+    así que modificarla no altera la versión compartida.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._frames = OrderedDict()  # clave -> (DataFrame, bytes)
+        self._lock = threading.Lock()
+        self._loading = {}            # clave -> Lock, para cargar una sola vez
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get_or_load(self, key, loader) -> pd.DataFrame:
+        """Tabla para 'key'; si no está, la crea con loader() (None no se guarda)."""
+        with self._lock:
+            if key in self._frames:
+                self._frames.move_to_end(key)
+                self._counters["hits"] += 1
+                return self._frames[key][0].copy(deep=False)
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._frames:
+                    self._frames.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return self._frames[key][0].copy(deep=False)
+                self._counters["misses"] += 1
+            df = loader()
+            if df is not None:
+                self._put(key, df)
+            with self._lock:
+                self._loading.pop(key, None)
+        return df.copy(deep=False) if df is not None else None
+
+    def _put(self, key, df: pd.DataFrame) -> None:
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            self._frames[key] = (df, nbytes)
+            self._frames.move_to_end(key)
+            total = sum(b for _, b in self._frames.values())
+            while total > self.max_bytes and len(self._frames) > 1:
+                _, (_, evicted) = self._frames.popitem(last=False)
+                total -= evicted
+                self._counters["evictions"] += 1
+
+    def memory_report(self) -> pd.DataFrame:
+        """Bytes retenidos por cada tabla, de la más a la menos usada recientemente."""
+        with self._lock:
+            rows = [{"Tabla": key if isinstance(key, str) else " | ".join(map(str, key)),
+                     "Filas": len(df), "Bytes": nbytes}
+                    for key, (df, nbytes) in reversed(self._frames.items())]
+        return pd.DataFrame(rows, columns=["Tabla", "Filas", "Bytes"])
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["tables"] = len(self._frames)
+            stats["bytes"] = sum(b for _, b in self._frames.values())
+        return stats
@@ -0,0 +1,194 @@
+"""
+Validación de mediciones: valores biológicamente implausibles (BIV) y errores
+de carga (unidades, peso y talla invertidos, fechas).
+
+Las filas no se eliminan ni se corrigen: cada regla enciende un bit de una
+máscara entera por fila (COL_FLAGS) y COL_FLAG_CODES la resume con los
+códigos de FLAGS separados por comas. Todas las reglas se evalúan en bloque
+sobre columnas NumPy, así que la validación puede ir dentro de la puntuación
+por lotes (millones de filas por segundo).
+
+- BIV: cortes de la OMS sobre el z-score de cada indicador (WHO Anthro):
+  talla para la edad < -6 o > 6, peso para la edad < -6 o > 5, y peso para
+  la talla, IMC y perímetro cefálico < -5 o > 5.
+- Unidades: un valor fuera de PLAUSIBLE_RANGES que sí cae en el rango al
+  pasarlo de mm, m o g es casi seguro un error de unidad.
+- Peso y talla invertidos: el peso en kg de un niño/a siempre es menor que su
+  talla en cm; si además cada valor cabe en el rango del otro, se intercambiaron.
+- Fechas: sin fecha, anterior al nacimiento, futura, repetida para el mismo
+  niño/a, o una talla que baja más de HEIGHT_DECREASE_CM respecto de la
+  visita anterior (suele ser una fecha mal escrita o visitas desordenadas).
+"""
+import numpy as np
+import pandas as pd
+
+from crecimiento.analytics import previous_valid, z_column
+from crecimiento.columnar import to_datetime
+from crecimiento.core import indicator_map_es
+
+COL_FLAGS = "Banderas de calidad"
+COL_FLAG_CODES = "Códigos de calidad"
+
+# Código -> descripción; el bit de cada código es su posición
+FLAGS = {
+    "BIV_TALLA_EDAD": "z de talla para la edad < -6 o > 6",
+    "BIV_PESO_EDAD": "z de peso para la edad < -6 o > 5",
+    "BIV_PESO_TALLA": "z de peso para la talla < -5 o > 5",
+    "BIV_IMC_EDAD": "z de IMC para la edad < -5 o > 5",
+    "BIV_PC_EDAD": "z de perímetro cefálico para la edad < -5 o > 5",
+    "TALLA_EN_MM": "Estatura en milímetros",
+    "TALLA_EN_M": "Estatura en metros",
+    "PESO_EN_G": "Peso en gramos",
+    "PC_EN_MM": "Perímetro cefálico en milímetros",
+    "PESO_TALLA_INVERTIDOS": "Peso y estatura intercambiados",
+    "FUERA_DE_RANGO": "Medición fuera del rango posible",
+    "FECHA_INVALIDA": "Fecha vacía o inválida",
+    "FECHA_ANTES_NACIMIENTO": "Fecha anterior al nacimiento",
+    "FECHA_FUTURA": "Fecha posterior a hoy",
+    "FECHA_DUPLICADA": "Más de una medición en la misma fecha",
+    "TALLA_DISMINUYE": "Estatura menor que en la visita anterior",
+}
+FLAG_BITS = {code: 1 << i for i, code in enumerate(FLAGS)}
+
+# Indicador -> (código, z mínimo, z máximo)
+BIV_LIMITS = {
+    "length-height-for-age": ("BIV_TALLA_EDAD", -6.0, 6.0),
+    "weight-for-age": ("BIV_PESO_EDAD", -6.0, 5.0),
+    "weight-for-length-height": ("BIV_PESO_TALLA", -5.0, 5.0),
+    "body-mass-index-for-age": ("BIV_IMC_EDAD", -5.0, 5.0),
+    "head-circumference-for-age": ("BIV_PC_EDAD", -5.0, 5.0),
+}
+# Rango posible de cada medición de 0 a 19 años (más amplio que cualquier tabla OMS)
+PLAUSIBLE_RANGES = {
+    "Peso (kg)": (0.3, 250.0),
+    "Estatura (cm)": (30.0, 230.0),
+    "Perímetro Cefálico (cm)": (18.0, 70.0),
+}
+# Columna -> [(código, factor a la unidad esperada)]
+UNIT_ERRORS = {
+    "Estatura (cm)": [("TALLA_EN_MM", 0.1), ("TALLA_EN_M", 100.0)],
+    "Peso (kg)": [("PESO_EN_G", 0.001)],
+    "Perímetro Cefálico (cm)": [("PC_EN_MM", 0.1)],
+}
+# Descenso de talla entre visitas que no se explica por error de medición
+HEIGHT_DECREASE_CM = 2.0
+
+
+def _values(df: pd.DataFrame, col: str) -> np.ndarray:
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _days(dates) -> np.ndarray:
+    """Días desde 1970 (NaN sin fecha) de una columna de fechas de cualquier tipo."""
+    dates = to_datetime(pd.Series(dates))
+    return (dates - pd.Timestamp("1970-01-01")).dt.days.to_numpy(dtype="float64",
+                                                                 na_value=np.nan)
+
+
+def flag_measurements(df: pd.DataFrame, id_col: str = None, birthdate=None,
+                      today=None, visits: bool = True) -> np.ndarray:
+    """
+    Máscara de FLAG_BITS (int32, una por fila de 'df', en su orden). Usa las
+    columnas que haya: mediciones, "Fecha", "Fecha de Nacimiento" (o la fecha
+    'birthdate' si es un solo niño/a) y los z-scores de cohort.score_frame.
+    'id_col' separa a los niños/as para las reglas entre visitas (None = todas
+    las filas son del mismo); con visits=False solo se validan filas sueltas.
+    """
+    n = len(df)
+    flags = np.zeros(n, dtype=np.int32)
+    if n == 0:
+        return flags
+
+    def flag(code, mask):
+        flags[mask] |= FLAG_BITS[code]
+
+    for indicator_es, indicator in indicator_map_es.items():
+        z_col = z_column(indicator_es)
+        if z_col in df.columns:
+            code, low, high = BIV_LIMITS[indicator]
+            z = _values(df, z_col)
+            flag(code, (z < low) | (z > high))
+
+    values = {col: _values(df, col) for col in PLAUSIBLE_RANGES}
+    weight, height = values["Peso (kg)"], values["Estatura (cm)"]
+    w_low, w_high = PLAUSIBLE_RANGES["Peso (kg)"]
+    h_low, h_high = PLAUSIBLE_RANGES["Estatura (cm)"]
+    # Intercambiados: cada valor cabe en el rango del otro
+    swapped = ((weight > height) & (height >= w_low) & (height <= w_high)
+               & (weight >= h_low) & (weight <= h_high))
+    flag("PESO_TALLA_INVERTIDOS", swapped)
+    for col, (low, high) in PLAUSIBLE_RANGES.items():
+        value = values[col]
+        outside = (value < low) | (value > high)
+        explained = swapped.copy() if col != "Perímetro Cefálico (cm)" else np.zeros(n, dtype=bool)
+        for code, factor in UNIT_ERRORS[col]:
+            converted = value * factor
+            unit_error = outside & ~explained & (converted >= low) & (converted <= high)
+            flag(code, unit_error)
+            explained |= unit_error
+        flag("FUERA_DE_RANGO", outside & ~explained)
+
+    if "Fecha" not in df.columns:
+        return flags
+    days = _days(df["Fecha"])
+    flag("FECHA_INVALIDA", np.isnan(days))
+    if "Fecha de Nacimiento" in df.columns:
+        birth = _days(df["Fecha de Nacimiento"])
+    elif birthdate is not None:
+        birth = np.full(n, _days([birthdate])[0])
+    else:
+        birth = np.full(n, np.nan)
+    flag("FECHA_ANTES_NACIMIENTO", days < birth)
+    today = pd.Timestamp.today() if today is None else pd.Timestamp(today)
+    flag("FECHA_FUTURA", days > (today.normalize() - pd.Timestamp("1970-01-01")).days)
+    if not visits:
+        return flags
+
+    # Reglas entre visitas: filas ordenadas por (niño/a, fecha)
+    if id_col is None:
+        codes = np.zeros(n, dtype=np.int64)
+    else:
+        codes = pd.factorize(df[id_col], use_na_sentinel=True)[0].astype(np.int64)
+    has_date = ~np.isnan(days) & (codes >= 0)
+    order = np.lexsort((np.where(has_date, days, np.inf), codes))
+    codes_s, days_s, dated_s = codes[order], days[order], has_date[order]
+
+    same_day = np.zeros(n, dtype=bool)
+    same_day[1:] = ((codes_s[1:] == codes_s[:-1]) & (days_s[1:] == days_s[:-1])
+                    & dated_s[1:] & dated_s[:-1])
+    duplicated = same_day.copy()
+    duplicated[:-1] |= same_day[1:]
+    flag("FECHA_DUPLICADA", order[duplicated])
+
+    # Solo estaturas en rango: un error de unidad ya tiene su bandera
+    height_s = height[order]
+    measured = dated_s & (height_s >= h_low) & (height_s <= h_high)
+    prev = previous_valid(codes_s, measured)
+    has_prev = (prev >= 0) & measured
+    before = np.maximum(prev, 0)
+    decrease = (has_prev & (days_s > days_s[before])
+                & (height_s < height_s[before] - HEIGHT_DECREASE_CM))
+    flag("TALLA_DISMINUYE", order[decrease])
+    return flags
+
+
+def flag_codes(flags: np.ndarray) -> pd.Categorical:
+    """Códigos de cada máscara separados por comas ("" sin banderas), como categorías."""
+    unique, inverse = np.unique(flags, return_inverse=True)
+    labels = [",".join(code for code, bit in FLAG_BITS.items() if value & bit)
+              for value in unique]
+    return pd.Categorical.from_codes(inverse.reshape(-1), categories=labels)
+
+
+def describe_flags(value: int) -> list:
+    """Descripciones (FLAGS) de los bits encendidos en 'value'."""
+    return [FLAGS[code] for code, bit in FLAG_BITS.items() if int(value) & bit]
+
+
+def annotate(df: pd.DataFrame, id_col: str = None, birthdate=None, today=None,
+             visits: bool = True) -> pd.DataFrame:
+    """'df' con COL_FLAGS y COL_FLAG_CODES añadidas (no se elimina ninguna fila)."""
+    flags = flag_measurements(df, id_col=id_col, birthdate=birthdate, today=today, visits=visits)
+    return df.assign(**{COL_FLAGS: flags, COL_FLAG_CODES: flag_codes(flags)})
@@ -0,0 +1,134 @@
+"""
+Gráficas de crecimiento como especificación Vega-Lite (las dibuja el navegador).
+
+En lugar de rasterizar una figura en el servidor en cada rerun, se envía una
+especificación declarativa: las curvas OMS y la serie del niño/a como CSV
+compacto, con zoom y desplazamiento (rueda y arrastre) y tooltips.
+
+Las curvas OMS de cada (indicador, tipo, sexo) no cambian entre reruns, así
+que ReferenceAssets las escribe una sola vez como archivo estático con nombre
+según su contenido (``static/oms/oms_<hash>.csv``, servido por Streamlit en
+``app/static/...`` con ``server.enableStaticServing``). La especificación
+solo lleva la URL: el navegador descarga cada tabla una vez y en los reruns
+siguientes solo viajan la serie del niño/a y ~2 KB de especificación.
+Sin servidor de estáticos, las curvas van dentro de la especificación.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.charts import PERCENTILE_CURVES, ZSCORE_CURVES
+
+SCHEMA_URL = "https://vega.github.io/schema/vega-lite/v5.json"
+CHART_HEIGHT = 400
+# Cifras significativas del CSV de curvas (las tablas OMS traen 4-5)
+FLOAT_FORMAT = "%.6g"
+# Fecha de modificación fija (2000-01-01) de los CSV: el nombre ya depende del
+# contenido, así Last-Modified/ETag no cambian entre reinicios y el navegador
+# los considera frescos (el servidor de estáticos no responde 304)
+ASSET_MTIME = 946684800
+
+
+def reference_curves(score_type: str) -> dict:
+    return ZSCORE_CURVES if score_type == "z" else PERCENTILE_CURVES
+
+
+def reference_csv(df_ref: pd.DataFrame, x_col: str, score_type: str):
+    """(CSV ancho 'x' + una columna por curva con su etiqueta, etiquetas en orden)."""
+    curves = {key: label for key, (label, _) in reference_curves(score_type).items()
+              if key in df_ref.columns}
+    df = df_ref[[x_col, *curves]].rename(columns={x_col: "x", **curves})
+    df = df[pd.to_numeric(df["x"], errors="coerce").notna()]
+    return df.to_csv(index=False, float_format=FLOAT_FORMAT), list(curves.values())
+
+
+def _csv_format(columns) -> dict:
+    return {"type": "csv", "parse": {col: "number" for col in columns}}
+
+
+def inline_reference(df_ref: pd.DataFrame, x_col: str, score_type: str) -> dict:
+    """Fuente de datos Vega-Lite con las curvas dentro de la especificación."""
+    text, labels = reference_csv(df_ref, x_col, score_type)
+    return {"values": text, "format": _csv_format(["x", *labels])}
+
+
+class ReferenceAssets:
+    """CSV de curvas OMS escritos una vez por contenido y servidos como estáticos."""
+
+    def __init__(self, directory: str, url_prefix: str = "app/static/oms"):
+        self.directory = directory
+        self.url_prefix = url_prefix.rstrip("/")
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def reference(self, key, df_ref: pd.DataFrame, x_col: str, score_type: str) -> dict:
+        """Fuente de datos Vega-Lite ({"url": ...}) con las curvas de 'key'."""
+        with self._lock:
+            data = self._data.get(key)
+        if data is not None:
+            return data
+        text, labels = reference_csv(df_ref, x_col, score_type)
+        name = f"oms_{hashlib.sha1(text.encode()).hexdigest()[:16]}.csv"
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.utime(tmp, (ASSET_MTIME, ASSET_MTIME))
+            os.replace(tmp, path)
+        data = {"url": f"{self.url_prefix}/{name}", "format": _csv_format(["x", *labels])}
+        with self._lock:
+            self._data[key] = data
+        return data
+
+
+def child_csv(child_x, child_y) -> str:
+    x = pd.to_numeric(pd.Series(child_x), errors="coerce").to_numpy(dtype="float64")
+    y = pd.to_numeric(pd.Series(child_y), errors="coerce").to_numpy(dtype="float64")
+    valid = ~(np.isnan(x) | np.isnan(y))
+    return pd.DataFrame({"x": x[valid], "y": y[valid]}).to_csv(index=False,
+                                                               float_format=FLOAT_FORMAT)
+
+
+def chart_spec(reference_data: dict, score_type: str, title: str, xlabel: str, ylabel: str,
+               child_x, child_y, label: str, color: str) -> dict:
+    """
+    Especificación Vega-Lite: curvas OMS discontinuas ('reference_data', de
+    inline_reference o ReferenceAssets.reference) y la serie del niño/a.
+    """
+    curves = list(reference_curves(score_type).values())
+    labels = [curve_label for curve_label, _ in curves]
+    color_encoding = {
+        "field": "Serie", "type": "nominal", "title": None, "sort": None,
+        "scale": {"domain": labels + [label], "range": [c for _, c in curves] + [color]},
+    }
+    x = {"field": "x", "type": "quantitative", "title": xlabel}
+    y = {"field": "y", "type": "quantitative", "title": ylabel, "scale": {"zero": False}}
+    return {
+        "$schema": SCHEMA_URL,
+        "title": title,
+        "height": CHART_HEIGHT,
+        "layer": [
+            {
+                "data": reference_data,
+                "transform": [{"fold": labels, "as": ["Serie", "y"]}],
+                "mark": {"type": "line", "strokeDash": [6, 4], "strokeWidth": 1.5},
+                "encoding": {"x": x, "y": y, "color": color_encoding},
+                # Zoom con la rueda y desplazamiento arrastrando
+                "params": [{"name": "zoom", "select": "interval", "bind": "scales"}],
+            },
+            {
+                "data": {"values": child_csv(child_x, child_y), "format": _csv_format(["x", "y"])},
+                "transform": [{"calculate": json.dumps(label), "as": "Serie"}],
+                "mark": {"type": "line", "point": True},
+                "encoding": {"x": x, "y": y, "color": color_encoding,
+                             "tooltip": [x, {"field": "y", "type": "quantitative",
+                                             "title": ylabel, "format": ".2f"}]},
+            },
+        ],
+    }
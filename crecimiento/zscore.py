@@ -0,0 +1,168 @@
+"""
+Motor vectorizado de z-scores y percentiles OMS (método LMS).
+
+Las tablas OMS traen las columnas L, M y S para cada fila de referencia
+(edad en días/semanas/meses o longitud/talla en cm). Para una medición y:
+
+    z = ((y / M) ** L - 1) / (L * S)      si L != 0
+    z = ln(y / M) / S                     si L == 0
+
+Para los indicadores basados en peso la OMS restringe las colas más allá de
+±3 DE: fuera de ese rango la distancia se mide en unidades de la brecha entre
+las curvas de 2 y 3 DE, en lugar de seguir la curva LMS.
+"""
+import numpy as np
+import pandas as pd
+
+DAYS_PER_MONTH = 30.4375
+DAYS_PER_WEEK = 7
+
+# Columna X de los Excel OMS -> (variable, factor para pasar a días o cm)
+X_COLUMNS = {
+    "Day": ("age_days", 1.0),
+    "Week": ("age_days", DAYS_PER_WEEK),
+    "Month": ("age_days", DAYS_PER_MONTH),
+    "Length": ("height_cm", 1.0),
+    "Height": ("height_cm", 1.0),
+    # Nombres tras rename_for_chart()
+    "Edad (meses)": ("age_days", DAYS_PER_MONTH),
+    "Estatura (cm)": ("height_cm", 1.0),
+}
+
+# Indicador -> (columna de medición en child_data, variable X, colas restringidas)
+INDICATOR_SPECS = {
+    "length-height-for-age": ("Estatura (cm)", "age_days", False),
+    "weight-for-age": ("Peso (kg)", "age_days", True),
+    "weight-for-length-height": ("Peso (kg)", "height_cm", True),
+    "body-mass-index-for-age": ("IMC", "age_days", True),
+    "head-circumference-for-age": ("Perímetro Cefálico (cm)", "age_days", False),
+}
+
+
+#######################################
+# FÓRMULAS LMS
+#######################################
+def lms_value(L, M, S, z):
+    """Valor de la medición que corresponde al z-score 'z' (inversa de LMS)."""
+    L, M, S, z = (np.asarray(a, dtype="float64") for a in (L, M, S, z))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        box_cox = M * np.power(1 + L * S * z, 1 / L)
+        return np.where(L == 0, M * np.exp(S * z), box_cox)
+
+
+def lms_zscore(y, L, M, S, restricted_tails: bool = False):
+    """
+    z-score LMS exacto para arreglos de mediciones 'y' con sus L, M, S.
+    Con 'restricted_tails' aplica el ajuste OMS para |z| > 3.
+    """
+    y, L, M, S = (np.asarray(a, dtype="float64") for a in (y, L, M, S))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = y / M
+        z = np.where(L == 0, np.log(ratio) / S, (np.power(ratio, L) - 1) / (L * S))
+        if restricted_tails:
+            high = z > 3
+            low = z < -3
+            if high.any():
+                sd3 = lms_value(L, M, S, 3)
+                sd23 = sd3 - lms_value(L, M, S, 2)
+                z = np.where(high, 3 + (y - sd3) / sd23, z)
+            if low.any():
+                sd3neg = lms_value(L, M, S, -3)
+                sd23neg = lms_value(L, M, S, -2) - sd3neg
+                z = np.where(low, -3 + (y - sd3neg) / sd23neg, z)
+    return z
+
+
+def normal_cdf(z):
+    """
+    Función de distribución normal estándar, vectorizada sin SciPy.
+    Usa la aproximación de Chebyshev de erfc (error relativo < 1.2e-7).
+    """
+    z = np.asarray(z, dtype="float64")
+    x = np.abs(z) / np.sqrt(2.0)
+    t = 1.0 / (1.0 + 0.5 * x)
+    poly = -1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277))))))))
+    erfc = t * np.exp(-x * x + poly)
+    return np.where(z >= 0, 1.0 - 0.5 * erfc, 0.5 * erfc)
+
+
+def zscore_to_percentile(z):
+    """Percentil (0-100) correspondiente a un arreglo de z-scores."""
+    return 100.0 * normal_cdf(z)
+
+
+#######################################
+# TABLAS DE REFERENCIA
+#######################################
+class LMSTable:
+    """
+    Columnas L, M, S de una tabla OMS ordenadas por X (días de edad o cm),
+    con interpolación lineal vectorizada entre filas.
+    """
+
+    def __init__(self, x, L, M, S, x_kind: str):
+        order = np.argsort(x, kind="stable")
+        self.x = np.ascontiguousarray(np.asarray(x, dtype="float64")[order])
+        self.L = np.ascontiguousarray(np.asarray(L, dtype="float64")[order])
+        self.M = np.ascontiguousarray(np.asarray(M, dtype="float64")[order])
+        self.S = np.ascontiguousarray(np.asarray(S, dtype="float64")[order])
+        self.x_kind = x_kind
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        """Crea la tabla desde un DataFrame OMS (nombres originales o de rename_for_chart)."""
+        for col, (x_kind, factor) in X_COLUMNS.items():
+            if col in df.columns:
+                break
+        else:
+            raise ValueError(f"La tabla OMS no tiene columna X reconocida: {list(df.columns)}")
+        missing = [c for c in ("L", "M", "S") if c not in df.columns]
+        if missing:
+            raise ValueError(f"La tabla OMS no tiene las columnas {missing}.")
+        numeric = df[[col, "L", "M", "S"]].apply(pd.to_numeric, errors="coerce").dropna()
+        return cls(numeric[col].to_numpy() * factor, numeric["L"].to_numpy(),
+                   numeric["M"].to_numpy(), numeric["S"].to_numpy(), x_kind)
+
+    def interpolate(self, x):
+        """
+        L, M, S interpolados en 'x' (misma unidad que self.x).
+        Los valores fuera del rango de la tabla devuelven NaN.
+        """
+        x = np.asarray(x, dtype="float64")
+        n = len(self.x)
+        # Una sola búsqueda binaria, reutilizada para las tres columnas
+        idx = np.clip(np.searchsorted(self.x, x, side="right") - 1, 0, n - 2)
+        x0 = self.x[idx]
+        dx = self.x[idx + 1] - x0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(dx > 0, (x - x0) / dx, 0.0)
+        outside = (x < self.x[0]) | (x > self.x[-1]) | np.isnan(x)
+        w = np.where(outside, np.nan, w)
+        L = self.L[idx] + w * (self.L[idx + 1] - self.L[idx])
+        M = self.M[idx] + w * (self.M[idx + 1] - self.M[idx])
+        S = self.S[idx] + w * (self.S[idx + 1] - self.S[idx])
+        return L, M, S
+
+    def zscores(self, x, y, restricted_tails: bool = False):
+        """z-scores de las mediciones 'y' tomadas en 'x'."""
+        L, M, S = self.interpolate(x)
+        return lms_zscore(y, L, M, S, restricted_tails=restricted_tails)
+
+    def percentiles(self, x, y, restricted_tails: bool = False):
+        """Percentiles (0-100) de las mediciones 'y' tomadas en 'x'."""
+        return zscore_to_percentile(self.zscores(x, y, restricted_tails))
+
+
+def score_indicator(indicator: str, table: LMSTable, age_days=None, height_cm=None, values=None):
+    """
+    z-scores y percentiles de 'values' para 'indicator' contra 'table'.
+    Usa 'age_days' o 'height_cm' como X según el indicador.
+    """
+    _, x_kind, restricted = INDICATOR_SPECS[indicator]
+    x = age_days if x_kind == "age_days" else height_cm
+    if table.x_kind != x_kind:
+        raise ValueError(f"La tabla usa '{table.x_kind}' pero '{indicator}' requiere '{x_kind}'.")
+    z = table.zscores(x, values, restricted_tails=restricted)
+    return z, zscore_to_percentile(z)
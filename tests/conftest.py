@@ -0,0 +1,116 @@
+import hashlib
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "benchmarks", "fixtures")
+LAST_MODIFIED = "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+class StandIn:
+    """
+    Servidor HTTP local que hace de CDN de la OMS: sirve los archivos de
+    'directory' con ETag y Last-Modified (304 si la petición condicional
+    coincide). 'responses' programa estados por ruta (se consumen en orden),
+    'delay' retrasa cada respuesta y las rutas de 'stalled' no responden hasta
+    el cierre. Registra las peticiones, su hora de llegada y la concurrencia
+    máxima por host.
+    """
+
+    def __init__(self, directory: str = FIXTURES_DIR):
+        self.directory = directory
+        self.responses = defaultdict(list)
+        self.stalled = set()
+        self.delay = 0.0
+        self.requests = []
+        self.arrivals = []
+        self.peak = defaultdict(int)
+        self._active = defaultdict(int)
+        self._lock = threading.Lock()
+        self._release = threading.Event()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, name: str, host: str = "127.0.0.1") -> str:
+        return f"http://{host}:{self.port}/{name}?sfvrsn=1"
+
+    def count(self, name: str) -> int:
+        return sum(path == f"/{name}" for path, _ in self.requests)
+
+    def _handler(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stand_in._serve(self)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _serve(self, request) -> None:
+        path = request.path.split("?")[0]
+        host = request.headers.get("Host", "").split(":")[0]
+        with self._lock:
+            self.requests.append((path, dict(request.headers)))
+            self.arrivals.append((path, time.monotonic()))
+            self._active[host] += 1
+            self.peak[host] = max(self.peak[host], self._active[host])
+            scripted = self.responses[path].pop(0) if self.responses[path] else None
+        try:
+            if path in self.stalled:
+                self._release.wait(30)
+                return
+            time.sleep(self.delay)
+            if scripted is not None:
+                self._send(request, scripted)
+                return
+            file_path = os.path.join(self.directory, path.lstrip("/"))
+            if not os.path.isfile(file_path):
+                self._send(request, 404)
+                return
+            with open(file_path, "rb") as f:
+                body = f.read()
+            etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+            headers = {"ETag": etag, "Last-Modified": LAST_MODIFIED}
+            if request.headers.get("If-None-Match") == etag:
+                self._send(request, 304, headers=headers)
+            else:
+                self._send(request, 200, body, headers)
+        finally:
+            with self._lock:
+                self._active[host] -= 1
+
+    @staticmethod
+    def _send(request, status: int, body: bytes = b"", headers: dict = None) -> None:
+        request.send_response(status)
+        for name, value in (headers or {}).items():
+            request.send_header(name, value)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._release.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    with StandIn() as server:
+        yield server
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crecimiento.analytics import (
+    COL_ALERTA, CROSSING_ALERT_LINES, MAJOR_CENTILE_Z, MIN_INTERVAL_DAYS, VELOCITY_COLUMNS,
+    child_summary, growth_analytics, previous_valid, z_column,
+)
+from crecimiento.zscore import DAYS_PER_MONTH
+
+INDICATORS = ["Peso para la edad", "Talla para la edad"]
+
+
+def cohort(n_children: int = 40, seed: int = 7) -> pd.DataFrame:
+    """Visitas desordenadas, con fechas repetidas, huecos (NaN) y filas sin fecha o sin id."""
+    rng = np.random.default_rng(seed)
+    visits = rng.integers(1, 9, n_children)
+    ids = np.repeat([f"N{i:03d}" for i in range(n_children)], visits).astype(object)
+    n = len(ids)
+    days = rng.integers(0, 720, n)
+    df = pd.DataFrame({
+        "ID": ids,
+        "Fecha": pd.Timestamp("2022-01-01") + pd.to_timedelta(days, unit="D"),
+        "Peso (kg)": 3.5 + days / 60 + rng.normal(0, 0.4, n),
+        "Estatura (cm)": 50 + days / 20 + rng.normal(0, 1.5, n),
+        "Perímetro Cefálico (cm)": 35 + days / 80 + rng.normal(0, 0.5, n),
+    })
+    for indicator_es in INDICATORS:
+        df[z_column(indicator_es)] = rng.normal(0, 1.5, n)
+    for col in list(VELOCITY_COLUMNS) + [z_column(i) for i in INDICATORS]:
+        df.loc[rng.random(n) < 0.2, col] = np.nan
+    # Misma fecha dos veces, visitas a menos de MIN_INTERVAL_DAYS, sin fecha y sin id
+    df.loc[1, ["ID", "Fecha"]] = df.loc[0, ["ID", "Fecha"]].to_numpy()
+    df.loc[3, "Fecha"] = df.loc[2, "Fecha"] + pd.Timedelta(days=MIN_INTERVAL_DAYS - 1)
+    df.loc[4, "Fecha"] = pd.NaT
+    df.loc[5, "ID"] = None
+    return df.sample(frac=1, random_state=seed).set_index(np.arange(n) * 10)
+
+
+def naive_band(z: float) -> float:
+    return float(sum(line <= z for line in MAJOR_CENTILE_Z))
+
+
+def naive_analytics(df: pd.DataFrame, id_col: str = "ID") -> pd.DataFrame:
+    """growth_analytics niño por niño, con un bucle sobre sus visitas ordenadas por fecha."""
+    out = pd.DataFrame(np.nan, index=df.index, columns=["Días desde la visita anterior"]
+                       + list(VELOCITY_COLUMNS.values())
+                       + [f"Δz ({i})" for i in INDICATORS]
+                       + [f"Líneas cruzadas ({i})" for i in INDICATORS])
+    out[COL_ALERTA] = False
+    dated = df[df["Fecha"].notna() & df[id_col].notna()]
+    for _, child in dated.groupby(id_col):
+        # Orden estable: visitas del mismo día en el orden de la tabla
+        child = child.assign(_pos=[df.index.get_loc(i) for i in child.index])
+        child = child.sort_values(["Fecha", "_pos"])
+        last = {}
+        for label, row in child.iterrows():
+            if "any" in last:
+                out.at[label, "Días desde la visita anterior"] = (row["Fecha"] - last["any"]).days
+            last["any"] = row["Fecha"]
+            for col, vel_col in VELOCITY_COLUMNS.items():
+                if np.isnan(row[col]):
+                    continue
+                if col in last:
+                    fecha, value = last[col]
+                    interval = (row["Fecha"] - fecha).days
+                    if interval >= MIN_INTERVAL_DAYS:
+                        out.at[label, vel_col] = (row[col] - value) / (interval / DAYS_PER_MONTH)
+                last[col] = (row["Fecha"], row[col])
+            for indicator_es in INDICATORS:
+                z = row[z_column(indicator_es)]
+                if np.isnan(z):
+                    continue
+                if indicator_es in last:
+                    crossed = naive_band(z) - naive_band(last[indicator_es])
+                    out.at[label, f"Δz ({indicator_es})"] = z - last[indicator_es]
+                    out.at[label, f"Líneas cruzadas ({indicator_es})"] = crossed
+                    if abs(crossed) >= CROSSING_ALERT_LINES:
+                        out.at[label, COL_ALERTA] = True
+                last[indicator_es] = z
+    return out
+
+
+def test_matches_naive_per_child_loop():
+    df = cohort()
+    got = growth_analytics(df, id_col="ID")
+    expected = naive_analytics(df)
+    assert got.index.equals(df.index)
+    pd.testing.assert_frame_equal(got[df.columns], df)
+    for col in expected.columns:
+        if col.startswith("Líneas cruzadas"):
+            assert got[col].dtype == "Int64"
+            np.testing.assert_array_equal(got[col].to_numpy(dtype="float64", na_value=np.nan),
+                                          expected[col].to_numpy(), err_msg=col)
+        elif col == COL_ALERTA:
+            assert got[col].tolist() == expected[col].tolist()
+        else:
+            np.testing.assert_allclose(got[col].to_numpy(), expected[col].to_numpy(),
+                                       rtol=1e-12, err_msg=col)
+    # Hay de todo: velocidades, huecos y alertas
+    assert got["Velocidad peso (kg/mes)"].notna().sum() > 50
+    assert got["Velocidad peso (kg/mes)"].isna().sum() > 50
+    assert got[COL_ALERTA].any() and not got[COL_ALERTA].all()
+
+
+def test_single_child_without_id_col():
+    df = cohort(n_children=1, seed=3)
+    df = df[df["ID"].notna()]
+    got = growth_analytics(df)
+    expected = naive_analytics(df)
+    np.testing.assert_allclose(got["Velocidad estatura (cm/mes)"].to_numpy(),
+                               expected["Velocidad estatura (cm/mes)"].to_numpy())
+    assert got[COL_ALERTA].tolist() == expected[COL_ALERTA].tolist()
+
+
+def test_previous_valid_skips_gaps_and_children():
+    codes = np.array([0, 0, 0, 0, 1, 1, 1])
+    valid = np.array([True, False, False, True, False, True, True])
+    assert previous_valid(codes, valid).tolist() == [-1, 0, 0, 0, -1, -1, 5]
+
+
+def test_child_summary():
+    df = cohort()
+    summary = child_summary(growth_analytics(df, id_col="ID"), "ID")
+    expected = naive_analytics(df).assign(ID=df["ID"]).groupby("ID")
+    assert summary["ID"].tolist() == sorted(df["ID"].dropna().unique())
+    assert summary["Visitas"].tolist() == expected.size().tolist()
+    assert summary[COL_ALERTA].tolist() == expected[COL_ALERTA].any().tolist()
+    col = "Líneas cruzadas (Peso para la edad)"
+    np.testing.assert_array_equal(
+        summary["Mayor caída (Peso para la edad)"].to_numpy(dtype="float64", na_value=np.nan),
+        expected[col].min().to_numpy())
+
+
+@pytest.mark.parametrize("z,band", [(-3.0, 0), (-8 / 3, 1), (0.0, 5), (2.7, 9), (np.nan, np.nan)])
+def test_centile_band_edges(z, band):
+    got = growth_analytics(pd.DataFrame({"Fecha": ["2023-01-01", "2023-03-01"],
+                                         z_column("Peso para la edad"): [-3.0, z]}))
+    crossed = got["Líneas cruzadas (Peso para la edad)"].iloc[1]
+    assert (pd.isna(crossed) and np.isnan(band)) or crossed == band
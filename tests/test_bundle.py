@@ -0,0 +1,24 @@
+import json
+import os
+
+import numpy as np
+
+from crecimiento.bundle import ReferenceBundle, build_bundle, iter_reference_links
+from tests.conftest import FIXTURES_DIR, REPO_DIR
+
+
+def test_bundle_columns_are_views_of_the_mapped_array(tmp_path):
+    with open(os.path.join(REPO_DIR, "who_links.json"), "r") as f:
+        links = {"weight-for-age": json.load(f)["weight-for-age"]}
+    build_bundle(links, str(tmp_path), source_dir=FIXTURES_DIR)
+    bundle = ReferenceBundle.open(str(tmp_path))
+    url = next(url for *_, url in iter_reference_links(links))
+    name = bundle._by_url[url]
+
+    df = bundle.load(url)
+    array = bundle.load_array(name)
+    floats = [col for col in df.columns if df[col].dtype == np.float64]
+    assert floats
+    assert all(np.shares_memory(df[col].to_numpy(), array) for col in floats)
+    for i, col in enumerate(df.columns):
+        assert np.array_equal(df[col].to_numpy(), array[:, i])
@@ -0,0 +1,93 @@
+import os
+import time
+
+from crecimiento.cache import ReferenceCache, url_key
+from tests.conftest import FIXTURES_DIR, LAST_MODIFIED, StandIn
+
+NAMES = ["lhfa_boys_0-to-13-weeks_zscores.xlsx", "lhfa_boys_0-to-2-years_zscores.xlsx",
+         "lhfa_boys_2-to-5-years_zscores.xlsx"]
+
+
+def fixture_bytes(name: str) -> bytes:
+    with open(os.path.join(FIXTURES_DIR, name), "rb") as f:
+        return f.read()
+
+
+def test_hit_and_miss_counters(tmp_path, stand_in):
+    cache = ReferenceCache(str(tmp_path))
+    url = stand_in.url(NAMES[0])
+    path = cache.fetch(url)
+    assert cache.fetch(url) == path
+    with open(path, "rb") as f:
+        assert f.read() == fixture_bytes(NAMES[0])
+
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["network_calls"]) == (1, 1, 1)
+    assert stats["entries"] == 1
+    assert stats["bytes"] == len(fixture_bytes(NAMES[0]))
+    # Una caché nueva sobre el mismo directorio sirve la entrada sin red
+    reopened = ReferenceCache(str(tmp_path))
+    assert reopened.fetch(url) == path
+    assert reopened.stats()["network_calls"] == 0
+
+
+def test_conditional_revalidation_round_trip(tmp_path, stand_in):
+    cache = ReferenceCache(str(tmp_path), ttl=0)
+    url = stand_in.url(NAMES[0])
+    path = cache.fetch(url)
+    entry = cache._index[url_key(url)]
+    assert entry["etag"] and entry["last_modified"] == LAST_MODIFIED
+
+    cache.fetch(url)
+    _, headers = stand_in.requests[-1]
+    assert headers["If-None-Match"] == entry["etag"]
+    assert headers["If-Modified-Since"] == LAST_MODIFIED
+    assert cache.stats()["not_modified"] == 1
+    assert cache.stats()["revalidated"] == 0
+    with open(path, "rb") as f:
+        assert f.read() == fixture_bytes(NAMES[0])
+
+
+def test_not_modified_only_refreshes_timestamp(tmp_path, stand_in):
+    cache = ReferenceCache(str(tmp_path), ttl=0)
+    url = stand_in.url(NAMES[0])
+    path = cache.fetch(url)
+    before = dict(cache._index[url_key(url)])
+    mtime = os.stat(path).st_mtime_ns
+    time.sleep(0.01)
+
+    cache.fetch(url)
+    after = cache._index[url_key(url)]
+    assert after["fetched_at"] > before["fetched_at"]
+    assert {k: v for k, v in after.items() if k not in ("fetched_at", "last_access")} == \
+        {k: v for k, v in before.items() if k not in ("fetched_at", "last_access")}
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+def test_stale_copy_served_on_network_error(tmp_path):
+    cache = ReferenceCache(str(tmp_path), ttl=0, timeout=2)
+    with StandIn() as server:
+        url = server.url(NAMES[0])
+        path = cache.fetch(url)
+    # Servidor cerrado: la revalidación falla y se sirve la copia vencida
+    assert cache.fetch(url) == path
+    assert cache.stats()["stale_served"] == 1
+    with open(path, "rb") as f:
+        assert f.read() == fixture_bytes(NAMES[0])
+
+
+def test_lru_eviction_by_size(tmp_path, stand_in):
+    sizes = [len(fixture_bytes(name)) for name in NAMES]
+    cache = ReferenceCache(str(tmp_path), max_bytes=sizes[0] + max(sizes[1:]))
+    first, second, third = (stand_in.url(name) for name in NAMES)
+    cache.fetch(first)
+    cache.fetch(second)
+    time.sleep(0.01)
+    cache.fetch(first)  # la segunda pasa a ser la menos usada
+    cache.fetch(third)
+
+    assert cache.stats()["evictions"] == 1
+    assert not os.path.exists(cache.path_for(second))
+    assert os.path.exists(cache.path_for(first)) and os.path.exists(cache.path_for(third))
+    assert url_key(second) not in ReferenceCache(str(tmp_path))._index
+    assert cache.stats()["bytes"] <= cache.max_bytes
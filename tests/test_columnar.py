@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crecimiento.columnar import DEFAULT_ROW_GROUP_SIZE, MeasurementWriter, read_measurements
+from crecimiento.compact import compact_frame
+
+ROWS = DEFAULT_ROW_GROUP_SIZE + 6_000
+
+
+def cohort(rows: int = ROWS) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    birth = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D")
+    return pd.DataFrame({
+        "ID": np.arange(rows) // 4,
+        "Sexo": rng.choice(["Niño", "Niña"], rows),
+        "Fecha de Nacimiento": birth,
+        "Fecha": birth + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D"),
+        "Peso (kg)": rng.uniform(3, 30, rows).round(1),
+    })
+
+
+def test_compact_dates_survive_row_groups(tmp_path):
+    # Cada grupo de filas se convierte desde un bloque de iloc, con índice desde 64.000
+    df = cohort()
+    path = str(tmp_path / "cohorte.parquet")
+    writer = MeasurementWriter(path)
+    writer.write(compact_frame(df, categorical=("ID",)))
+    writer.close()
+
+    result = read_measurements(path)
+    assert len(result) == ROWS
+    for col in ("Fecha", "Fecha de Nacimiento"):
+        assert result[col].notna().all()
+        assert (result[col].to_numpy() == df[col].to_numpy()).all()
+
+
+def test_writer_types_columns_empty_in_first_row_group(tmp_path):
+    df = cohort()
+    notes = pd.Series(None, index=df.index, dtype=object)
+    notes.iloc[DEFAULT_ROW_GROUP_SIZE:] = "control"
+    df["Nota"] = notes
+    path = str(tmp_path / "cohorte.arrow")
+    writer = MeasurementWriter(path)
+    writer.write(df)
+    writer.close()
+
+    result = read_measurements(path)
+    assert result["Nota"].isna().sum() == DEFAULT_ROW_GROUP_SIZE
+    assert (result["Nota"].iloc[DEFAULT_ROW_GROUP_SIZE:] == "control").all()
+
+
+@pytest.mark.parametrize("name", ["vacio.parquet", "vacio.arrow"])
+def test_writer_empty_frame_writes_schema(tmp_path, name):
+    path = str(tmp_path / name)
+    writer = MeasurementWriter(path)
+    writer.write(cohort().iloc[:0])
+    writer.close()
+
+    result = read_measurements(path)
+    assert len(result) == 0
+    assert list(result.columns) == list(cohort(1).columns)
+    assert pd.api.types.is_datetime64_any_dtype(result["Fecha"])
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crecimiento.__main__ import main
+from crecimiento.columnar import read_measurements, write_measurements
+from crecimiento.compact import CohortReader, compact_frame
+from tests.test_columnar import cohort
+
+
+def test_compact_frame_keeps_integer_width():
+    df = pd.DataFrame({"Peso (kg)": [3.2, 4.1], "Edad (meses)": [1, 2],
+                       "Visita": np.array([1, 2], dtype=np.int8),
+                       "Código": np.array([70_000, 3], dtype=np.int32)})
+    compact = compact_frame(df)
+    assert compact["Edad (meses)"].dtype == pd.Int16Dtype()
+    assert compact["Visita"].dtype == pd.Int8Dtype()
+    assert compact["Código"].dtype == pd.Int32Dtype()
+    assert compact["Código"].tolist() == [70_000, 3]
+
+
+def test_cohort_reader_budget_chunks_round_trip(tmp_path):
+    path = str(tmp_path / "cohorte.parquet")
+    write_measurements(cohort(), path, row_group_size=8_000)
+    expected = read_measurements(path)
+    row_bytes = CohortReader(path, id_col="ID").row_bytes
+    # Presupuesto para unas 20.000 filas: varios bloques de niños/as completos
+    reader = CohortReader(path, id_col="ID", memory_budget=int(row_bytes * 6 * 20_000))
+    assert reader.chunks > 2
+
+    chunks = list(reader)
+    ids = [set(chunk["ID"].astype(int)) for chunk in chunks]
+    assert sum(len(i) for i in ids) == len(set().union(*ids))  # ningún niño/a partido
+    result = pd.concat([chunk.astype({"ID": "int64"}) for chunk in chunks])
+    result = result.sort_values(["ID", "Fecha", "Peso (kg)"]).reset_index(drop=True)
+    expected = expected.sort_values(["ID", "Fecha", "Peso (kg)"]).reset_index(drop=True)
+    assert len(result) == len(expected)
+    assert (result["ID"].to_numpy() == expected["ID"].to_numpy()).all()
+    for col in ("Fecha", "Fecha de Nacimiento"):
+        assert (pd.to_datetime(result[col]).to_numpy() == expected[col].to_numpy()).all()
+    assert np.allclose(result["Peso (kg)"].to_numpy(float), expected["Peso (kg)"].to_numpy())
+
+
+@pytest.mark.parametrize("command", [["memory"],
+                                     ["analytics", "-o", "salida.parquet", "--id-col", "ID"]])
+def test_cli_reports_small_memory_budget(tmp_path, capsys, command):
+    path = str(tmp_path / "cohorte.parquet")
+    write_measurements(pd.DataFrame({"ID": range(1000), "Peso (kg)": 10.0}), path)
+    with pytest.raises(SystemExit) as exit_info:
+        main([command[0], path, *command[1:], "--memory-budget", "1K"])
+    assert exit_info.value.code == 2
+    assert "presupuesto" in capsys.readouterr().err.lower()
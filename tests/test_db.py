@@ -0,0 +1,104 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.db import MeasurementStore
+
+
+def measurements(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["Fecha", "Peso (kg)", "Estatura (cm)",
+                                       "Perímetro Cefálico (cm)"]).assign(
+        Fecha=lambda df: pd.to_datetime(df["Fecha"]))
+
+
+def stored(store: MeasurementStore, child_id: int) -> list:
+    return store._connect().execute(
+        "SELECT fecha, peso_kg, estatura_cm, perimetro_cefalico_cm FROM measurements "
+        "WHERE child_id = ? ORDER BY fecha", (child_id,)).fetchall()
+
+
+def test_save_upserts_by_child_and_date(tmp_path):
+    store = MeasurementStore(str(tmp_path / "crecimiento.db"))
+    ana = store.upsert_child("Ana", "Niña", "2023-01-01")
+    assert store.upsert_child("Ana", "Niña", pd.Timestamp("2023-01-01")) == ana
+    luis = store.upsert_child("Luis", "Niño", "2023-01-01")
+
+    first = measurements([("2023-02-01", 4.1, 54.0, 37.0), ("2023-03-01", 5.0, 57.5, np.nan)])
+    assert store.save_measurements(ana, first) == {"written": 2, "deleted": 0}
+    store.save_measurements(luis, first)
+    # Misma fecha: se actualiza; sin cambios: no se escribe
+    edited = measurements([("2023-02-01", 4.1, 54.0, 37.0), ("2023-03-01", 5.2, 57.5, 38.0)])
+    assert store.save_measurements(ana, edited) == {"written": 1, "deleted": 0}
+    assert stored(store, ana) == [("2023-02-01", 4.1, 54.0, 37.0),
+                                  ("2023-03-01", 5.2, 57.5, 38.0)]
+    assert stored(store, luis) == [("2023-02-01", 4.1, 54.0, 37.0),
+                                   ("2023-03-01", 5.0, 57.5, None)]
+    assert store.save_measurements(ana, edited) == {"written": 0, "deleted": 0}
+
+    history = store.load_history(ana)
+    assert list(history.columns) == ["Fecha", "Peso (kg)", "Estatura (cm)",
+                                     "Perímetro Cefálico (cm)"]
+    assert history["Peso (kg)"].tolist() == [4.1, 5.2]
+
+
+def test_save_deletes_rows_missing_from_frame(tmp_path):
+    store = MeasurementStore(str(tmp_path / "crecimiento.db"))
+    ana = store.upsert_child("Ana", "Niña", "2023-01-01")
+    store.save_measurements(ana, measurements([("2023-02-01", 4.1, 54.0, 37.0),
+                                               ("2023-03-01", 5.0, 57.5, 38.0),
+                                               ("2023-04-01", 5.9, 60.0, 39.0)]))
+    # Filas sin fecha no se guardan
+    kept = measurements([("2023-03-01", 5.0, 57.5, 38.0), (None, 9.9, 99.0, 99.0)])
+    assert store.save_measurements(ana, kept) == {"written": 0, "deleted": 2}
+    assert stored(store, ana) == [("2023-03-01", 5.0, 57.5, 38.0)]
+    assert store.list_children()["mediciones"].tolist() == [1]
+
+
+def test_patch_writes_rows_and_removes_fechas(tmp_path):
+    store = MeasurementStore(str(tmp_path / "crecimiento.db"))
+    ana = store.upsert_child("Ana", "Niña", "2023-01-01")
+    store.save_measurements(ana, measurements([("2023-02-01", 4.1, 54.0, 37.0),
+                                               ("2023-03-01", 5.0, 57.5, 38.0),
+                                               ("2023-04-01", 5.9, 60.0, 39.0)]))
+    # La fecha de marzo se corrigió a 2023-03-02; abril se borró
+    touched = measurements([("2023-03-02", 5.0, 57.5, 38.0)])
+    result = store.patch_measurements(ana, touched, removed_fechas=[
+        pd.Timestamp("2023-03-01"), "2023-04-01", "2023-03-02"])
+    assert result == {"written": 1, "deleted": 2}
+    assert stored(store, ana) == [("2023-02-01", 4.1, 54.0, 37.0),
+                                  ("2023-03-02", 5.0, 57.5, 38.0)]
+
+
+def test_each_thread_gets_its_own_wal_connection(tmp_path):
+    path = str(tmp_path / "crecimiento.db")
+    store = MeasurementStore(path)
+    children = [store.upsert_child(f"Niño {i}", "Niño", "2023-01-01") for i in range(2)]
+    connections, errors = {}, []
+    barrier = threading.Barrier(len(children))
+
+    def writer(i, child_id):
+        try:
+            connections[i] = store._connect()
+            barrier.wait()
+            for day in range(1, 29):
+                store.patch_measurements(child_id, measurements(
+                    [(f"2023-02-{day:02d}", 4.0 + day / 10, 54.0, 37.0)]))
+        except Exception as e:  # noqa: BLE001 - se informa en el hilo principal
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i, c)) for i, c in enumerate(children)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len({id(conn) for conn in connections.values()}) == len(children)
+    assert all(conn is not store._connect() for conn in connections.values())
+    assert store._connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with sqlite3.connect(path) as conn:
+        counts = conn.execute("SELECT child_id, COUNT(*) FROM measurements "
+                              "GROUP BY child_id ORDER BY child_id").fetchall()
+    assert counts == [(child_id, 28) for child_id in children]
@@ -0,0 +1,119 @@
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+
+from crecimiento.db import MeasurementStore
+from crecimiento.derived import DerivedEngine
+from crecimiento.incremental import ChangeLog, RowScores, apply_editor_delta
+from crecimiento.pipeline import calcular_zscores_nino
+from tests.conftest import FIXTURES_DIR
+
+BIRTHDATE = datetime.date(2023, 1, 1)
+PARAMS = {"birthdate": BIRTHDATE}
+MONTHS = pd.read_excel(os.path.join(FIXTURES_DIR, "wfa_boys_0-to-5-years_zscores.xlsx"))
+COLUMNS = ["Fecha", "Peso (kg)", "Estatura (cm)", "Perímetro Cefálico (cm)"]
+DERIVED = ["Edad (meses)", "Edad (días)", "IMC"]
+
+
+def child_data() -> pd.DataFrame:
+    return pd.DataFrame({
+        "Fecha": pd.to_datetime(["2023-02-01", "2023-04-01", "2023-07-01", "2023-10-01"]),
+        "Peso (kg)": [4.3, 6.2, 7.9, 9.0],
+        "Estatura (cm)": [55.0, 61.0, 67.5, 72.0],
+        "Perímetro Cefálico (cm)": [38.0, 40.5, 43.0, 44.5],
+    })
+
+
+class Session:
+    """Lo que hace la app en cada edición: delta, columnas derivadas, z-scores y ChangeLog."""
+
+    def __init__(self):
+        self.engine = DerivedEngine()
+        self.df = self.engine.compute(child_data(), PARAMS)
+        self.row_scores = RowScores()
+        self.log = ChangeLog(child_id=1)
+        self.scores()
+
+    def edit(self, delta: dict):
+        changed, removed_fechas = apply_editor_delta(self.df, delta)
+        self.engine.update_rows(self.df, changed, PARAMS)
+        self.row_scores.invalidate(changed + list(delta.get("deleted_rows") or ()))
+        self.log.record(changed, removed_fechas)
+        return changed, removed_fechas
+
+    def scores(self) -> pd.DataFrame:
+        return self.row_scores.scores("wfa", MONTHS, "weight-for-age", self.df, "Peso (kg)",
+                                      BIRTHDATE)
+
+    def assert_matches_full_recompute(self) -> None:
+        full = DerivedEngine().compute(self.df[COLUMNS], PARAMS)
+        pd.testing.assert_frame_equal(self.df[COLUMNS + DERIVED], full[COLUMNS + DERIVED])
+        expected = calcular_zscores_nino(MONTHS, "weight-for-age", full, "Peso (kg)", BIRTHDATE)
+        pd.testing.assert_frame_equal(self.scores(), expected)
+
+
+def test_edited_rows():
+    session = Session()
+    changed, removed = session.edit({"edited_rows": {"1": {"Peso (kg)": 6.8}}})
+    assert changed == [1] and removed == []
+    assert session.df.at[1, "Peso (kg)"] == 6.8
+    assert session.df.at[1, "IMC"] == round(6.8 / 0.61 ** 2, 2)
+    session.assert_matches_full_recompute()
+    assert session.log.rows == {1} and not session.log.removed_fechas
+
+
+def test_date_edit_records_old_fecha():
+    session = Session()
+    changed, removed = session.edit({"edited_rows": {"2": {"Fecha": "2023-08-15"}}})
+    assert changed == [2]
+    assert removed == [pd.Timestamp("2023-07-01")]
+    assert session.df.at[2, "Fecha"] == pd.Timestamp("2023-08-15")
+    assert session.log.removed_fechas == {"2023-07-01"}
+    session.assert_matches_full_recompute()
+
+    rows, removed_fechas = session.log.pending(session.df)
+    assert rows.index.tolist() == [2] and removed_fechas == ["2023-07-01"]
+
+
+def test_deleted_and_added_rows():
+    session = Session()
+    changed, removed = session.edit({
+        "deleted_rows": [0],
+        "added_rows": [{"Fecha": "2024-01-02", "Peso (kg)": 10.1, "Estatura (cm)": 76.0}],
+    })
+    assert changed == [4]
+    assert removed == [pd.Timestamp("2023-02-01")]
+    assert session.df.index.tolist() == [1, 2, 3, 4]
+    assert np.isnan(session.df.at[4, "Perímetro Cefálico (cm)"])
+    assert session.df.at[4, "Edad (días)"] == (datetime.date(2024, 1, 2) - BIRTHDATE).days
+    session.assert_matches_full_recompute()
+
+    # Editor sobre la tabla ya sin la fila 0: la posición 0 es la etiqueta 1
+    changed, _ = session.edit({"edited_rows": {"0": {"Estatura (cm)": 62.0}}})
+    assert changed == [1]
+    session.assert_matches_full_recompute()
+
+
+def test_add_then_delete_leaves_no_trace(tmp_path):
+    session = Session()
+    store = MeasurementStore(str(tmp_path / "crecimiento.db"))
+    child_id = store.upsert_child("Ana", "Niña", BIRTHDATE)
+    store.save_measurements(child_id, session.df)
+    session.log.reset(child_id)
+
+    changed, _ = session.edit({"added_rows": [{"Fecha": "2024-01-02", "Peso (kg)": 10.1}]})
+    assert changed == [4]
+    session.assert_matches_full_recompute()
+    changed, removed = session.edit({"deleted_rows": [4]})
+    assert changed == [] and removed == [pd.Timestamp("2024-01-02")]
+    assert session.df.index.tolist() == [0, 1, 2, 3]
+    session.assert_matches_full_recompute()
+
+    rows, removed_fechas = session.log.pending(session.df)
+    assert rows.empty
+    store.patch_measurements(child_id, rows, removed_fechas)
+    pd.testing.assert_frame_equal(store.load_history(child_id),
+                                  session.df[COLUMNS].reset_index(drop=True),
+                                  check_dtype=False)
@@ -0,0 +1,89 @@
+import os
+import time
+
+from crecimiento.cache import ReferenceCache
+from crecimiento.prefetch import make_session, prefetch_all
+from tests.conftest import FIXTURES_DIR
+
+NAMES = {
+    "weight-for-age": {"0-13-weeks": "tab_wfa_{}_p_0_13.xlsx", "0-5": "tab_wfa_{}_p_0_5.xlsx"},
+    "length-height-for-age": {"0-2": "tab_lhfa_{}_p_0_2.xlsx", "2-5": "tab_lhfa_{}_p_2_5.xlsx"},
+}
+
+
+def local_links(stand_in, hosts=("127.0.0.1",)) -> dict:
+    """who_links.json reducido con las URL del servidor local (repartidas entre 'hosts')."""
+    links, i = {}, 0
+    for indicator, ranges in NAMES.items():
+        for gender in ("boys", "girls"):
+            for age_range, name in ranges.items():
+                url = stand_in.url(name.format(gender), host=hosts[i % len(hosts)])
+                links.setdefault(indicator, {}).setdefault("p", {}).setdefault(gender, {})[
+                    age_range] = url
+                i += 1
+    return links
+
+
+def urls(links) -> list:
+    return [url for indicator in links.values() for genders in indicator["p"].values()
+            for url in genders.values()]
+
+
+def test_every_workbook_lands_in_the_cache(tmp_path, stand_in):
+    links = local_links(stand_in)
+    cache = ReferenceCache(str(tmp_path), session=make_session(pool_size=4))
+    result = prefetch_all(links, cache, workers=4, per_host=2)
+
+    assert sorted(result["ok"]) == sorted(urls(links)) and not result["failed"]
+    assert cache.stats()["entries"] == len(urls(links))
+    for url in urls(links):
+        with open(cache.path_for(url), "rb") as f, \
+                open(os.path.join(FIXTURES_DIR, url.split("/")[-1].split("?")[0]), "rb") as g:
+            assert f.read() == g.read()
+    # Una segunda pasada se sirve de la caché, sin red
+    stats = cache.stats()
+    prefetch_all(links, cache, workers=4, per_host=2)
+    assert cache.stats()["network_calls"] == stats["network_calls"]
+
+
+def test_per_host_semaphore_caps_concurrency(tmp_path, stand_in):
+    stand_in.delay = 0.05
+    # Dos nombres para el mismo servidor: cada uno con su propio semáforo
+    links = local_links(stand_in, hosts=("127.0.0.1", "localhost"))
+    cache = ReferenceCache(str(tmp_path), session=make_session(pool_size=8))
+    result = prefetch_all(links, cache, workers=8, per_host=2)
+
+    assert len(result["ok"]) == len(urls(links))
+    assert set(stand_in.peak) == {"127.0.0.1", "localhost"}
+    assert max(stand_in.peak.values()) == 2
+
+
+def test_unavailable_is_retried_with_backoff(tmp_path, stand_in):
+    links = local_links(stand_in)
+    url = urls(links)[0]
+    path = "/" + url.split("/")[-1].split("?")[0]
+    stand_in.responses[path] = [503, 503]
+    backoff = 0.1
+    cache = ReferenceCache(str(tmp_path), session=make_session(retries=3, backoff=backoff))
+    result = prefetch_all(links, cache, workers=2, per_host=2)
+
+    assert url in result["ok"] and not result["failed"]
+    arrivals = [t for p, t in stand_in.arrivals if p == path]
+    assert len(arrivals) == 3
+    # urllib3 reintenta el primer error sin espera y luego espera backoff * 2 ** (n - 1)
+    assert arrivals[2] - arrivals[1] >= 2 * backoff * 0.9
+    assert cache.stats()["network_calls"] == len(urls(links))
+
+
+def test_stalled_server_times_out_without_hanging_the_pool(tmp_path, stand_in):
+    links = local_links(stand_in)
+    stalled = urls(links)[0]
+    stand_in.stalled.add("/" + stalled.split("/")[-1].split("?")[0])
+    cache = ReferenceCache(str(tmp_path), session=make_session(retries=0), timeout=0.5)
+    start = time.perf_counter()
+    result = prefetch_all(links, cache, workers=2, per_host=2)
+
+    assert time.perf_counter() - start < 5
+    assert list(result["failed"]) == [stalled]
+    assert "timed out" in result["failed"][stalled].lower()
+    assert sorted(result["ok"]) == sorted(u for u in urls(links) if u != stalled)
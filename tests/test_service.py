@@ -0,0 +1,51 @@
+import asyncio
+import json
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+from starlette.requests import Request
+
+from crecimiento.cohort import ReferenceTables
+from crecimiento.service import (ARROW_STREAM, ServiceError, _read_arrow, _write_arrow,
+                                 score_batch)
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(REPO_DIR, "benchmarks", "fixtures")
+
+
+@pytest.fixture(scope="module")
+def tables():
+    with open(os.path.join(REPO_DIR, "who_links.json"), "r") as f:
+        return ReferenceTables(json.load(f), source_dir=FIXTURES_DIR)
+
+
+def post_batch(tables, body: bytes, content_type: str = "application/json"):
+    # Sin cliente HTTP: la ruta recibe la petición ASGI directamente
+    scope = {"type": "http", "method": "POST", "path": "/score/batch",
+             "headers": [(b"content-type", content_type.encode())],
+             "app": SimpleNamespace(state=SimpleNamespace(tables=tables))}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return asyncio.run(score_batch(Request(scope, receive)))
+
+
+@pytest.mark.parametrize("payload", [[], {"rows": []}])
+def test_empty_json_batch(tables, payload):
+    response = post_batch(tables, json.dumps(payload).encode())
+    assert json.loads(response.body) == {"rows": []}
+
+
+def test_empty_arrow_batch(tables):
+    response = post_batch(tables, _write_arrow(pd.DataFrame({"Peso (kg)": []})), ARROW_STREAM)
+    scored = _read_arrow(response.body)
+    assert len(scored) == 0
+    assert {"Fecha", "Edad (meses)", "IMC"} <= set(scored.columns)
+
+
+def test_batch_missing_fields(tables):
+    with pytest.raises(ServiceError, match="Faltan los campos"):
+        post_batch(tables, json.dumps([{"Sexo": "Niño"}]).encode())
@@ -0,0 +1,71 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crecimiento.stitch import stitch_frames
+from crecimiento.zscore import DAYS_PER_MONTH
+from tests.conftest import FIXTURES_DIR
+
+
+def fixture(name: str) -> pd.DataFrame:
+    return pd.read_excel(os.path.join(FIXTURES_DIR, name))
+
+
+WEEKS = fixture("wfa_boys_0-to-13-weeks_zscores.xlsx")
+MONTHS = fixture("wfa_boys_0-to-5-years_zscores.xlsx")
+
+
+def assert_monotonic(x: np.ndarray) -> None:
+    assert np.all(np.diff(x) > 0)
+
+
+@pytest.mark.parametrize("order", [(WEEKS, MONTHS), (MONTHS, WEEKS)])
+def test_finer_table_wins_its_interval(order):
+    stitched = stitch_frames(order)
+    weeks_days = WEEKS["Week"].to_numpy() * 7
+    months_days = MONTHS["Month"].to_numpy() * DAYS_PER_MONTH
+
+    # Toda la tabla semanal, y de la mensual solo lo que está más allá de la semana 13
+    expected_days = np.concatenate([weeks_days, months_days[months_days > weeks_days.max()]])
+    assert np.allclose(stitched["Day"].to_numpy(), expected_days)
+    assert np.allclose(stitched["Month"].to_numpy(), expected_days / DAYS_PER_MONTH)
+    weekly = stitched["Day"] <= weeks_days.max()
+    assert stitched.loc[weekly, "M"].tolist() == WEEKS["M"].tolist()
+    assert stitched.loc[~weekly, "M"].tolist() == \
+        MONTHS.loc[months_days > weeks_days.max(), "M"].tolist()
+    assert "Week" not in stitched.columns
+    assert_monotonic(stitched["Day"].to_numpy())
+
+
+def test_earlier_range_wins_at_equal_resolution():
+    first = fixture("lhfa_boys_0-to-2-years_zscores.xlsx")
+    second = fixture("lhfa_boys_2-to-5-years_zscores.xlsx")
+    # Ambas mensuales y con el mes 24 repetido (acostado en 0-2 años, de pie en 2-5)
+    stitched = stitch_frames([second, first])
+    at_24 = stitched[np.isclose(stitched["Month"], 24)]
+    assert len(at_24) == 1
+    assert at_24["M"].iloc[0] == first.loc[first["Month"] == 24, "M"].iloc[0]
+    assert len(stitched) == len(first) + len(second) - 1
+    assert_monotonic(stitched["Day"].to_numpy())
+
+
+def test_length_table_wins_the_overlap_with_height():
+    length = fixture("wfl_boys_0-to-2-years_zscores.xlsx")
+    height = fixture("wfh_boys_2-to-5-years_zscores.xlsx")
+    stitched = stitch_frames([height, length])
+    x = stitched["Height"].to_numpy()
+    assert x[0] == length["Length"].min() and x[-1] == height["Height"].max()
+    from_length = stitched[x <= length["Length"].max()]
+    assert from_length["M"].tolist() == length["M"].tolist()
+    assert stitched[x > length["Length"].max()]["M"].tolist() == \
+        height.loc[height["Height"] > length["Length"].max(), "M"].tolist()
+    assert_monotonic(x)
+
+
+def test_stitch_rejects_mixed_axes_and_skips_missing_tables():
+    assert stitch_frames([None, MONTHS.iloc[0:0]]) is None
+    assert len(stitch_frames([None, MONTHS])) == len(MONTHS)
+    with pytest.raises(ValueError):
+        stitch_frames([MONTHS, fixture("wfl_boys_0-to-2-years_zscores.xlsx")])
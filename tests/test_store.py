@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crecimiento.store import ReferenceIndex
+
+
+def old_window(df: pd.DataFrame, x_col: str, user_value: float, window: int = 5):
+    """get_reference_window anterior a ReferenceIndex (posición más cercana y ventana)."""
+    df_sorted = df.sort_values(by=x_col).reset_index(drop=True)
+    closest_index = (df_sorted[x_col] - user_value).abs().idxmin()
+    start = max(0, closest_index - window // 2)
+    end = start + window
+    if end > len(df_sorted):
+        end = len(df_sorted)
+        start = max(0, end - window)
+    return closest_index, df_sorted.iloc[start:end]
+
+
+def table(x) -> pd.DataFrame:
+    # Desordenada, con X repetidas y una fila sin X
+    return pd.DataFrame({"Month": x, "M": np.arange(len(x), dtype="float64")})
+
+
+TABLES = {
+    "regular": table([6.0, 0.0, 3.0, 1.0, 2.0, 4.0, 5.0]),
+    "duplicates": table([2.0, 0.0, 1.0, 1.0, 3.0, 3.0, 3.0, 5.0]),
+    "nan_x": table([1.0, np.nan, 0.0, 2.5, 4.0, np.nan, 3.0]),
+}
+
+
+@pytest.mark.parametrize("name", TABLES)
+def test_nearest_matches_idxmin(name):
+    df = TABLES[name]
+    index = ReferenceIndex(df, "Month")
+    x = df["Month"].dropna().to_numpy()
+    midpoints = (np.sort(x)[1:] + np.sort(x)[:-1]) / 2   # empates exactos
+    values = np.concatenate([x, midpoints, [x.min() - 10, x.min() - 0.1, x.max() + 0.1,
+                                            x.max() + 100], np.linspace(-1, 7, 33)])
+    nearest = index.nearest_many(values)
+    for value, position in zip(values, nearest):
+        expected, window = old_window(df, "Month", value)
+        assert position == expected, value
+        assert index.nearest(value) == expected
+        got = index.window(value)
+        assert len(got) == len(window)
+        assert np.array_equal(got["Month"].to_numpy(), window["Month"].to_numpy(),
+                              equal_nan=True)
+
+
+def test_ties_choose_the_lower_row():
+    index = ReferenceIndex(TABLES["regular"], "Month")
+    assert index.nearest_many([0.5, 2.5, 5.5]).tolist() == [0, 2, 5]
+    # Con X repetidas, la primera aparición (como idxmin)
+    index = ReferenceIndex(TABLES["duplicates"], "Month")
+    assert index.nearest_many([1.0, 1.2, 3.4, 4.0]).tolist() == [1, 1, 4, 4]
+
+
+def test_out_of_range_and_nan_ages():
+    index = ReferenceIndex(TABLES["nan_x"], "Month")
+    assert index.nearest_many([-5.0, 100.0]).tolist() == [0, index.n_valid - 1]
+    assert index.nearest_many([np.nan, 1.0]).tolist() == [-1, 1]
+    assert index.window(np.nan).empty
+    # La edad NaN no tiene fila más cercana: la versión anterior fallaba
+    with pytest.raises(ValueError):
+        old_window(TABLES["nan_x"], "Month", np.nan)
+    lo, hi, weight = index.brackets([-5.0, 0.5, np.nan, 100.0])
+    assert np.isnan(weight[[0, 2, 3]]).all()
+    assert (lo[1], hi[1], weight[1]) == (0, 1, 0.5)
@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crecimiento.analytics import z_column
+from crecimiento.core import indicator_map_es
+from crecimiento.validation import (
+    BIV_LIMITS, COL_FLAG_CODES, COL_FLAGS, FLAG_BITS, annotate, describe_flags,
+    flag_measurements,
+)
+
+TODAY = "2024-06-01"
+BIRTHDATE = "2023-01-01"
+
+
+def codes(df: pd.DataFrame, **kwargs) -> list:
+    """Códigos de cada fila, como conjuntos."""
+    flags = flag_measurements(df, today=TODAY, **kwargs)
+    return [{code for code, bit in FLAG_BITS.items() if value & bit} for value in flags]
+
+
+def visit(fecha="2023-06-01", peso=7.5, estatura=65.0, pc=42.0, **extra) -> dict:
+    return {"Fecha": fecha, "Peso (kg)": peso, "Estatura (cm)": estatura,
+            "Perímetro Cefálico (cm)": pc, **extra}
+
+
+@pytest.mark.parametrize("indicator_es", indicator_map_es)
+def test_biv_limits(indicator_es):
+    code, low, high = BIV_LIMITS[indicator_map_es[indicator_es]]
+    z = [low - 0.01, low, 0.0, high, high + 0.01, np.nan]
+    df = pd.DataFrame({z_column(indicator_es): z})
+    assert [code in row for row in codes(df)] == [True, False, False, False, True, False]
+
+
+def test_biv_cutoffs_are_who_anthro():
+    limits = {indicator: (low, high) for indicator, (_, low, high) in BIV_LIMITS.items()}
+    assert limits == {
+        "length-height-for-age": (-6.0, 6.0),
+        "weight-for-age": (-6.0, 5.0),
+        "weight-for-length-height": (-5.0, 5.0),
+        "body-mass-index-for-age": (-5.0, 5.0),
+        "head-circumference-for-age": (-5.0, 5.0),
+    }
+
+
+def test_swapped_weight_and_height():
+    df = pd.DataFrame([visit(peso=65.0, estatura=7.5),    # intercambiados
+                       visit(peso=25.0, estatura=20.0),   # peso > talla, pero 25 cm no es posible
+                       visit(peso=40.0, estatura=150.0)])
+    got = codes(df, visits=False)
+    assert got[0] == {"PESO_TALLA_INVERTIDOS"}
+    assert "PESO_TALLA_INVERTIDOS" not in got[1] and "FUERA_DE_RANGO" in got[1]
+    assert got[2] == set()
+
+
+@pytest.mark.parametrize("column,value,code", [
+    ("Estatura (cm)", 650.0, "TALLA_EN_MM"),
+    ("Estatura (cm)", 0.65, "TALLA_EN_M"),
+    ("Peso (kg)", 7500.0, "PESO_EN_G"),
+    ("Perímetro Cefálico (cm)", 420.0, "PC_EN_MM"),
+    ("Peso (kg)", 0.1, "FUERA_DE_RANGO"),
+    ("Estatura (cm)", 5000.0, "FUERA_DE_RANGO"),
+])
+def test_unit_errors(column, value, code):
+    df = pd.DataFrame([visit(), visit()])
+    df.loc[0, column] = value
+    assert codes(df, visits=False) == [{code}, set()]
+
+
+@pytest.mark.filterwarnings("ignore:Could not infer format")
+def test_date_rules():
+    df = pd.DataFrame([visit(fecha=None), visit(fecha="no es fecha"),
+                       visit(fecha="2022-12-31"), visit(fecha="2024-06-02"),
+                       visit(fecha=TODAY)])
+    assert codes(df, birthdate=BIRTHDATE) == [
+        {"FECHA_INVALIDA"}, {"FECHA_INVALIDA"}, {"FECHA_ANTES_NACIMIENTO"},
+        {"FECHA_FUTURA"}, set()]
+    # La columna "Fecha de Nacimiento" tiene prioridad sobre 'birthdate'
+    df["Fecha de Nacimiento"] = "2020-01-01"
+    assert codes(df, birthdate=BIRTHDATE)[2] == set()
+
+
+def test_duplicates_per_child():
+    df = pd.DataFrame([visit(ID="a"), visit(ID="b"), visit(ID="a", peso=7.6),
+                       visit(ID="a", fecha="2023-07-01", estatura=66.0),
+                       visit(ID="b", fecha=None), visit(ID="b", fecha=None)])
+    got = codes(df, id_col="ID")
+    assert ["FECHA_DUPLICADA" in row for row in got] == [True, False, True, False, False, False]
+    # Sin id_col todas las filas son del mismo niño/a
+    assert "FECHA_DUPLICADA" in codes(df)[1]
+    assert not any("FECHA_DUPLICADA" in row for row in codes(df, id_col="ID", visits=False))
+
+
+def test_height_decrease_uses_previous_valid_visit():
+    df = pd.DataFrame([
+        visit(ID="a", fecha="2023-08-01", estatura=67.5),  # -2,5 cm: baja
+        visit(ID="a", fecha="2023-06-01", estatura=70.0),
+        visit(ID="a", fecha="2023-07-01", estatura=650.0),  # en mm: no cuenta como anterior
+        visit(ID="a", fecha="2023-09-01", estatura=66.6),  # -0,9 cm desde 67,5: no baja
+        visit(ID="b", fecha="2023-05-01", estatura=60.0),  # otro niño/a
+        visit(ID="a", fecha="2023-10-01", estatura=np.nan),
+        visit(ID="a", fecha="2023-11-01", estatura=64.5),  # -2,1 cm desde 66,6
+    ])
+    got = codes(df, id_col="ID")
+    assert ["TALLA_DISMINUYE" in row for row in got] == \
+        [True, False, False, False, False, False, True]
+    assert got[2] == {"TALLA_EN_MM"}
+
+
+def test_annotate_keeps_rows_and_describes_flags():
+    df = pd.DataFrame([visit(), visit(fecha="2023-07-01", peso=7500.0),
+                       visit(fecha=None, peso=65.0, estatura=7.5)])
+    out = annotate(df, birthdate=BIRTHDATE, today=TODAY)
+    assert len(out) == len(df) and out.index.equals(df.index)
+    assert out[COL_FLAG_CODES].tolist() == ["", "PESO_EN_G",
+                                            "PESO_TALLA_INVERTIDOS,FECHA_INVALIDA"]
+    assert describe_flags(out[COL_FLAGS].iloc[1]) == ["Peso en gramos"]
+    assert flag_measurements(df.iloc[0:0]).dtype == np.int32
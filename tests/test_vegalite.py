@@ -0,0 +1,12 @@
+from crecimiento.vegalite import chart_spec
+
+
+def test_child_tooltip_only_carries_field_definitions():
+    spec = chart_spec({"values": []}, "z", "Peso para la edad", "Edad (meses)", "Peso (kg)",
+                      [1.0, 2.0], [4.1, 4.9], "Ana", "#d62728")
+    reference, child = spec["layer"]
+    assert reference["encoding"]["y"]["scale"] == {"zero": False}
+    assert child["encoding"]["tooltip"] == [
+        {"field": "x", "type": "quantitative", "title": "Edad (meses)"},
+        {"field": "y", "type": "quantitative", "title": "Peso (kg)", "format": ".2f"},
+    ]
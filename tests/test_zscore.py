@@ -0,0 +1,97 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from crecimiento.zscore import (DAYS_PER_MONTH, LMSTable, lms_value, lms_zscore, normal_cdf,
+                                score_indicator, zscore_to_percentile)
+
+# Peso para la edad, niños (WHO Child Growth Standards): mes -> (L, M, S) y las
+# curvas publicadas de -3, -2, -1, 0, 1, 2 y 3 DE (kg, con un decimal)
+WFA_BOYS = {
+    0: ((0.3487, 3.3464, 0.14602), (2.1, 2.5, 2.9, 3.3, 3.9, 4.4, 5.0)),
+    12: ((0.0644, 9.6479, 0.10925), (6.9, 7.7, 8.6, 9.6, 10.8, 12.0, 13.3)),
+}
+
+
+def wfa_table() -> LMSTable:
+    return LMSTable.from_frame(pd.DataFrame(
+        [(month, *lms) for month, (lms, _) in WFA_BOYS.items()],
+        columns=["Month", "L", "M", "S"]))
+
+
+@pytest.mark.parametrize("month", WFA_BOYS)
+def test_sd_curves_match_who_tables(month):
+    (L, M, S), published = WFA_BOYS[month]
+    values = lms_value(L, M, S, np.arange(-3, 4))
+    assert np.abs(values - np.array(published)).max() <= 0.05 + 1e-9
+    # Sobre las curvas, el z-score restringido es el de la curva
+    z = lms_zscore(values, L, M, S, restricted_tails=True)
+    assert np.allclose(z, np.arange(-3, 4))
+
+
+def test_restricted_tails_beyond_three_sd():
+    (L, M, S), _ = WFA_BOYS[12]
+
+    def curve(z):
+        return M * (1 + L * S * z) ** (1 / L)
+
+    heavy, light = 14.5, 6.0
+    z = lms_zscore([heavy, light], L, M, S, restricted_tails=True)
+    expected_high = 3 + (heavy - curve(3)) / (curve(3) - curve(2))
+    expected_low = -3 + (light - curve(-3)) / (curve(-2) - curve(-3))
+    assert z == pytest.approx([expected_high, expected_low], abs=1e-12)
+    assert z[0] == pytest.approx(3.85, abs=0.01)
+    assert z[1] == pytest.approx(-4.14, abs=0.01)
+    # Sin restringir se seguiría la curva LMS, que da otros valores en las colas
+    free = lms_zscore([heavy, light], L, M, S)
+    assert np.abs(free - z).min() > 0.05
+    assert np.allclose(lms_zscore(curve(2.5), L, M, S, restricted_tails=True),
+                       lms_zscore(curve(2.5), L, M, S))
+
+
+def test_score_indicator_weight_for_age():
+    table = wfa_table()
+    age = np.array([12 * DAYS_PER_MONTH])
+    z, p = score_indicator("weight-for-age", table, age_days=age, values=np.array([14.5]))
+    assert z[0] == pytest.approx(3.85, abs=0.01)
+    assert p[0] == pytest.approx(zscore_to_percentile(z)[0])
+    with pytest.raises(ValueError):
+        score_indicator("weight-for-length-height", table, height_cm=age, values=[14.5])
+
+
+def test_log_branch_when_l_is_zero():
+    M, S = 10.0, 0.1
+    y = np.array([7.5, 10.0, 13.0])
+    assert np.allclose(lms_zscore(y, 0.0, M, S), np.log(y / M) / S)
+    assert np.allclose(lms_value(0.0, M, S, [-2, 0, 2]), M * np.exp(S * np.array([-2, 0, 2])))
+    # Continuidad: L muy chico se acerca a la rama logarítmica
+    assert np.allclose(lms_zscore(y, 1e-6, M, S), lms_zscore(y, 0.0, M, S), atol=1e-4)
+    assert np.allclose(lms_value(1e-6, M, S, [-2, 2]), lms_value(0.0, M, S, [-2, 2]), rtol=1e-5)
+
+
+def test_percentiles_match_erf():
+    z = np.linspace(-6, 6, 241)
+    exact = np.array([0.5 * (1 + math.erf(v / math.sqrt(2))) for v in z])
+    approx = normal_cdf(z)
+    assert np.abs(approx - exact).max() < 2e-7
+    assert np.all(np.abs(approx - exact) <= 1.2e-7 * np.minimum(exact, 1 - exact) + 1e-15)
+    assert zscore_to_percentile([0, -1.959964, 1.644854]) == pytest.approx([50, 2.5, 95], abs=1e-4)
+    assert np.all(np.diff(approx) >= 0)
+
+
+def test_interpolation_between_table_ages():
+    table = wfa_table()
+    (L0, M0, S0), _ = WFA_BOYS[0]
+    (L1, M1, S1), _ = WFA_BOYS[12]
+    ages = np.array([0, 3 * DAYS_PER_MONTH, 6 * DAYS_PER_MONTH, 12 * DAYS_PER_MONTH])
+    L, M, S = table.interpolate(ages)
+    w = np.array([0, 0.25, 0.5, 1])
+    assert np.allclose(L, L0 + w * (L1 - L0))
+    assert np.allclose(M, M0 + w * (M1 - M0))
+    assert np.allclose(S, S0 + w * (S1 - S0))
+
+    L, M, S = table.interpolate([-1, 12 * DAYS_PER_MONTH + 1, np.nan])
+    assert np.isnan(L).all() and np.isnan(M).all() and np.isnan(S).all()
+    assert np.isnan(table.zscores([-1], [3.0])).all()